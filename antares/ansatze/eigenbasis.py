@@ -9,12 +9,13 @@
 
 # Author: Giuseppe
 
+import functools
+
 from lips import Particles
 from lips.symmetries import inverse
 
-from lips.invariants import Invariants
-
 from ..core.settings import settings
+from ..core.invariants import cached_invariants, cached_full_set
 from ..core.tools import pSijk, pA2, pS2, pNB, pDijk
 
 
@@ -49,68 +50,74 @@ def Image(Spinor, Rule, verbose=False):
         sign = "+" if len(Spinor) == 2 else Spinor[2]
         return (new_permutation, new_conjugation, sign)
     else:
-        from antares.topologies.topology import convert_invariant
-        SpinorImage = convert_invariant(Spinor, Rule)
-
-        n = len(Rule[0])
-        oInvariants = Invariants(n, Restrict3Brackets=settings.Restrict3Brackets, Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
-
-        NbrFlips = 0
-        if SpinorImage not in oInvariants.full:
-
-            if pA2.findall(SpinorImage) != [] or pS2.findall(SpinorImage) != []:
-                SpinorImage = SpinorImage[::-1].replace("[", "A").replace("]", "[").replace("A", "]").replace("⟨", "A").replace("⟩", "⟨").replace("A", "⟩")
-                NbrFlips += 1
-
-            elif pSijk.findall(SpinorImage) != []:
-                ijk = sorted(map(int, list(pSijk.findall(SpinorImage)[0])))
-                SpinorImage = "s_" + "".join(map(str, ijk))
-                if SpinorImage not in oInvariants.full:
-                    oParticles = Particles(n)
-                    SpinorImageAlternative = "s_" + "".join(oParticles._complementary(list(SpinorImage[2:])))
-                    if len(SpinorImageAlternative) < len(SpinorImage):
-                        SpinorImage = SpinorImageAlternative
-
-            elif pNB.findall(SpinorImage) != []:
-                start, middles, end = pNB.findall(SpinorImage)[0]
-                middles = middles.split("|")
-                middles = [sorted(middle.replace("(", "").replace(")", "").split("+")) for middle in middles]
-                middles = ["(" + "+".join(middle) + ")" for middle in middles]
-                SpinorImage = SpinorImage[0] + start + "|" + "|".join(middles) + "|" + end + SpinorImage[-1]
-                if SpinorImage not in oInvariants.full and len(middles) == 1:
-                    oParticles = Particles(n)
-                    if "+" in middles[0] and "-" in middles[0]:
-                        raise NotImplementedError("Mixed plus and minuses in sandwiched p-slashes not implemented.")
-                    sign_operator = "+" if "+" in middles[0] else "-"
-                    complementary_middle = oParticles._complementary(middles[0].replace("(", "").replace(")", "").split(sign_operator))
-                    complementary_middle = [entry for entry in complementary_middle if entry not in [start, end]]
-                    _SpinorImage = SpinorImage[0] + start + "|(" + sign_operator.join(complementary_middle) + ")|" + end + SpinorImage[-1]
-                    if _SpinorImage in oInvariants.full:
-                        NbrFlips += 1
-                        SpinorImage = _SpinorImage
-                if SpinorImage not in oInvariants.full:
-                    SpinorImage = SpinorImage[-1].replace("]", "[").replace("⟩", "⟨") + end + "|" + "|".join(middles[::-1]) + "|" + start + SpinorImage[0].replace("[", "]").replace("⟨", "⟩")
-                    if len(middles) % 2 == 0:
-                        NbrFlips += 1
-
-            elif pDijk.findall(SpinorImage) != [] and SpinorImage.count("|") == 1:
-                for counter in range(10):
-                    ijk = pDijk.findall(SpinorImage)[0][0]
-                    SpinorImage = "Δ_{}".format(ijk[-1] + ijk[:-1])
-                    if SpinorImage in oInvariants.full:
-                        break
-            elif SpinorImage == "Δ_26|15|43":
-                SpinorImage = "Δ_15|26|34"
-
-        if verbose and SpinorImage not in oInvariants.full:
+        SpinorImage, Sign = _invariant_image(Spinor, tuple(Rule[:2]), settings.Restrict3Brackets, settings.Restrict4Brackets, settings.FurtherRestrict4Brackets)
+        if verbose and SpinorImage not in cached_invariants(len(Rule[0])).full:
             print("Warning: could not find image in oInvariants. {} -> {}.".format(Spinor, SpinorImage))
+        return SpinorImage, Sign
 
-        if NbrFlips % 2 == 0:
-            Sign = 1
-        else:
-            Sign = -1
 
-        # make sure all spinors are in the correct order
-        # ProductOfSpinorsAsStringImage = CanonicalOrdering(ProductOfSpinorsAsStringImage, D1Basis)
+@functools.lru_cache(maxsize=2 ** 18)
+def _invariant_image(Spinor, Rule, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets):
+    """Image of an invariant under a rule, memoized on (invariant, rule, restriction flags)."""
+    from antares.topologies.topology import convert_invariant
+    SpinorImage = convert_invariant(Spinor, Rule)
+
+    n = len(Rule[0])
+    full = cached_full_set(n, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets)
+
+    NbrFlips = 0
+    if SpinorImage not in full:
+
+        if pA2.findall(SpinorImage) != [] or pS2.findall(SpinorImage) != []:
+            SpinorImage = SpinorImage[::-1].replace("[", "A").replace("]", "[").replace("A", "]").replace("⟨", "A").replace("⟩", "⟨").replace("A", "⟩")
+            NbrFlips += 1
+
+        elif pSijk.findall(SpinorImage) != []:
+            ijk = sorted(map(int, list(pSijk.findall(SpinorImage)[0])))
+            SpinorImage = "s_" + "".join(map(str, ijk))
+            if SpinorImage not in full:
+                oParticles = Particles(n)
+                SpinorImageAlternative = "s_" + "".join(oParticles._complementary(list(SpinorImage[2:])))
+                if len(SpinorImageAlternative) < len(SpinorImage):
+                    SpinorImage = SpinorImageAlternative
+
+        elif pNB.findall(SpinorImage) != []:
+            start, middles, end = pNB.findall(SpinorImage)[0]
+            middles = middles.split("|")
+            middles = [sorted(middle.replace("(", "").replace(")", "").split("+")) for middle in middles]
+            middles = ["(" + "+".join(middle) + ")" for middle in middles]
+            SpinorImage = SpinorImage[0] + start + "|" + "|".join(middles) + "|" + end + SpinorImage[-1]
+            if SpinorImage not in full and len(middles) == 1:
+                oParticles = Particles(n)
+                if "+" in middles[0] and "-" in middles[0]:
+                    raise NotImplementedError("Mixed plus and minuses in sandwiched p-slashes not implemented.")
+                sign_operator = "+" if "+" in middles[0] else "-"
+                complementary_middle = oParticles._complementary(middles[0].replace("(", "").replace(")", "").split(sign_operator))
+                complementary_middle = [entry for entry in complementary_middle if entry not in [start, end]]
+                _SpinorImage = SpinorImage[0] + start + "|(" + sign_operator.join(complementary_middle) + ")|" + end + SpinorImage[-1]
+                if _SpinorImage in full:
+                    NbrFlips += 1
+                    SpinorImage = _SpinorImage
+            if SpinorImage not in full:
+                SpinorImage = SpinorImage[-1].replace("]", "[").replace("⟩", "⟨") + end + "|" + "|".join(middles[::-1]) + "|" + start + SpinorImage[0].replace("[", "]").replace("⟨", "⟩")
+                if len(middles) % 2 == 0:
+                    NbrFlips += 1
+
+        elif pDijk.findall(SpinorImage) != [] and SpinorImage.count("|") == 1:
+            for counter in range(10):
+                ijk = pDijk.findall(SpinorImage)[0][0]
+                SpinorImage = "Δ_{}".format(ijk[-1] + ijk[:-1])
+                if SpinorImage in full:
+                    break
+        elif SpinorImage == "Δ_26|15|43":
+            SpinorImage = "Δ_15|26|34"
+
+    if NbrFlips % 2 == 0:
+        Sign = 1
+    else:
+        Sign = -1
 
-        return SpinorImage, Sign
+    # make sure all spinors are in the correct order
+    # ProductOfSpinorsAsStringImage = CanonicalOrdering(ProductOfSpinorsAsStringImage, D1Basis)
+
+    return SpinorImage, Sign
@@ -12,17 +12,17 @@ import re
 import subprocess
 import functools
 import mpmath
-import multiprocessing
-import antares
 
-from lips.invariants import Invariants
 
 from pycoretools import flatten
 
 from .settings import settings
+from .invariants import cached_invariants
 from .bh_patch import BH_found, gmpTools_found
-from .tools import OutputGrabber, MyShelf, mpc_to_cgmp, cgmp_to_mpc
+from .tools import OutputGrabber, mpc_to_cgmp, cgmp_to_mpc
+from .call_cache import call_cache
 from .numerical_methods import Numerical_Methods
+from .point_fingerprints import point_fingerprint
 
 if BH_found:
     from .bh_patch import BH
@@ -186,6 +186,11 @@ class BHUnknown(Numerical_Methods, object):
     def __name__(self):
         return "/".join([self.short_process_name, self.helconf_and_loopid, self.amppart_and_ampindex])
 
+    @property
+    def function_key(self):
+        """Identity of the amplitude (process, helicities, loop, part and index) in persistent caches, see scalings.single."""
+        return self.__name__
+
     @property
     def upper_res_path(self):
         upper_path = settings.base_res_path + "/".join([self.short_process_name, self.helconf_and_loopid])
@@ -199,34 +204,34 @@ class BHUnknown(Numerical_Methods, object):
     def res_path(self):
         return settings.base_res_path + self.__name__
 
+    def call_cache_key(self, amppart, ampindex, oParticles):
+        """Key of the call cache: (amppart, ampindex, point fingerprint), ampindex only for cut parts."""
+        ampindex = int(ampindex) if amppart in ["box", "triangle", "bubble"] and ampindex is not None else None
+        return (amppart, ampindex, point_fingerprint(oParticles))
+
     def _evaluate(self, amppart, ampindex, oParticles):
         # look up in call cache
-        if amppart in ["tree", "rational"] and amppart + "_" + str(hash(oParticles)) in self.dCallCache:
-            return self.dCallCache[str(amppart + "_" + str(hash(oParticles)))]
-        elif amppart in ["box", "triangle", "bubble"] and amppart + "(" + str(ampindex) + ")" + "_" + str(hash(oParticles)) in self.dCallCache:
-            return self.dCallCache[str(amppart + "(" + str(ampindex) + ")" + "_" + str(hash(oParticles)))]
+        key = self.call_cache_key(amppart, ampindex, oParticles)
+        if key in self.dCallCache:
+            return self.dCallCache[key]
         # else compute and save to cache
-        else:
-            mom_conf = Upload_Momentum_Configuration(oParticles)
+        mom_conf = Upload_Momentum_Configuration(oParticles)
         if amppart == "tree":
             res = cgmp_to_mpc(gmpTools.CGMP(self.A0.eval(mom_conf, self.BH_vectori)))
-            self.dCallCache[str(amppart + "_" + str(hash(oParticles)))] = res
-            return res
         elif amppart in ["box", "triangle", "bubble"]:
             res = cgmp_to_mpc(gmpTools.CGMP(getattr(self.A1_cutpart, amppart)(int(ampindex)).eval(mom_conf, self.BH_vectori)))
-            self.dCallCache[str(amppart + "(" + str(ampindex) + ")" + "_" + str(hash(oParticles)))] = res
-            return res
         elif amppart == "rational":
             res = cgmp_to_mpc(gmpTools.CGMP(self.A1_rational.eval(mom_conf, self.BH_vectori)))
-            self.dCallCache[str(amppart + "_" + str(hash(oParticles)))] = res
-            return res
         else:
             raise Exception("Invalid amppart in evaluate: {}".format(amppart))
+        self.dCallCache[key] = res
+        return res
 
     def __call__(self, oParticles):
         # lookup in call cache
-        if self.amppart_and_ampindex + "_" + str(hash(oParticles)) in self.dCallCache:
-            return self.dCallCache[str(self.amppart_and_ampindex + "_" + str(hash(oParticles)))]
+        key = self.call_cache_key(self.amppart, self.ampindex, oParticles)
+        if key in self.dCallCache:
+            return self.dCallCache[key]
         # else compute all, save to cache, return value
         else:
             if self.amppart in ["box", "triangle", "bubble", None]:
@@ -234,7 +239,7 @@ class BHUnknown(Numerical_Methods, object):
                 self.A1_cutpart.eval(mom_conf, self.BH_vectori)
                 # save all to cache!
                 if self.amppart is None:
-                    self.dCallCache[str(self.amppart_and_ampindex + "_" + str(hash(oParticles)))] = "Cut evaluated"
+                    self.dCallCache[key] = "Cut evaluated"
                 # cache boxes
                 for i in self.independent_boxes:
                     self._evaluate("box", i, oParticles)
@@ -244,8 +249,8 @@ class BHUnknown(Numerical_Methods, object):
                 # cache bubbles
                 for i in self.independent_bubbles:
                     self._evaluate("bubble", i, oParticles)
-                if self.amppart is not None and str(self.amppart_and_ampindex + "_" + str(hash(oParticles))) in self.dCallCache:
-                    return self.dCallCache[str(self.amppart_and_ampindex + "_" + str(hash(oParticles)))]
+                if self.amppart is not None and key in self.dCallCache:
+                    return self.dCallCache[key]
                 elif self.amppart is not None:
                     # not in cache: not one of the independent topology models  ---  not supposed to run these under production
                     print("Warning: Calling uncached cut part!")
@@ -254,18 +259,10 @@ class BHUnknown(Numerical_Methods, object):
                 return self._evaluate(self.amppart, self.ampindex, oParticles)
 
     def reload_call_cache(self):
-        if not os.path.exists(self.call_cache_path):
-            os.makedirs(self.call_cache_path)
-        with MyShelf(self.call_cache_path + "/" + self.process_name, 'c') as persistentCallCache:
-            dCallCache = multiprocessing.Manager().dict(dict(persistentCallCache))
-        setattr(antares.core.bh_unknown, "dCallCache_" + self.process_name, dCallCache)
-        self.dCallCache = dCallCache
+        self.dCallCache = call_cache(self.call_cache_path + "/" + self.process_name)
 
     def save_call_cache(self):
-        if len(self.dCallCache.keys()) > self.len_keys_call_cache_at_last_save:
-            self.len_keys_call_cache_at_last_save = len(self.dCallCache.keys())
-            with MyShelf(self.call_cache_path + "/" + self.process_name, 'c') as persistentCallCache:
-                persistentCallCache.update(self.dCallCache)
+        self.dCallCache.flush()
 
     def __setstate__(self, helconf_loopid_amppart_ampindex):
         self.__init__(*helconf_loopid_amppart_ampindex)
@@ -316,11 +313,7 @@ class BHUnknown(Numerical_Methods, object):
                         self.independent_bubbles += [line.split("[")[1].split("]")[0].split(",")[0]]
 
     def get_call_cache(self):
-        if "dCallCache_" + self.process_name not in dir(antares.core.bh_unknown):
-            self.reload_call_cache()
-        else:
-            self.dCallCache = getattr(antares.core.bh_unknown, "dCallCache_" + self.process_name)
-        self.len_keys_call_cache_at_last_save = len(self.dCallCache.keys())
+        self.reload_call_cache()
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
@@ -373,10 +366,9 @@ class BHUnknown(Numerical_Methods, object):
                 else:
                     basis_functions += [stripped_den]
             # clean and order
-            oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                     Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+            oInvariants = cached_invariants(self.multiplicity)
             basis_functions = map(list, basis_functions)
-            basis_functions = [sorted(basis_function, key=lambda t: oInvariants.full.index(t)) for basis_function in basis_functions]
+            basis_functions = [sorted(basis_function, key=lambda t: oInvariants.full_index[t]) for basis_function in basis_functions]
             basis_functions = [ibasis_function for i, ibasis_function in enumerate(basis_functions) if not any(
                 [all([inv in jbasis_function for inv in ibasis_function]) for j, jbasis_function in enumerate(basis_functions) if i != j])]
             self._basis_functions = basis_functions
@@ -394,8 +386,7 @@ class BHUnknown(Numerical_Methods, object):
                 _spurious_poles_of_basis_function = list(set([inv for inv in basis_function if "(" in inv]))
                 _spurious_poles = list(set(_spurious_poles + _spurious_poles_of_basis_function))
             if _spurious_poles == [] and self.basis_functions == []:
-                oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                         Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+                oInvariants = cached_invariants(self.multiplicity)
                 _spurious_poles = oInvariants.invs_3
             self._spurious_poles = _spurious_poles
         return self._spurious_poles
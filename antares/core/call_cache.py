@@ -0,0 +1,96 @@
+import atexit
+import diskcache
+import multiprocessing
+import os
+
+from .diskcached import cache_handle, get_many, set_many
+from .settings import settings
+
+
+# Two tier cache of black box evaluations: a per-process dict serves repeated lookups, a diskcache store (SQLite,
+# safe for concurrent processes) shares and persists values across processes and runs. New values are buffered
+# and written back in batches of settings.CallCacheWriteBack, on flush, and at exit. Worker processes (e.g. of
+# mapThreads) exit without running atexit, so in processes other than the one that created the cache, and in
+# multiprocessing children, values are written through.
+
+_call_caches = {}
+
+
+def call_cache(directory):
+    """Process-wide CallCache for the directory."""
+    key = (os.getpid(), str(directory))
+    if key not in _call_caches:
+        for stale_key in [stale_key for stale_key in _call_caches if stale_key[0] != key[0]]:
+            del _call_caches[stale_key]
+        _call_caches[key] = CallCache(directory)
+    return _call_caches[key]
+
+
+@atexit.register
+def flush_call_caches():
+    for key, oCallCache in _call_caches.items():
+        if key[0] == os.getpid():
+            oCallCache.flush()
+
+
+class CallCache(object):
+    """Dict-like cache of evaluations with structured keys, e.g. (amppart, ampindex, point fingerprint)."""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.local = {}
+        self.pending = {}
+        self.pid = os.getpid()
+
+    @property
+    def store(self):
+        return cache_handle(self.directory)
+
+    def __contains__(self, key):
+        if key in self.local:
+            return True
+        value = self.store.get(key, default=diskcache.ENOVAL)
+        if value is diskcache.ENOVAL:
+            return False
+        self.local[key] = value
+        return True
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return self.local[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def get_many(self, keys):
+        """Values of many keys (None if missing), with a single read transaction for those not held locally."""
+        missing = [key for key in keys if key not in self.local]
+        if missing:
+            for key, value in zip(missing, get_many(self.store, missing, default=diskcache.ENOVAL)):
+                if value is not diskcache.ENOVAL:
+                    self.local[key] = value
+        return [self.local.get(key) for key in keys]
+
+    @property
+    def writes_through(self):
+        return os.getpid() != self.pid or multiprocessing.parent_process() is not None
+
+    def __setitem__(self, key, value):
+        self.local[key] = value
+        if self.writes_through:
+            self.store.add(key, value)
+            return
+        self.pending[key] = value
+        if len(self.pending) >= settings.CallCacheWriteBack:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered values to the shared store, in one transaction."""
+        if self.pending and os.getpid() == self.pid:  # values buffered before a fork are written by the parent
+            set_many(self.store, self.pending.items())
+            self.pending = {}
+
+    def __len__(self):
+        self.flush()
+        return len(self.store)
@@ -1,9 +1,56 @@
+import atexit
 import diskcache
 import functools
 import inspect
 import hashlib
+import os
 import pickle
 
+from .point_fingerprints import key_component
+
+
+# Open diskcache.Cache handles, one per (process, directory, size limit). Constructing a Cache opens a SQLite
+# connection and checks the schema, so handles are reused across accesses. Handles inherited through fork are
+# not reused (nor closed) by the child, which opens its own.
+
+_cache_handles = {}
+
+
+def cache_handle(directory, size_limit_in_gb=32):
+    """Process-wide diskcache.Cache for the directory."""
+    key = (os.getpid(), str(directory), size_limit_in_gb)
+    if key not in _cache_handles:
+        for stale_key in [stale_key for stale_key in _cache_handles if stale_key[0] != key[0]]:
+            del _cache_handles[stale_key]
+        _cache_handles[key] = diskcache.Cache(directory=directory, size_limit=size_limit_in_gb * 2 ** 30)
+    return _cache_handles[key]
+
+
+@atexit.register
+def close_cache_handles():
+    for key in [key for key in _cache_handles if key[0] == os.getpid()]:
+        _cache_handles.pop(key).close()
+
+
+def get_many(store, keys, default=None):
+    """Values of many keys, read in a single transaction."""
+    with store.transact():
+        return [store.get(key, default) for key in keys]
+
+
+def set_many(store, items):
+    """Writes many (key, value) pairs in a single transaction, keeping existing entries (as Cache.add)."""
+    with store.transact():
+        for key, value in items:
+            store.add(key, value)
+
+
+def cache_key(args, kwargs):
+    """SHA-256 hash of the serialized (cleaned) args and kwargs, with phase space points replaced by their fingerprints."""
+    args = tuple(key_component(arg) for arg in args)
+    kwargs = frozenset((key, key_component(value)) for key, value in kwargs.items())
+    return hashlib.sha256(pickle.dumps((args, kwargs))).hexdigest()
+
 
 class DiskCached(object):
     """DiskCache interface to Object."""
@@ -15,10 +62,7 @@ class DiskCached(object):
     def diskcache(self):
         if self.CACHE_PATH is None:
             raise ValueError("CACHE_PATH is not set for DiskCached.")
-        return diskcache.Cache(
-            directory=self.CACHE_PATH,
-            size_limit=self.DISKCACHE_SIZE_LIMIT_IN_GB * 2 ** 30
-        )
+        return cache_handle(self.CACHE_PATH, self.DISKCACHE_SIZE_LIMIT_IN_GB)
 
     def summarize_diskcache(self, print_warnings=False):
         """Summarizes the status of the diskcache."""
@@ -70,12 +114,10 @@ class DiskCached(object):
                 if verbose:
                     print("Evaluating with cache")
 
-                # Compute SHA-256 hash of the serialized cleaned args and kwargs
-                cache_key_raw = (tuple(cleaned_args), frozenset(cleaned_kwargs.items()))
-                cache_key_bytes = pickle.dumps(cache_key_raw)
-                cache_key_hash = hashlib.sha256(cache_key_bytes).hexdigest()
+                cache_key_hash = cache_key(cleaned_args, cleaned_kwargs)
+                store = self.diskcache
 
-                result = self.diskcache.get(cache_key_hash)
+                result = store.get(cache_key_hash)
                 if result is not None:
                     if verbose:
                         print("Read from cache")
@@ -84,7 +126,7 @@ class DiskCached(object):
                 if verbose:
                     print("Computing from scratch")
                 result = func(*args, **kwargs)
-                self.diskcache.add(cache_key_hash, result)
+                store.add(cache_key_hash, result)
                 return result
 
             return wrapper
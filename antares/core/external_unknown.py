@@ -0,0 +1,207 @@
+import atexit
+import itertools
+import json
+import os
+import subprocess
+import threading
+import mpmath
+
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from pyadic import ModP
+
+from .settings import settings
+from .numerical_methods import Numerical_Methods
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# Protocol: the external evaluator is a long-lived process reading one JSON request per line on stdin,
+#     {"id": 0, "points": [point, ...]},
+# and writing one JSON response per line on stdout, in any order,
+#     {"id": 0, "results": [result, ...]}   or   {"id": 0, "error": "message"}.
+# By default a point is {"field": "...", "spinors": [[[λ0, λ1], [λ̃0, λ̃1]], ...]}, one entry per particle, and
+# numbers are strings: "n" in a finite field, ["re", "im"] otherwise (results alike, or plain JSON numbers).
+# Requests are pipelined: several may be outstanding per worker, each holding a batch of points.
+
+
+def encode_number(number):
+    if isinstance(number, ModP):
+        return str(int(number))
+    number = mpmath.mpc(number)
+    return [str(number.real), str(number.imag)]
+
+
+def encode_point(oParticles):
+    if not all(oParticle.is_massless for oParticle in oParticles):
+        raise NotImplementedError("encode_point supports massless particles only, pass encode_point to ExternalUnknown for massive kinematics.")
+    return {"field": str(oParticles.field),
+            "spinors": [[[encode_number(oParticle.r_sp_d[0, 0]), encode_number(oParticle.r_sp_d[1, 0])],
+                         [encode_number(oParticle.l_sp_d[0, 0]), encode_number(oParticle.l_sp_d[0, 1])]] for oParticle in oParticles]}
+
+
+def decode_result(result, field):
+    if field.name == "finite field":
+        return ModP(int(result), field.characteristic)
+    return mpmath.mpc(*result) if isinstance(result, list) else mpmath.mpc(result)
+
+
+class ExternalWorker(object):
+    """One evaluator process; responses are read by a background thread and resolve the futures of the requests."""
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+        self.futures = {}
+        self.failed_request_ids = set()
+        self.write_lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read_responses, daemon=True)
+        self.reader.start()
+
+    def submit(self, request_id, points):
+        future = Future()
+        self.futures[request_id] = future  # before writing: the response may arrive at any time after
+        try:
+            with self.write_lock:
+                self.process.stdin.write(json.dumps({"id": request_id, "points": points}) + "\n")
+                self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            self.futures.pop(request_id, None)
+            raise RuntimeError(f"External evaluator exited with code {self.process.poll()}.")
+        return future
+
+    def _read_responses(self):
+        for line in self.process.stdout:
+            try:
+                response = json.loads(line)
+                if response["id"] in self.failed_request_ids:  # late response to a request failed below
+                    self.failed_request_ids.discard(response["id"])
+                    continue
+                if "error" not in response and not isinstance(response["results"], list):
+                    raise ValueError("results is not a list")
+                future = self.futures.pop(response["id"])
+                if "error" in response:
+                    future.set_exception(RuntimeError(f"External evaluator error: {response['error']}"))
+                else:
+                    future.set_result(response["results"])
+            except Exception as e:
+                # out of sync with the evaluator: fail all outstanding requests rather than leave them waiting
+                for request_id in list(self.futures):
+                    self.failed_request_ids.add(request_id)
+                    self.futures.pop(request_id).set_exception(RuntimeError(f"Invalid response from external evaluator ({e!r}): {line!r}"))
+        returncode = self.process.wait()
+        for request_id in list(self.futures):
+            self.futures.pop(request_id).set_exception(RuntimeError(f"External evaluator exited with code {returncode}."))
+
+    def kill(self):
+        """Stops an unresponsive evaluator; its outstanding requests fail."""
+        self.process.kill()
+        self.close()
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.reader.join()
+
+
+class ExternalWorkerPool(object):
+    """Long-lived evaluator processes; each request goes to the worker with fewest outstanding requests."""
+
+    def __init__(self, command, nbr_workers):
+        self.pid = os.getpid()
+        self.command = command
+        self.request_ids = itertools.count()
+        self.workers = [ExternalWorker(command) for _ in range(nbr_workers)]
+
+    def submit(self, points):
+        worker = min(self.workers, key=lambda worker: len(worker.futures))
+        return worker.submit(next(self.request_ids), points)
+
+    def restart(self, future):
+        """Replaces the worker holding the unresolved future (e.g. hung past the timeout) by a new one."""
+        for i, worker in enumerate(self.workers):
+            if any(pending is future for pending in list(worker.futures.values())):
+                worker.kill()
+                self.workers[i] = ExternalWorker(self.command)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+
+
+_worker_pools = []
+
+
+@atexit.register
+def close_worker_pools():
+    for oPool in _worker_pools:
+        if oPool.pid == os.getpid():
+            oPool.close()
+    _worker_pools.clear()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+class ExternalUnknown(Numerical_Methods, object):
+    """Black box evaluated by an external program (see the protocol above), kept running in a pool of worker processes.
+       The pool is started on first use, per process, and closed at exit or by close()."""
+
+    def __init__(self, command, multiplicity, name=None, internal_masses=None, nbr_workers=None, batch_size=16, timeout=600,
+                 encode_point=encode_point, decode_result=decode_result):
+        self.command = list(command)
+        self.multiplicity = multiplicity
+        self.__name__ = name if name is not None else os.path.basename(self.command[-1])
+        if internal_masses is not None:
+            self.internal_masses = internal_masses
+        self.nbr_workers = nbr_workers if nbr_workers is not None else settings.Cores
+        self.batch_size = batch_size
+        self.timeout = timeout  # seconds to wait for each batch, None for no limit
+        self.encode_point = encode_point
+        self.decode_result = decode_result
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None or self._pool.pid != os.getpid():
+            self._pool = ExternalWorkerPool(self.command, self.nbr_workers)
+            _worker_pools.append(self._pool)
+        return self._pool
+
+    def __call__(self, oParticles):
+        return self.evaluate_many([oParticles])[0]
+
+    def evaluate_many(self, points):
+        """Values at many points: batches of batch_size points are submitted to all workers at once, then collected."""
+        points = list(points)
+        batches = [points[i:i + self.batch_size] for i in range(0, len(points), self.batch_size)]
+        futures = [self.pool.submit([self.encode_point(oParticles) for oParticles in batch]) for batch in batches]
+        results = []
+        for batch, future in zip(batches, futures):
+            try:
+                batch_results = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                self.pool.restart(future)  # do not leave the request pending, nor a hung worker in the pool
+                raise TimeoutError(f"External evaluator gave no response within {self.timeout} seconds, its worker was restarted.")
+            if len(batch_results) != len(batch):
+                raise RuntimeError(f"External evaluator returned {len(batch_results)} results for {len(batch)} points.")
+            results += [self.decode_result(result, oParticles.field) for result, oParticles in zip(batch_results, batch)]
+        return results
+
+    def close(self):
+        if self._pool is not None and self._pool.pid == os.getpid():
+            self._pool.close()
+            _worker_pools.remove(self._pool)
+        self._pool = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_pool"] = None
+        return state
@@ -0,0 +1,80 @@
+import functools
+import numpy
+
+from lips import Particles
+from syngular import Field
+
+from pycoretools import NaI
+
+from .numerical_methods import discrete_log, discrete_log_table
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# Mass dimension and phase weights of invariants, computed once per (multiplicity, invariant) in a finite field,
+# with the same rescalings as Numerical_Methods. Weights of monomials follow by summing exponents times weights.
+
+WEIGHTS_FIELD = Field("finite field", 2 ** 31 - 1, 1)
+WEIGHTS_Z = 3  # do not use 2! Different (small) powers have same values in finite fields.
+
+
+@functools.lru_cache(maxsize=None)
+def weights_lParticles(multiplicity):
+    """Base point, point with all spinors rescaled by z (mass dimension) and points with particles 1 to n rescaled
+    by z, 1 / z one after the other (phase weights)."""
+    oParticles = Particles(multiplicity, field=WEIGHTS_FIELD, seed=0)
+    oRescaledParticles = oParticles.copy()
+    for oParticle in oRescaledParticles:
+        oParticle.r_sp_u = oParticle.r_sp_u * WEIGHTS_Z
+        oParticle.l_sp_u = oParticle.l_sp_u * WEIGHTS_Z
+    lParticles = [oParticles.copy(), oRescaledParticles]
+    for oParticle in oParticles:
+        oParticle.r_sp_u = oParticle.r_sp_u * WEIGHTS_Z
+        oParticle.l_sp_u = oParticle.l_sp_u / WEIGHTS_Z
+        lParticles += [oParticles.copy()]
+    return tuple(lParticles)
+
+
+class InvariantWeights(dict):
+    """Maps invariants to (mass dimension, phase weights), or to None if they can not be determined (e.g. non uniform weights)."""
+
+    def __init__(self, multiplicity):
+        dict.__init__(self)
+        self.multiplicity = multiplicity
+
+    def __missing__(self, invariant):
+        self[invariant] = self._compute(invariant)
+        return self[invariant]
+
+    def _compute(self, invariant):
+        try:
+            values = [oParticles(invariant) for oParticles in weights_lParticles(self.multiplicity)]
+        except Exception:  # e.g. masses, which are not defined at massless points
+            return None
+        if any(isinstance(value, numpy.ndarray) or value == 0 for value in values):
+            return None
+        table = discrete_log_table(WEIGHTS_FIELD.characteristic, WEIGHTS_Z)
+        twice_mass_dimension = discrete_log(values[1] / values[0], table)
+        phase_weights = tuple(discrete_log(after / before, table) for before, after in zip([values[0]] + values[2:-1], values[2:]))
+        if any(weight is NaI for weight in (twice_mass_dimension, ) + phase_weights) or twice_mass_dimension % 2 != 0:
+            return None
+        return (twice_mass_dimension // 2, phase_weights)
+
+
+@functools.lru_cache(maxsize=None)
+def invariant_weights(multiplicity):
+    """Process-wide table of InvariantWeights per multiplicity."""
+    return InvariantWeights(multiplicity)
+
+
+@functools.lru_cache(maxsize=2 ** 16)
+def monomial_weights(multiplicity, invs, exps):
+    """(mass dimension, phase weights) of the monomial with invariants invs (a tuple) raised to exps, None if not determined."""
+    table = invariant_weights(multiplicity)
+    mass_dimension, phase_weights = 0, (0, ) * multiplicity
+    for inv, exp in zip(invs, exps):
+        if table[inv] is None:
+            return None
+        mass_dimension += exp * table[inv][0]
+        phase_weights = tuple(pw + exp * inv_pw for pw, inv_pw in zip(phase_weights, table[inv][1]))
+    return (mass_dimension, phase_weights)
@@ -0,0 +1,56 @@
+import functools
+
+from lips.invariants import Invariants
+
+from .settings import settings
+
+
+INVARIANT_FAMILIES = ("invs_2", "invs_3", "invs_4", "invs_5", "invs_s", "invs_D", "invs_O", "invs_P", "invs_tr5")
+
+
+class IndexedInvariants(object):
+    """lips Invariants with derived lookups: full_index (position in full, as a dict) and membership sets
+    (full_set, invs_2_set, invs_3_set, ...). List attributes are returned as copies, so callers may modify them."""
+
+    def __init__(self, oInvariants):
+        self._oInvariants = oInvariants
+        self._full = tuple(oInvariants.full)
+        self.full_index = {}
+        for i, invariant in enumerate(self._full):
+            self.full_index.setdefault(invariant, i)
+        self.full_set = frozenset(self._full)
+        for family in INVARIANT_FAMILIES:
+            setattr(self, f"{family}_set", frozenset(getattr(oInvariants, family)))
+
+    @property
+    def full(self):
+        return list(self._full)
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "_oInvariants":
+            raise AttributeError(name)
+        value = getattr(self._oInvariants, name)
+        return list(value) if isinstance(value, list) else value
+
+    def index(self, invariant, default=None):
+        """Position of invariant in full, default if not present."""
+        return self.full_index.get(invariant, default)
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_invariants(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets):
+    return IndexedInvariants(Invariants(multiplicity, Restrict3Brackets=Restrict3Brackets, Restrict4Brackets=Restrict4Brackets,
+                                        FurtherRestrict4Brackets=FurtherRestrict4Brackets))
+
+
+def cached_invariants(multiplicity, Restrict3Brackets=None, Restrict4Brackets=None, FurtherRestrict4Brackets=None):
+    """Process-wide registry of IndexedInvariants, one per (multiplicity, restriction flags).
+    Flags default to those in settings at call time, so changing settings selects a different entry."""
+    return _cached_invariants(multiplicity,
+                              settings.Restrict3Brackets if Restrict3Brackets is None else Restrict3Brackets,
+                              settings.Restrict4Brackets if Restrict4Brackets is None else Restrict4Brackets,
+                              settings.FurtherRestrict4Brackets if FurtherRestrict4Brackets is None else FurtherRestrict4Brackets)
+
+
+def cached_full_set(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets):
+    return _cached_invariants(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets).full_set
@@ -0,0 +1,76 @@
+from .call_cache import call_cache
+from .numerical_methods import Numerical_Methods
+from .point_fingerprints import point_fingerprint
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+class MultiOutputUnknown(Numerical_Methods, object):
+    """Black box returning many related outputs (a sequence or a dict) per phase space point, e.g. all coefficients of an amplitude.
+       All outputs are cached together by point fingerprint; self[key] is a callable for one output, usable as an Unknown.
+       With a call_cache_path (specific to this black box) the cache is shared across processes and runs, see core.call_cache."""
+
+    def __init__(self, evaluator, multiplicity, name=None, internal_masses=None, call_cache_path=None):
+        self.evaluator = evaluator
+        self.multiplicity = multiplicity
+        self.__name__ = name if name is not None else getattr(evaluator, "__name__", "MultiOutputUnknown")
+        if internal_masses is not None:
+            self.internal_masses = internal_masses
+        self.call_cache_path = call_cache_path
+        self.get_call_cache()
+        self.nbr_evaluations = 0
+
+    def __call__(self, oParticles):
+        key = point_fingerprint(oParticles)
+        if key in self.dCallCache:
+            return self.dCallCache[key]
+        outputs = self.evaluator(oParticles)
+        outputs = dict(outputs) if isinstance(outputs, dict) else tuple(outputs)
+        self.nbr_evaluations += 1
+        self.dCallCache[key] = outputs
+        return outputs
+
+    def __getitem__(self, key):
+        return MultiOutputComponent(self, key)
+
+    def components(self, oParticles):
+        """All outputs as Unknown-compatible callables; the keys (or length) are read off an evaluation at oParticles."""
+        outputs = self(oParticles)
+        return {key: self[key] for key in outputs} if isinstance(outputs, dict) else [self[i] for i in range(len(outputs))]
+
+    def get_call_cache(self):
+        self.dCallCache = call_cache(self.call_cache_path) if self.call_cache_path is not None else {}
+
+    def save_call_cache(self):
+        if hasattr(self.dCallCache, "flush"):
+            self.dCallCache.flush()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["dCallCache"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.get_call_cache()
+
+
+class MultiOutputComponent(Numerical_Methods, object):
+    """One output of a MultiOutputUnknown."""
+
+    def __init__(self, oMultiOutputUnknown, key):
+        self.oMultiOutputUnknown = oMultiOutputUnknown
+        self.key = key
+        self.__name__ = "{}/{}".format(oMultiOutputUnknown.__name__, key)
+        self.internal_masses = oMultiOutputUnknown.internal_masses
+
+    @property
+    def multiplicity(self):
+        return self.oMultiOutputUnknown.multiplicity
+
+    def __call__(self, oParticles):
+        return self.oMultiOutputUnknown(oParticles)[self.key]
+
+    def save_call_cache(self):
+        self.oMultiOutputUnknown.save_call_cache()
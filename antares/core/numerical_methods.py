@@ -1,6 +1,7 @@
 # Author: Giuseppe
 
 import os
+import diskcache
 import functools
 import operator
 import pandas
@@ -13,7 +14,6 @@ from fractions import Fraction as Q
 from pycoretools import NaI, mapThreads
 
 from lips import Particles
-from lips.invariants import Invariants
 from lips.symmetries import phase_weights_compatible_symmetries
 
 from syngular import Field
@@ -25,6 +25,8 @@ from pyadic.padic import padic_log
 
 from ..scalings.pair import pair_scalings
 from .settings import settings
+from .invariants import cached_invariants
+from .point_fingerprints import key_component
 
 local_directory = os.path.dirname(os.path.abspath(__file__))
 mpmath.mp.dps = 300
@@ -115,6 +117,21 @@ def regulated_division(x, y):
     return 1 if x == y else x / y
 
 
+@functools.lru_cache(maxsize=None)
+def discrete_log_table(characteristic, z, search_start=-500, search_stop=500):
+    """Dictionary from z ** k mod characteristic to k, for k in [search_start, search_stop)."""
+    table = {int(ModP(Q(z) ** k, characteristic)): k for k in range(search_start, search_stop)}
+    assert len(table) == search_stop - search_start  # there should be no duplicates (like e.g. for z = 2)
+    return table
+
+
+def discrete_log(ratio, table):
+    """Exponent k such that ratio == z ** k, looked up in a discrete_log_table; NaI if not found. Scalars or arrays."""
+    if not isinstance(ratio, numpy.ndarray):
+        return table.get(int(ratio), NaI)
+    return numpy.array([table.get(int(entry), NaI) for entry in ratio.flat], dtype=object).reshape(ratio.shape)
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
 
@@ -147,17 +164,24 @@ class Numerical_Methods:
         return float(rationalise(int(padic_log(ratio, z ** 2)), settings.field.characteristic ** settings.field.digits))
 
     @staticmethod
-    @composed(as_scalar_if_scalar, numpy_vectorized(excluded=[1, 2]))
-    def finite_field_mass_dimension(ratio, search_range, powers):
-        if int(ratio) not in search_range:
+    @as_scalar_if_scalar
+    def finite_field_mass_dimension(ratio, z):
+        twice_mass_dimension = discrete_log(ratio, discrete_log_table(settings.field.characteristic, z))
+        if any(entry is NaI for entry in numpy.ravel(twice_mass_dimension)):
             raise ValueError("Mass dimension not found in search range.")
-        return powers[search_range.index(int(ratio))]
+        return numpy.array(twice_mass_dimension, dtype=float) / 2
+
+    def _evaluate_on_points(self, lParticles):
+        """Values at each point, through a single batched evaluate_many call where available."""
+        if hasattr(self, "evaluate_many") and not any(hasattr(oP, 'left_spin_index') for oP in lParticles[0]):
+            return list(self.evaluate_many(lParticles))
+        return [self(oParticles) for oParticles in lParticles]
 
     @property
     def mass_dimension(self):
         """Returns the mass (a.k.a. energy) dimension. The value is expected to be a (half-)integer. Return type is float, vectorized depending on input."""
         oParticles = Particles(self.multiplicity, field=settings.field, seed=0, internal_masses=self.internal_masses)
-        before = self(oParticles.copy())
+        lParticles = [oParticles.copy()]
         z = 3  # do not use 2! Different (small) powers have same values in finite fields.
         for oParticle in oParticles:
             oParticle.r_sp_u = oParticle.r_sp_u * z
@@ -165,17 +189,13 @@ class Numerical_Methods:
         for internal_mass in oParticles.internal_masses:
             mass_pow = int(internal_mass[-1]) if internal_mass[-1].isdigit() else 1
             oParticles.__setattr__(internal_mass, getattr(oParticles, internal_mass) * z ** 2 ** mass_pow)
-        after = self(oParticles)
+        before, after = self._evaluate_on_points(lParticles + [oParticles])
         if settings.field.name == "mpc":
             mass_dimension = self.mpc_mass_dimension(regulated_division(after, before), z)
         elif settings.field.name == "padic" and settings.field.digits > 1:
             mass_dimension = self.padic_mass_dimension(regulated_division(after, before), z)
         elif settings.field.name in ["padic", "finite field"]:
-            search_start, search_stop = -500, 500
-            powers = [entry / 2 for entry in range(search_start, search_stop, 1)]
-            search_range = [int(ModP(Q(z) ** int(2 * power), settings.field.characteristic)) for power in powers]
-            assert len(search_range) == len(set(search_range))  # there should be no duplicates (like e.g. for z = 2)
-            mass_dimension = self.finite_field_mass_dimension(regulated_division(after, before), search_range, powers)
+            mass_dimension = self.finite_field_mass_dimension(regulated_division(after, before), z)
         return mass_dimension
 
     @staticmethod
@@ -202,12 +222,9 @@ class Numerical_Methods:
         return int(rationalise(int(padic_log(ratio, z)), settings.field.characteristic ** settings.field.digits))
 
     @staticmethod
-    @composed(as_scalar_if_scalar, numpy_vectorized(excluded=[1, 2]))
-    def finite_field_phase_weight(ratio, search_range, powers):
-        if int(ratio) not in search_range:
-            return NaI
-            raise ValueError("Phase weight not found in search range.")
-        return powers[search_range.index(int(ratio))]
+    @as_scalar_if_scalar
+    def finite_field_phase_weight(ratio, z):
+        return discrete_log(ratio, discrete_log_table(settings.field.characteristic, z))
 
     @property
     def phase_weights(self):
@@ -216,23 +233,21 @@ class Numerical_Methods:
             return self._phase_weights
         else:
             oParticles = Particles(self.multiplicity, field=settings.field, seed=0, internal_masses=self.internal_masses)
-            phase_weights = []
+            lParticles = [oParticles.copy()]
             z = 3  # do not use 2! Different (small) powers have same values in finite fields.
-            if settings.field.name in ["padic", "finite field"]:
-                search_start, search_stop = -100, 100
-                powers = range(search_start, search_stop, 1)
-                search_range = [int(ModP(Q(z) ** power, settings.field.characteristic)) for power in powers]
-            for oParticle in oParticles:
-                before = self(oParticles.copy())
+            for oParticle in oParticles:  # particles are rescaled one at a time, consecutive points differ by one particle
                 oParticle.r_sp_u = oParticle.r_sp_u * z
                 oParticle.l_sp_u = oParticle.l_sp_u / z
-                after = self(oParticles)
+                lParticles += [oParticles.copy()]
+            values = self._evaluate_on_points(lParticles)
+            phase_weights = []
+            for before, after in zip(values, values[1:]):
                 if settings.field.name == "mpc":
                     temp_p_w = self.mpc_phase_weight(regulated_division(after, before), z)
                 elif settings.field.name == "padic" and settings.field.digits > 1:
                     temp_p_w = self.padic_phase_weight(regulated_division(after, before), z)
                 elif settings.field.name in ["padic", "finite field"]:
-                    temp_p_w = self.finite_field_phase_weight(regulated_division(after, before), search_range, powers)
+                    temp_p_w = self.finite_field_phase_weight(regulated_division(after, before), z)
                 phase_weights += [temp_p_w]
             phase_weights = numpy.moveaxis(numpy.array(phase_weights), 0, -1)
             if len(phase_weights.shape) == 1:
@@ -343,8 +358,7 @@ class Numerical_Methods:
 
         # Choose the variables
         if invariants is None:
-            oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                     Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+            oInvariants = cached_invariants(self.multiplicity)
             if settings.SingleScalingsUse4Brackets is True:
                 invariants = oInvariants.full
             else:
@@ -427,10 +441,16 @@ def memoized(*decorator_args, **decorator_kwargs):
             if not hasattr(self, 'diskcache'):
                 return func(*args, **kwargs)
 
-            @self.diskcache.memoize(*decorator_args, **decorator_kwargs)
-            def diskcached_func(*args, **kwargs):
-                return func(*args, **kwargs)
-            return diskcached_func(*args, **kwargs)
+            # as diskcache.Cache.memoize, but with phase space points keyed by their fingerprints
+            ignore = decorator_kwargs.get('ignore', set())
+            key = ((decorator_kwargs.get('name', func.__qualname__), ) +
+                   tuple(key_component(arg) for i, arg in enumerate(args) if i not in ignore) +
+                   tuple((kw, key_component(value)) for kw, value in sorted(kwargs.items()) if kw not in ignore))
+            result = self.diskcache.get(key, default=diskcache.ENOVAL)
+            if result is diskcache.ENOVAL:
+                result = func(*args, **kwargs)
+                self.diskcache.set(key, result)
+            return result
         return wrapper
     return memoized_decorator
 
@@ -540,8 +560,11 @@ class _tensor_function(object):
 
 class tensor_function(Numerical_Methods, _tensor_function):
 
-    def univariate_Thiele_on_slice(self, oSlice, verbose=False):
-        from ..scalings.slicing import univariate_Thiele_on_slice
+    def on_slice(self, oSlice):
+        """Components of the tensor function as functions of t on the slice. The whole tensor is evaluated once per
+        sample of t (blocks of samples in parallel with settings.SlicesUseParallelisation), and the per-component
+        interpolations, which run one after the other on the same t sequence, read their values from the shared samples."""
+        from ..scalings.slice_evaluation import BatchedSliceFunction
         try:
             len(self)
         except AttributeError:
@@ -549,31 +572,27 @@ class tensor_function(Numerical_Methods, _tensor_function):
             oPoint = oSlice.copy()
             oPoint.subs({'t': 0})
             self(oPoint)
-        return mapThreads(lambda i: univariate_Thiele_on_slice(self[i], oSlice, verbose=False),
-                          range(len(self)), verbose=verbose,
-                          UseParallelisation=settings.UseParallelisation, Cores=settings.Cores)
+        oSamples = BatchedSliceFunction(self, oSlice, seed=0, UseParallelisation=settings.SlicesUseParallelisation)
+        return [oSamples[i] for i in range(len(self))]
+
+    def univariate_Thiele_on_slice(self, oSlice, verbose=False):
+        from ..scalings.slicing import univariate_Thiele_on_slice
+        return [univariate_Thiele_on_slice(oComponent, oSlice, verbose=False) for oComponent in self.on_slice(oSlice)]
 
     def univariate_Thiele_on_slice_given_LCDs(self, lTerms, oSlice, verbose=False):
         from ..scalings.slicing import univariate_Thiele_on_slice_given_LCD
-        try:
-            len(self)
-        except AttributeError:
-            # evaluate it once in case the length is not known
-            oPoint = oSlice.copy()
-            oPoint.subs({'t': 0})
-            self(oPoint)
+        lComponents = self.on_slice(oSlice)
         assert len(self) == len(lTerms), f"Length of tensor_function (self) and list of Terms are expected to be the same, got {len(self)} and {len(lTerms)}."
-        return mapThreads(
-            lambda i: univariate_Thiele_on_slice_given_LCD(self[i], lTerms[i], oSlice, verbose=verbose),
-            range(len(self)), verbose=verbose, UseParallelisation=settings.UseParallelisation, Cores=settings.Cores
-        )
+        return [univariate_Thiele_on_slice_given_LCD(oComponent, oTerms, oSlice, verbose=verbose) for oComponent, oTerms in zip(lComponents, lTerms)]
 
     def get_lcds(self, oSlice, oSlice_for_invariants=None, verbose=False):
-        from ..scalings.slicing import get_invariant_dict, do_codimension_one_study
+        from ..scalings.slicing import get_invariant_dict, codimension_one_study_of_rational_function
         if oSlice_for_invariants is None:
             oSlice_for_invariants = oSlice
         get_invariant_dict(tuple(settings.invariants), oSlice_for_invariants, )  # cache invariants
+        rat_funcs_t = self.univariate_Thiele_on_slice(oSlice)
         return mapThreads(
-            lambda i: do_codimension_one_study(self[i], oSlice, settings.invariants, oSlice_for_invariants=oSlice_for_invariants, assert_factors=True, verbose=False, ),
+            lambda i: codimension_one_study_of_rational_function(rat_funcs_t[i], oSlice, settings.invariants, oSlice_for_invariants=oSlice_for_invariants,
+                                                                 assert_factors=True, verbose=False, ),
             range(len(self)), verbose=verbose, UseParallelisation=settings.UseParallelisation, Cores=settings.Cores
         )
@@ -0,0 +1,97 @@
+import collections
+import functools
+import hashlib
+
+from lips import Particles
+from pyadic import ModP
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# Fingerprints identify phase space points in cache keys: a 128-bit digest of the field and of the spinor components
+# (the same data as Particles.__hash__), stable across processes and runs. The fingerprint is stored on the point
+# together with the entries it was computed from, and recomputed if the point was mutated. Entries are compared by
+# identity first (lips setters replace the arrays, in place updates such as subs replace the entries), so a cached
+# lookup does not hash the point.
+
+
+def _canonical_entry(entry):
+    if isinstance(entry, ModP):
+        return f"{entry.n}%{entry.p}"
+    if hasattr(entry, "_mpc_"):  # mpmath: exact binary mantissas and exponents, no conversion to decimal
+        return repr(entry._mpc_)
+    if hasattr(entry, "_mpf_"):
+        return repr(entry._mpf_)
+    return repr(entry)
+
+
+def _canonical_particle(oParticle):
+    if oParticle.is_massless:
+        arrays = (oParticle.r_sp_d, oParticle.l_sp_d)
+    else:
+        arrays = (oParticle.r2_sp, oParticle.r_sp_d, oParticle.l_sp_d)
+    return ";".join("None" if array is None else ",".join(map(_canonical_entry, array.flatten())) for array in arrays)
+
+
+def _point_entries(oParticles):
+    """The objects the fingerprint is computed from, to tell whether the point changed since."""
+    entries = [oParticles.field]
+    for oParticle in oParticles:
+        for array in (oParticle.r2_sp, oParticle.r_sp_d, oParticle.l_sp_d):  # not is_massless, which computes the mass
+            if array is None:
+                entries.append(None)
+            else:
+                entries.extend(array.flat)
+    entries += [getattr(oParticles, internal_mass) for internal_mass in sorted(getattr(oParticles, "internal_masses", ()))]
+    return entries
+
+
+def _unchanged(entries, cached_entries):
+    return len(entries) == len(cached_entries) and all(entry is cached_entry or entry == cached_entry
+                                                       for entry, cached_entry in zip(entries, cached_entries))
+
+
+def point_fingerprint(oParticles):
+    """Stable 128-bit hex digest of the phase space point, cached on the point until it is mutated."""
+    entries = _point_entries(oParticles)
+    cached = getattr(oParticles, "_point_fingerprint", None)
+    if cached is not None and _unchanged(entries, cached[0]):
+        oParticles._point_fingerprint = (entries, cached[1])  # e.g. a copy: compare by identity from now on
+        return cached[1]
+    content = [str(oParticles.field)] + [_canonical_particle(oParticle) for oParticle in oParticles]
+    content += [f"{internal_mass}={_canonical_entry(getattr(oParticles, internal_mass))}"
+                for internal_mass in sorted(getattr(oParticles, "internal_masses", ()))]
+    fingerprint = hashlib.blake2b("|".join(content).encode(), digest_size=16).hexdigest()
+    oParticles._point_fingerprint = (entries, fingerprint)
+    return fingerprint
+
+
+def key_component(arg):
+    """Phase space points (or caches of invariants at a point, with an oParticles attribute) by fingerprint, anything else as is."""
+    if isinstance(arg, Particles):
+        return ("Particles", point_fingerprint(arg))
+    if isinstance(getattr(arg, "oParticles", None), Particles):
+        return ("Particles", point_fingerprint(arg.oParticles))
+    return arg
+
+
+def lru_cache_on_points(maxsize=128):
+    """As functools.lru_cache for methods of a single phase space point argument, keyed on the point fingerprint."""
+    def decorator(func):
+        cache = collections.OrderedDict()
+
+        @functools.wraps(func)
+        def wrapper(self, oParticles):
+            key = (self, key_component(oParticles))
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            result = func(self, oParticles)
+            cache[key] = result
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
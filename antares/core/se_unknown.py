@@ -30,6 +30,7 @@ def upload_mom_conf_joe(oParticles):
 
 
 class SEUnknown(object):
+    """Starts a new Mathematica process per point; see core.external_unknown.ExternalUnknown for persistent workers."""
 
     def __init__(self, se_arguement):
         self.argument = se_arguement
@@ -34,6 +34,10 @@ class Settings(object):
         self.BHsettings = "USE_KNOWN_FORMULAE no \n SET_ALL_RAT_TO_ZERO no"
         self.UseParallelisation = True
         self.Cores = 6
+        self.CallCacheWriteBack = 64  # evaluations buffered per process before writing to the shared call cache, see core.call_cache
+        self.SlicesUseParallelisation = False  # evaluate blocks of slice samples in a process pool, see scalings.slice_evaluation
+        self.InvariantFactorisationsUseCache = True  # persist invariants factorised on slices, see scalings.invariant_factorisations
+        self.SlicesSparseInterpolation = True  # multivariate slices: sparse (Zippel) instead of dense Newton interpolation
         self.gmp_precision = 1024
         self.to_int_prec = "1e-6"
         self.LoggingLevel = "logging.WARNING"
@@ -41,10 +45,16 @@ class Settings(object):
 
         # Collinear Limits
         self.DoScalings = True
-        self.SingleScalingsUseCache = False
+        self.SingleScalingsUseCache = False  # persist single scalings, see scalings.single.single_scalings
+        self.SingleScalingsTimeout = None  # seconds per invariant, None for no limit; SIGALRM based, main thread only (see core.tools.time_limit)
         self.ScalingsIterationsStart = 28
         self.ScalingsIterationsNumber = 2
         self.ScalingsMaxNumberOfFailes = 5
+        self.ScalingsAdaptive = False  # mpc only: adaptive depth and precision, see scalings.adaptive
+        self.ScalingsAdaptiveStart = 10  # first depth, i.e. invariant ~ 10 ^ -10
+        self.ScalingsAdaptiveStep = 5
+        self.ScalingsAdaptiveMaxPoints = 6
+        self.ScalingsAdaptiveDigits = (30, 300)  # min and max working precision
         self.SingleScalingsUse4Brackets = True
         self.Restrict3Brackets = True  # Restrict 3Brackets to neighbouring ones
         self.Restrict4Brackets = True  # Restrict 4Brackets to neighbouring ones
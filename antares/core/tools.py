@@ -11,6 +11,7 @@ import os
 import subprocess
 import re
 import shelve
+import signal
 import math
 import time
 import random
@@ -179,6 +180,32 @@ class nullcontext(object):
         pass
 
 
+class time_limit(object):
+    """Raises TimeoutError if the body takes longer than seconds (no limit if None). Relies on SIGALRM, so a limit can only
+    be enforced in the main thread of a process (e.g. of mapThreads worker processes, not threads), on platforms with
+    setitimer; elsewhere it raises RuntimeError rather than silently not enforcing it."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.active = seconds is not None
+        if self.active and not (hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()):
+            raise RuntimeError(f"Time limit of {seconds} seconds can not be enforced: SIGALRM requires the main thread and setitimer.")
+
+    def _handler(self, signum, frame):
+        raise TimeoutError(f"Time limit of {self.seconds} seconds exceeded.")
+
+    def __enter__(self):
+        if self.active:
+            self.previous_handler = signal.signal(signal.SIGALRM, self._handler)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *excinfo):
+        if self.active:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous_handler)
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
 
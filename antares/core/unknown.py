@@ -15,11 +15,13 @@ from copy import deepcopy
 
 from lips import Particles
 
-from lips.invariants import Invariants
 from pycoretools import flatten
 
 from .bh_unknown import BHUnknown
+from .multi_output_unknown import MultiOutputComponent
+from .external_unknown import ExternalUnknown
 from .settings import settings
+from .invariants import cached_invariants
 from .tools import generate_latex_and_pdf, forbidden_ordering
 from .numerical_methods import Numerical_Methods
 
@@ -142,23 +144,26 @@ class Unknown(Numerical_Methods, object):
             lInvariants = self.den_invs
         if dExponents is None:
             dExponents = self.den_exps
-        oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                 Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
-        spurious_poles = self.spurious_poles
-        basis_functions_invs = self.basis_functions_invs
+        oInvariants = cached_invariants(self.multiplicity)
+        spurious_poles = set(self.spurious_poles)
+        basis_functions_invs = set(self.basis_functions_invs)
+        # membership sets, computed once rather than inside the sort key
+        invs_3_same_ends = {_inv for _inv in oInvariants.invs_3_set if _inv[1] == _inv[-2]}
+        invs_2_not_in_basis_functions = oInvariants.invs_2_set - basis_functions_invs
+        invs_3_not_spurious = oInvariants.invs_3_set - spurious_poles
         return sorted(lInvariants, key=lambda inv:
                       (
-                          inv not in [_inv for _inv in oInvariants.invs_3 if _inv[1] == _inv[-2]],  # e.g. ⟨1|(2+3)|1] before ⟨1|(2+3)|6], ⟨3|(1+2)|3] before ⟨3|(1+2)|4]
-                          inv not in [_inv for _inv in oInvariants.invs_2 if _inv not in basis_functions_invs] and basis_functions_invs != [],
-                          inv not in oInvariants.invs_s,
+                          inv not in invs_3_same_ends,  # e.g. ⟨1|(2+3)|1] before ⟨1|(2+3)|6], ⟨3|(1+2)|3] before ⟨3|(1+2)|4]
+                          inv not in invs_2_not_in_basis_functions and basis_functions_invs != set(),
+                          inv not in oInvariants.invs_s_set,
                           # poles forbidden with Delta if present <-- not necessary given the other criterea
                           # inv not in forbidden_invariants([_inv for _inv in lInvariants if _inv in oInvariants.invs_D][0], self) if any([
                           #     _inv in oInvariants.invs_D for _inv in lInvariants]) else True,
-                          inv not in [_inv for _inv in oInvariants.invs_3 if _inv not in spurious_poles],
+                          inv not in invs_3_not_spurious,
                           -dExponents[inv],
                           inv not in basis_functions_invs,
-                          inv not in self.spurious_poles,
-                          oInvariants.full.index(inv) if inv in oInvariants.full else -1
+                          inv not in spurious_poles,
+                          oInvariants.index(inv, -1)
                       ))
 
     @property
@@ -235,7 +240,7 @@ class Unknown(Numerical_Methods, object):
         from antares.terms.terms import Terms
         if isinstance(self.original_unknown, Unknown):
             return self.original_unknown.what_am_I
-        elif isinstance(self.original_unknown, BHUnknown):
+        elif isinstance(self.original_unknown, (BHUnknown, MultiOutputComponent, ExternalUnknown)):
             return "Numerical"
         elif isinstance(self.original_unknown, Terms):
             return "Analytical"
@@ -10,8 +10,7 @@
 from sympy import pprint
 from copy import deepcopy
 from pycoretools import flatten
-from antares.core.settings import settings
-from lips.invariants import Invariants
+from antares.core.invariants import cached_invariants
 from antares.terms.terms import Terms, FittingSettings
 from antares.topologies.topology import internal_symmetry, get_label
 from antares.ansatze.eigenbasis import PermutationCycles
@@ -70,9 +69,8 @@ def optional_tuples(invariant, oUnknown):
                 if spurious_pole in oUnknown.true_friends[(forced_inv, forbidden_inv)] and not any([spurious_pole in optional_tuple for optional_tuple in optional_invs]):
                     optional_invs += [(spurious_pole, None)]
     # clean up + sort
-    oInvariants = Invariants(oUnknown.multiplicity,
-                             Restrict3Brackets=settings.Restrict3Brackets, Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
-    optional_invs = [tuple(sorted(list(optional_tuple), key=lambda inv: (oInvariants.full.index(inv) if inv in oInvariants.full else 9999))) for optional_tuple in optional_invs]
+    oInvariants = cached_invariants(oUnknown.multiplicity)
+    optional_invs = [tuple(sorted(list(optional_tuple), key=lambda inv: oInvariants.index(inv, 9999))) for optional_tuple in optional_invs]
     optional_invs = [tuple([inv for inv in optional_tuple if inv not in forbidden_invariants(invariant, oUnknown)]) for optional_tuple in optional_invs]
     optional_invs = [optional_tuple if len(optional_tuple) >= 2 else optional_tuple + (None,) for optional_tuple in optional_invs]
     return list(set(optional_invs))
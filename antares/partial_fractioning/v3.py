@@ -10,7 +10,7 @@ from copy import deepcopy
 from pycoretools import flatten, mapThreads, filterThreads, all_non_empty_subsets
 from antares.core.settings import settings
 from antares.core.tools import p3B, pOijk, pDijk
-from lips.invariants import Invariants
+from antares.core.invariants import cached_invariants
 from antares.terms.term import Term, Numerator, Denominator
 from antares.terms.terms import Terms
 from antares.topologies.topology import internal_symmetry
@@ -119,8 +119,7 @@ def partial_partial_fractioning(oUnknown, invariant, max_nbr_terms=1, silent=Fal
         # check for 0.5 exponents and add the correct Omega or Pi in numerator
         print("\rChecking for .5 scalings in double collinear limits.                                                     ", end="\r")
         sys.stdout.flush()
-        oInvariants = Invariants(oUnknown.multiplicity,
-                                 Restrict3Brackets=settings.Restrict3Brackets, Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+        oInvariants = cached_invariants(oUnknown.multiplicity)
         for oTerms in lTerms:
             for oTerm in oTerms:
                 # delta (or other?) .5 in denominator
@@ -0,0 +1,67 @@
+#     _      _           _   _           ___          _ _
+#    /_\  __| |__ _ _ __| |_(_)_ _____  / __| __ __ _| (_)_ _  __ _ ___
+#   / _ \/ _` / _` | '_ \  _| \ V / -_) \__ \/ _/ _` | | | ' \/ _` (_-<
+#  /_/ \_\__,_\__,_| .__/\__|_|\_/\___| |___/\__\__,_|_|_|_||_\__, /__/
+#                  |_|                                        |___/
+
+# Author: Giuseppe
+
+import mpmath
+
+from syngular import Field
+
+from ..core.settings import settings
+from ..core.tools import log_linear_fit, log_linear_fit_Exception
+from .session import ScalingSession
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# In mpc, scalings are obtained from the slope of log|f| against log|invariant| on points approaching the variety.
+# The adaptive mode starts at low precision and shallow depth, and only adds deeper points while the slope is not
+# (half) integer, and only doubles the precision when cancellation is detected, i.e. when the point misses the
+# requested value of the invariant or the function evaluates to zero. All evaluations enter the final fit.
+# The points of each precision are only used within one call: a local session is replaced when the precision grows.
+
+
+def adaptive_settings():
+    return ("adaptive", settings.ScalingsAdaptiveStart, settings.ScalingsAdaptiveStep, settings.ScalingsAdaptiveMaxPoints,
+            settings.ScalingsAdaptiveDigits)
+
+
+def working_digits(depth, digits):
+    """Precision used at a given depth: at least three times the depth, so that the point itself is resolved."""
+    return min(max(digits, 3 * depth), settings.ScalingsAdaptiveDigits[1])
+
+
+def has_cancellation(x, target, y):
+    return y == 0 or not mpmath.isfinite(y) or abs(x - abs(target)) > abs(target) * 10 ** -3
+
+
+def adaptive_scaling(oUnknown, invariants, values_at_depth, seed=0):
+    """Exponent of oUnknown as invariants approach zero along values_at_depth(k) (a tuple, first entry giving the x axis).
+    Returns the exponent and the last point used."""
+    min_digits, max_digits = settings.ScalingsAdaptiveDigits
+    depth, digits = settings.ScalingsAdaptiveStart, min_digits
+    xaxis, yaxis, oSession = [], [], None
+    while len(xaxis) < settings.ScalingsAdaptiveMaxPoints:
+        digits = working_digits(depth, digits)
+        with mpmath.workdps(digits):
+            if oSession is None or oSession.field.digits != digits:
+                oSession = ScalingSession(oUnknown.multiplicity, seed, Field("mpc", 0, digits))
+            values = values_at_depth(depth)
+            oParticles = oSession.point(invariants, values)
+            x, y = abs(oParticles(invariants[0])), abs(oUnknown(oParticles))
+        if has_cancellation(x, values[0], y):
+            if digits >= max_digits:
+                raise log_linear_fit_Exception(f"Cancellation at depth {depth} persists at {digits} digits.")
+            digits = min(2 * digits, max_digits)
+            continue
+        xaxis, yaxis = xaxis + [x], yaxis + [y]
+        if len(xaxis) >= 2:
+            try:
+                return log_linear_fit(xaxis, yaxis), oParticles
+            except log_linear_fit_Exception:
+                pass
+        depth += settings.ScalingsAdaptiveStep
+    return log_linear_fit(xaxis, yaxis), oParticles
@@ -0,0 +1,149 @@
+#   ___    _             _       _____     _    _
+#  | __| _(_)___ _ _  __| |___  |_   _|_ _| |__| |___ ___
+#  | _| '_| / -_) ' \/ _` (_-<    | |/ _` | '_ \ / -_|_-<
+#  |_||_| |_\___|_||_\__,_/__/    |_|\__,_|_.__/_\___/__/
+
+# Author: Giuseppe
+
+import os
+import uuid
+import shutil
+import itertools
+import numpy
+
+import antares
+
+from ..core.settings import settings
+from ..core.invariants import cached_invariants
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# Friends of a pair depend only on the multiplicity and on the invariants, not on the function being reconstructed.
+# A table stores them for all pairs of a list of invariants in compressed sparse row format:
+#     invariants.npy  the invariants (unicode array), indexed 0 .. N - 1;
+#     pairs.npy       sorted codes i * N + j (i < j) of the pairs;
+#     offsets.npy     friends of pairs[k] are members[offsets[k]:offsets[k + 1]];
+#     members.npy     indices of the friends, sorted by absolute value at the degenerate point;
+#     field.npy       the field (str) the degenerate points were generated in, tables are only used in the same field.
+# All but the invariants and the field are memory mapped read-only.
+# Each build writes a new version directory; the table directory is a symbolic link to the current version, replaced
+# atomically, so readers see either the old or the new table in full.
+
+
+def friends_table_directory(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets):
+    return (antares.CACHE_PATH / "friends_tables" /
+            f"n={multiplicity}-r3={int(Restrict3Brackets)}-r4={int(Restrict4Brackets)}-fr4={int(FurtherRestrict4Brackets)}")
+
+
+class FriendsTable(object):
+    """Read-only, memory mapped, friends table of a multiplicity, see build_friends_table."""
+
+    def __init__(self, directory):
+        self.directory = directory = directory.resolve()  # a single version, even if the link is replaced meanwhile
+        self.field = str(numpy.load(directory / "field.npy"))
+        self.invariants = numpy.load(directory / "invariants.npy").tolist()
+        self.invariants_index = {invariant: i for i, invariant in enumerate(self.invariants)}
+        self.pairs = numpy.load(directory / "pairs.npy", mmap_mode="r")
+        self.offsets = numpy.load(directory / "offsets.npy", mmap_mode="r")
+        self.members = numpy.load(directory / "members.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __repr__(self):
+        return f"FriendsTable({len(self.invariants)} invariants, {len(self)} pairs, field={self.field})"
+
+    def covers(self, invariants):
+        """Whether friends restricted to invariants can be read from the table."""
+        return all(invariant in self.invariants_index for invariant in invariants)
+
+    def friends(self, some_inv, other_inv):
+        """Friends of the pair, None if the pair is not in the table."""
+        if some_inv not in self.invariants_index or other_inv not in self.invariants_index:
+            return None
+        i, j = sorted((self.invariants_index[some_inv], self.invariants_index[other_inv]))
+        code = i * len(self.invariants) + j
+        k = numpy.searchsorted(self.pairs, code)
+        if k == len(self.pairs) or self.pairs[k] != code:
+            return None
+        return [self.invariants[member] for member in self.members[self.offsets[k]:self.offsets[k + 1]]]
+
+
+_friends_tables = {}
+
+
+def _load_friends_table(directory):
+    # only found tables are cached, so that tables built by other processes are picked up
+    if directory not in _friends_tables and (directory / "field.npy").exists():
+        try:
+            _friends_tables[directory] = FriendsTable(directory)
+        except FileNotFoundError:  # version removed by a concurrent build
+            return None
+    return _friends_tables.get(directory)
+
+
+def load_friends_table(multiplicity, Restrict3Brackets=None, Restrict4Brackets=None, FurtherRestrict4Brackets=None, field=None):
+    """Friends table for the multiplicity and restriction flags (defaulting to settings), None if it was not built
+    or if it was built in a field other than field (default settings.field)."""
+    oFriendsTable = _load_friends_table(friends_table_directory(
+        multiplicity,
+        settings.Restrict3Brackets if Restrict3Brackets is None else Restrict3Brackets,
+        settings.Restrict4Brackets if Restrict4Brackets is None else Restrict4Brackets,
+        settings.FurtherRestrict4Brackets if FurtherRestrict4Brackets is None else FurtherRestrict4Brackets))
+    if oFriendsTable is None or oFriendsTable.field != str(settings.field if field is None else field):
+        return None
+    return oFriendsTable
+
+
+def _publish(version_directory, directory):
+    """Points the table directory to version_directory with an atomic replacement of the link, then removes the previous version."""
+    previous_version = None
+    if directory.is_symlink():
+        previous_version = directory.resolve()
+    elif directory.exists():  # unversioned table: move it aside first
+        previous_version = directory.with_name(f"{directory.name}.{uuid.uuid4().hex}")
+        directory.rename(previous_version)
+    link = directory.with_name(f"{directory.name}.link{uuid.uuid4().hex}")
+    link.symlink_to(version_directory.name)
+    os.replace(link, directory)
+    if previous_version is not None and previous_version != version_directory.resolve():
+        shutil.rmtree(previous_version, ignore_errors=True)
+
+
+def build_friends_table(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets, invariants=None, seed=0,
+                        field=None, chunk_size=500, verbose=False):
+    """Computes the friends of all pairs of invariants (default: the full list for the restriction flags) in field (default
+    settings.field) and writes the table. Degenerate points are generated in parallel per chunk of pairs and not kept."""
+    from .pair import compute_friends
+    field = settings.field if field is None else field
+    if invariants is None:
+        invariants = cached_invariants(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets).full
+    invariants = list(dict.fromkeys(invariants))
+    invariants_index = {invariant: i for i, invariant in enumerate(invariants)}
+    pairs = list(itertools.combinations(invariants, 2))
+    friends = {}
+    for start in range(0, len(pairs), chunk_size):
+        if verbose:
+            print(f"\rFriends table n={multiplicity}: {start}/{len(pairs)} pairs.", end="")
+        friends |= compute_friends(multiplicity, pairs[start:start + chunk_size], invariants, seed=seed, field=field)
+    codes = []
+    for key in friends:
+        i, j = sorted(invariants_index[invariant] for invariant in key)
+        codes += [(i * len(invariants) + j, key)]
+    codes.sort()
+    offsets = numpy.cumsum([0] + [len(friends[key]) for _, key in codes], dtype=numpy.int64)
+    members = numpy.array([invariants_index[friend] for _, key in codes for friend in friends[key]], dtype=numpy.int32)
+    directory = friends_table_directory(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets)
+    version_directory = directory.with_name(f"{directory.name}.{uuid.uuid4().hex}")
+    version_directory.mkdir(parents=True)
+    numpy.save(version_directory / "invariants.npy", numpy.array(invariants, dtype=str))
+    numpy.save(version_directory / "pairs.npy", numpy.array([code for code, _ in codes], dtype=numpy.int64))
+    numpy.save(version_directory / "offsets.npy", offsets)
+    numpy.save(version_directory / "members.npy", members)
+    numpy.save(version_directory / "field.npy", numpy.array(str(field)))
+    _publish(version_directory, directory)
+    _friends_tables.pop(directory, None)
+    if verbose:
+        print(f"\rFriends table n={multiplicity}: {len(codes)}/{len(pairs)} pairs written to {directory}.")
+    return load_friends_table(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets, field=field)
@@ -0,0 +1,144 @@
+import hashlib
+import functools
+import numpy
+import sympy
+
+from pyadic import ModP, PAdic
+from sympy.core.mul import _keep_coeff
+from sympy.polys.domains import ZZ
+from sympy.polys.galoistools import gf_factor
+
+import antares
+
+from ..core.diskcached import cache_handle
+from ..core.settings import settings
+
+try:
+    import flint
+except ImportError:
+    flint = None
+
+
+def slice_key(oSlice):
+    """Content hash of a slice: equal for copies of the slice, in other processes and in later runs."""
+    content = [str(oSlice.field), str(len(oSlice))]
+    for oParticle in oSlice:
+        content += [str(oParticle.r_sp_d), str(oParticle.l_sp_d), str(oParticle.four_mom)]
+    for internal_mass in sorted(getattr(oSlice, "internal_masses", ())):
+        content += [f"{internal_mass}={getattr(oSlice, internal_mass)}"]
+    return hashlib.sha256("|".join(content).encode()).hexdigest()
+
+
+# Version of the stored entries, part of the store keys: entries in an older format are not read.
+STORE_FORMAT = 2
+
+
+def invariant_factorisations_store():
+    """Process-safe store of invariants restricted to slices and factorised, keyed by (format, slice key, field, invariant)."""
+    return cache_handle(antares.CACHE_PATH / "invariant_factorisations", antares.DISKCACHE_SIZE_LIMIT_IN_GB)
+
+
+def dense_coefficients(polynomial, t, prime):
+    """Coefficients in F_p of the polynomial in t, highest degree first, without leading zeros."""
+    coefficients = [int(c.p) * pow(int(c.q), -1, prime) % prime for c in map(sympy.Rational, sympy.Poly(polynomial, t).all_coeffs())]
+    while len(coefficients) > 1 and coefficients[0] == 0:
+        coefficients = coefficients[1:]
+    return coefficients
+
+
+def factor_univariate_mod_p(coefficients, prime):
+    """Leading coefficient and monic irreducible factors with multiplicities of the dense polynomial with integer
+    coefficients (highest degree first) over F_p. Uses python-flint if available, sympy's dense galois tools otherwise."""
+    if flint is not None:
+        lc, factors = flint.nmod_poly(coefficients[::-1], prime).factor()
+        return int(lc), [([int(c) for c in factor.coeffs()[::-1]], multiplicity) for factor, multiplicity in factors]
+    lc, factors = gf_factor([c % prime for c in coefficients], prime, ZZ)
+    return int(lc), [([int(c) for c in factor], multiplicity) for factor, multiplicity in factors]
+
+
+def factorise_on_univariate_slice(polynomial, t, prime):
+    """Same expression as sympy.poly(polynomial, modulus=prime).as_expr().factor(modulus=prime), for a polynomial in t
+    alone, from a dense factorisation (sympy expressions are only built for the resulting factors)."""
+    coefficients = dense_coefficients(polynomial, t, prime)
+    if len(coefficients) <= 1:
+        return sympy.poly(polynomial, modulus=prime).as_expr()
+    lc, factors = factor_univariate_mod_p(coefficients, prime)
+    lc = lc if lc <= prime // 2 else lc - prime
+    return _keep_coeff(sympy.Integer(lc), sympy.Mul(*[sympy.Poly(factor, t, modulus=prime).as_expr() ** multiplicity for factor, multiplicity in factors]))
+
+
+@functools.lru_cache(maxsize=2 ** 16)
+def factor_fingerprint(factor, prime, t=sympy.symbols('t')):
+    """Canonical form of a polynomial factor over F_p: its monic coefficient tuple, highest degree first."""
+    coefficients = dense_coefficients(factor, t, prime)
+    inverse = pow(coefficients[0], -1, prime)
+    return tuple(c * inverse % prime for c in coefficients)
+
+
+def fingerprint_factorisation(polynomial, prime, t=sympy.symbols('t')):
+    """Irreducible factors of the polynomial in t over F_p, as {fingerprint: power}."""
+    coefficients = dense_coefficients(polynomial, t, prime)
+    if len(coefficients) <= 1:
+        return {}
+    return {tuple(factor): power for factor, power in factor_univariate_mod_p(coefficients, prime)[1]}
+
+
+def fingerprints_as_expr(fingerprint_power_dict, t=sympy.symbols('t')):
+    """Readable {factor: power} from {fingerprint: power}, for printing."""
+    return {sympy.Poly(fingerprint, t).as_expr(): power for fingerprint, power in fingerprint_power_dict.items()}
+
+
+def factorise_invariant(possible_denominator, evaluator, field):
+    """The invariant on the slice, times 4, factorised in t; a number if it is constant, None if it is not a scalar."""
+    possible_denominator_of_t = evaluator(possible_denominator)
+    if isinstance(possible_denominator_of_t, (ModP, PAdic, sympy.core.numbers.Number)):
+        return possible_denominator_of_t
+    elif isinstance(possible_denominator_of_t, numpy.ndarray):
+        return None
+    this_candidate = 4 * possible_denominator_of_t.expand()
+    if this_candidate == 0 and field.name in ['finite field', 'Fp']:
+        return this_candidate
+    free_symbols = sympy.sympify(this_candidate).free_symbols
+    if field.name in ['finite field', 'Fp'] and len(free_symbols) == 1:
+        return factorise_on_univariate_slice(this_candidate, free_symbols.pop(), field.characteristic)
+    factorised = sympy.poly(this_candidate, modulus=field.characteristic).as_expr().factor(modulus=field.characteristic)
+    if factorised == 0 and field.name in ['padic', 'Qp']:
+        factorised = sympy.poly(
+            4 * possible_denominator_of_t.expand() / field.characteristic, modulus=field.characteristic
+        ).as_expr().factor(modulus=field.characteristic)
+    return factorised
+
+
+def to_store(factorised):
+    """Unpickling re-evaluates products, which would distribute the leading coefficient over a single factor,
+    so factorisations are stored as (coefficient, product of factors)."""
+    if isinstance(factorised, sympy.Expr) and not isinstance(factorised, sympy.Number):
+        return factorised.as_coeff_Mul()
+    return factorised
+
+
+def from_store(stored):
+    if isinstance(stored, tuple):
+        return _keep_coeff(*stored)
+    return stored
+
+
+def invariant_factorisations(possible_denominators, evaluator, field=None, use_cache=None):
+    """Factorised invariants on the slice evaluator, see factorise_invariant. Entries are read from and written to
+    the store (settings.InvariantFactorisationsUseCache), keyed by the content of the slice and the invariant."""
+    if field is None:
+        field = evaluator.field
+    if use_cache is None:
+        use_cache = settings.InvariantFactorisationsUseCache
+    if not use_cache:
+        return {inv: factorise_invariant(inv, evaluator, field) for inv in possible_denominators}
+    key = (STORE_FORMAT, slice_key(evaluator), str(field))
+    store = invariant_factorisations_store()
+    factorisations = {inv: from_store(store.get(key + (inv, ))) for inv in possible_denominators}
+    missing = [inv for inv, factorised in factorisations.items() if factorised is None and key + (inv, ) not in store]
+    for inv in missing:
+        factorisations[inv] = factorise_invariant(inv, evaluator, field)
+    with store.transact():
+        for inv in missing:
+            store[key + (inv, )] = to_store(factorisations[inv])
+    return factorisations
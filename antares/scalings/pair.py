@@ -9,30 +9,40 @@
 
 # Author: Giuseppe
 
-import sys
+import numpy
+import diskcache
 
 from mpmath.libmp.libhyper import NoConvergence
 
-from syngular import SingularException
+from syngular import SingularException, RingPoints
+from pyadic import PAdic
 from lips import Particles, myException
 from pycoretools import mapThreads, retry
 
+import antares
+
 from ..core.settings import settings
-from ..core.tools import log_linear_fit, MyShelf, log_linear_fit_Exception
+from ..core.diskcached import cache_handle, get_many, set_many
+from ..core.tools import log_linear_fit, log_linear_fit_Exception
+from .session import scaling_session
+from .adaptive import adaptive_scaling
+from .friends_tables import load_friends_table
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
 
-def pair_scalings(oUnknown, some_invs, other_invs, all_invariants, relative=1, seed=0, silent=True):
+def friends_store(multiplicity):
+    """Process-safe store of pair 'friends', i.e. the invariants vanishing on the pair variety, one per multiplicity."""
+    return cache_handle(antares.CACHE_PATH / "friends" / f"n={multiplicity}", antares.DISKCACHE_SIZE_LIMIT_IN_GB)
 
-    # This concept of pair 'Friends' is actually that of ideal members.
-    pw_friends = settings.base_cache_path + "n={}".format(oUnknown.multiplicity) + "/Friends"
-    with MyShelf(pw_friends, "c"):
-        pass   # just to make sure it exists
 
-    with MyShelf(pw_friends, 'r') as _sFriends:
-        sFriends = dict(_sFriends)
+def pair_key(some_inv, other_inv):
+    """Friends do not depend on the order of the pair, so (a, b) and (b, a) share a key."""
+    return tuple(sorted((some_inv, other_inv)))
+
+
+def pair_scalings(oUnknown, some_invs, other_invs, all_invariants, relative=1, seed=0, silent=True):
 
     if hasattr(oUnknown, "new"):
         raise myException("new encountered in oUnknown in set_pair... deprecated?")
@@ -49,28 +59,27 @@ def pair_scalings(oUnknown, some_invs, other_invs, all_invariants, relative=1, s
             other_inv = other_invs[j]
             invs_tuples += [(some_inv, other_inv)]
 
-    data = mapThreads(pair_scaling, oUnknown, all_invariants, relative, sFriends, invs_tuples, seed=seed, UseParallelisation=settings.UseParallelisation, Cores=settings.Cores)
-
-    # un pack the data and write it to cache if it is not there yet
-    pair_invs, pair_exps, pair_friends = [], [], []
-    with MyShelf(pw_friends, 'c') as sFriends:
-        for i, entry in enumerate(data):
-            if entry is None:
-                pair_invs += [list(invs_tuples[i])]
-                pair_exps += ["F"]
-                pair_friends += [["F"]]
-            else:
-                pair_invs += [entry[0]]
-                pair_exps += [entry[1]]
-                pair_friends += [entry[2]]
-                key1 = "{}&{}".format(entry[0][0], entry[0][1])
-                key2 = "{}&{}".format(entry[0][1], entry[0][0])
-                if sys.version_info.major < 2:
-                    key1 = key1.encode("utf-8")
-                    key2 = key2.encode("utf-8")
-                if key1 not in sFriends:
-                    sFriends[key1] = entry[2]
-                    sFriends[key2] = entry[2]
+    # This concept of pair 'Friends' is actually that of ideal members.
+    known_friends = discover_friends(oUnknown.multiplicity, invs_tuples, all_invariants, relative=relative, seed=seed)
+
+    data = mapThreads(pair_scaling, oUnknown, all_invariants, relative, known_friends, invs_tuples, seed=seed,
+                      UseParallelisation=settings.UseParallelisation, Cores=settings.Cores)
+
+    # un pack the data and write the new friends to the store in a single transaction
+    pair_invs, pair_exps, pair_friends, new_friends = [], [], [], {}
+    for i, entry in enumerate(data):
+        if entry is None:
+            pair_invs += [list(invs_tuples[i])]
+            pair_exps += ["F"]
+            pair_friends += [["F"]]
+        else:
+            pair_invs += [entry[0]]
+            pair_exps += [entry[1]]
+            pair_friends += [entry[2]]
+            if pair_key(*entry[0]) not in known_friends:
+                new_friends[pair_key(*entry[0])] = entry[2]
+    if len(new_friends) > 0:
+        set_many(friends_store(oUnknown.multiplicity), new_friends.items())
 
     # Clean using known numerator information
     if oUnknown.num_invs != [] and oUnknown.num_invs is not None:
@@ -84,18 +93,21 @@ def pair_scalings(oUnknown, some_invs, other_invs, all_invariants, relative=1, s
 
 @retry((myException, log_linear_fit_Exception, AssertionError, TimeoutError, AttributeError,
         NoConvergence, SingularException), max_tries=2, silent=False)
-def pair_scaling(oUnknown, all_invariants, relative, sFriends, invs_tuple, seed=0):
+def pair_scaling(oUnknown, all_invariants, relative, known_friends, invs_tuple, seed=0):
 
     some_inv, other_inv = invs_tuple[0], invs_tuple[1]
 
-    oParticles = Particles(oUnknown.multiplicity, seed=seed, field=settings.field)
+    if settings.field.name == "mpc" and settings.ScalingsAdaptive:  # with its own sessions, see scalings.adaptive
 
-    if settings.field.name == "mpc":
+        pair_exp, oParticles = adaptive_scaling(oUnknown, (some_inv, other_inv), lambda k: pair_variety_values(relative, k), seed=seed)
 
+    elif settings.field.name == "mpc":
+
+        oSession = scaling_session(oUnknown.multiplicity, seed, settings.field)
         xaxis, yaxis = [], []
 
         for k in range(settings.ScalingsIterationsStart, settings.ScalingsIterationsStart + settings.ScalingsIterationsNumber):
-            oParticles.variety((some_inv, other_inv), (10 ** -(relative * k), 2 * 10 ** -k))
+            oParticles = oSession.point((some_inv, other_inv), pair_variety_values(relative, k))
             xaxis += [abs(oParticles(some_inv))]
             yaxis += [abs(oUnknown(oParticles))]
 
@@ -103,7 +115,8 @@ def pair_scaling(oUnknown, all_invariants, relative, sFriends, invs_tuple, seed=
 
     elif settings.field.name == "padic":
 
-        oParticles.variety((some_inv, other_inv), (1, 1,))
+        oSession = scaling_session(oUnknown.multiplicity, seed, settings.field)
+        oParticles = oSession.point((some_inv, other_inv), pair_variety_values(relative))
         pair_exp = oUnknown(oParticles).n
 
     else:
@@ -111,19 +124,105 @@ def pair_scaling(oUnknown, all_invariants, relative, sFriends, invs_tuple, seed=
         raise Exception("Pair scaling requires field to be mpc or padic.")
 
     pair_invs = [some_inv, other_inv]
-    key1 = "{}&{}".format(some_inv, other_inv)
-    if sys.version_info.major < 2:
-        key1 = key1.encode("utf-8")
 
-    if key1 not in sFriends:                        # time consuming part, since it involves recalculating all invariants
-        _pair_friends = oParticles.phasespace_consistency_check(all_invariants)[3]
-    else:                                           # read it from the cache
-        _pair_friends = sFriends[key1]
-    pair_friends = _pair_friends
+    if pair_key(some_inv, other_inv) not in known_friends:  # time consuming part, since it involves recalculating all invariants
+        pair_friends = oParticles.phasespace_consistency_check(all_invariants)[3]
+    else:                                                   # read it from the store
+        pair_friends = known_friends[pair_key(some_inv, other_inv)]
 
     return pair_invs, pair_exp, pair_friends
 
 
+def pair_variety_values(relative=1, k=None, field=None):
+    """Values of the pair of invariants on the degenerate point: valuations in p-adic fields, 10 ^ -k (relatively scaled) in mpc."""
+    field = settings.field if field is None else field
+    if field.name == "mpc":
+        k = settings.ScalingsIterationsStart + settings.ScalingsIterationsNumber - 1 if k is None else k
+        return (10 ** -(relative * k), 2 * 10 ** -k)
+    return (1, 1, )
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+def friends_threshold(field):
+    """Invariants below this (absolute) value are considered vanishing, as in Particles.phasespace_consistency_check."""
+    if field.name == "padic":
+        return PAdic(0, field.characteristic, 0, 1)
+    return 10 ** -8
+
+
+def degenerate_point(multiplicity, relative, seed, field, invs_tuple):
+    """Seeded base point moved to the variety of the pair, None if it can not be generated."""
+    try:
+        oParticles = Particles(multiplicity, seed=seed, field=field)
+        oParticles.variety(tuple(invs_tuple), pair_variety_values(relative, field=field))
+        return oParticles
+    except (myException, AssertionError, AttributeError, NoConvergence, SingularException, TimeoutError):
+        return None
+
+
+def compute_friends(multiplicity, invs_tuples, all_invariants, relative=1, seed=0, field=None, oSession=None):
+    """Friends of the given pairs from a single sweep of all_invariants over their degenerate points, keyed by pair_key.
+    Friends are the vanishing invariants sorted by absolute value. Pairs whose degenerate point can not be generated are omitted.
+    The degenerate points are recorded in oSession, if given."""
+    field = settings.field if field is None else field
+    first_tuple = {}
+    for invs_tuple in invs_tuples:
+        first_tuple.setdefault(pair_key(*invs_tuple), tuple(invs_tuple))
+    unique_tuples = list(first_tuple.values())
+    degenerate_points = mapThreads(degenerate_point, multiplicity, relative, seed, field, unique_tuples,
+                                   UseParallelisation=settings.UseParallelisation, Cores=settings.Cores, verbose=False)
+    keys, points = [], []
+    for invs_tuple, oParticles in zip(unique_tuples, degenerate_points):
+        if oParticles is None:
+            continue
+        if oSession is not None:
+            oSession.add_point(invs_tuple, pair_variety_values(relative, field=field), oParticles)
+        keys += [pair_key(*invs_tuple)]
+        points += [oParticles.copy()]
+    if len(points) == 0:
+        return {}
+    values = mapThreads(RingPoints(points), all_invariants, UseParallelisation=settings.UseParallelisation and len(points) > 10,
+                        Cores=settings.Cores, verbose=False)
+    abs_values = [[numpy.max(abs(value)) for value in invariant_values] for invariant_values in values]
+    threshold = friends_threshold(field)
+    friends = {}
+    for j, key in enumerate(keys):
+        vanishing = [(abs_values[i][j], inv) for i, inv in enumerate(all_invariants) if abs_values[i][j] <= threshold]
+        friends[key] = [inv for _, inv in sorted(vanishing, key=lambda entry: entry[0])]
+    return friends
+
+
+def discover_friends(multiplicity, invs_tuples, all_invariants, relative=1, seed=0):
+    """Friends of the given pairs, from the precomputed friends table (see friends_tables), from the store,
+    or computed in bulk with compute_friends. New entries are written to the store in one transaction."""
+    first_tuple = {}
+    for invs_tuple in invs_tuples:
+        first_tuple.setdefault(pair_key(*invs_tuple), tuple(invs_tuple))
+    known_friends = {}
+    oFriendsTable = load_friends_table(multiplicity, field=settings.field)
+    if oFriendsTable is not None and oFriendsTable.covers(all_invariants):
+        all_invariants_set = set(all_invariants)
+        for key in first_tuple:
+            friends = oFriendsTable.friends(*key)
+            if friends is not None:
+                known_friends[key] = [inv for inv in friends if inv in all_invariants_set]
+    missing = [key for key in first_tuple if key not in known_friends]
+    if len(missing) > 0:
+        stored = get_many(friends_store(multiplicity), missing, default=diskcache.ENOVAL)
+        known_friends |= {key: friends for key, friends in zip(missing, stored) if friends is not diskcache.ENOVAL}
+    missing = [first_tuple[key] for key in first_tuple if key not in known_friends]
+    if len(missing) == 0:
+        return known_friends
+    # the session keeps the degenerate points for the forked pair_scaling workers
+    new_friends = compute_friends(multiplicity, missing, all_invariants, relative=relative, seed=seed,
+                                  oSession=scaling_session(multiplicity, seed, settings.field))
+    if len(new_friends) > 0:
+        set_many(friends_store(multiplicity), new_friends.items())
+    return known_friends | new_friends
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
 
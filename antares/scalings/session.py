@@ -0,0 +1,75 @@
+#   ___          _ _             ___              _
+#  / __| __ __ _| (_)_ _  __ _  / __| ___ ______(_)___ _ _
+#  \__ \/ _/ _` | | | ' \/ _` | \__ \/ -_|_-<_-< / _ \ ' \
+#  |___/\__\__,_|_|_|_||_\__, | |___/\___/__/__/_\___/_||_|
+#                        |___/
+
+# Author: Giuseppe
+
+from collections import OrderedDict
+from lips import Particles
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# Both the variety points of a session and the sessions are least recently used caches, so that long runs
+# (many invariants, pairs, depths and fields) do not keep every point alive.
+
+MAX_VARIETIES = 1024  # per session
+MAX_SESSIONS = 8
+
+
+class ScalingSession(object):
+    """Seeded base phase space point and its variety solutions, shared by single and pair scalings.
+    Points handed out are copies, so callers are free to modify them."""
+
+    def __init__(self, multiplicity, seed, field):
+        self.multiplicity = multiplicity
+        self.seed = seed
+        self.field = field
+        self.varieties = OrderedDict()  # least recently used first
+
+    @property
+    def base_point(self):
+        if not hasattr(self, "_base_point"):
+            self._base_point = Particles(self.multiplicity, seed=self.seed, field=self.field)
+        return self._base_point
+
+    def point(self, invariants=(), values=()):
+        """Copy of the base point moved to the variety where invariants take values (valuations for p-adic fields)."""
+        key = (tuple(invariants), tuple(values))
+        if key == ((), ()):
+            return self.base_point.copy()
+        if key in self.varieties:
+            self.varieties.move_to_end(key)
+            return self.varieties[key].copy()
+        oParticles = self.base_point.copy()
+        oParticles.variety(*key)
+        self.add_point(*key, oParticles)
+        return oParticles.copy()
+
+    def add_point(self, invariants, values, oParticles):
+        """Records a point of the variety computed elsewhere, e.g. in a worker process."""
+        key = (tuple(invariants), tuple(values))
+        self.varieties[key] = oParticles
+        self.varieties.move_to_end(key)
+        if len(self.varieties) > MAX_VARIETIES:
+            self.varieties.popitem(last=False)
+
+    def __repr__(self):
+        return f"ScalingSession(multiplicity={self.multiplicity}, seed={self.seed}, field={self.field}, {len(self.varieties)} varieties)"
+
+
+_sessions = OrderedDict()  # least recently used first
+
+
+def scaling_session(multiplicity, seed, field):
+    """Process-wide ScalingSession per (multiplicity, seed, field)."""
+    key = (multiplicity, seed, str(field))
+    if key in _sessions:
+        _sessions.move_to_end(key)
+        return _sessions[key]
+    _sessions[key] = ScalingSession(multiplicity, seed, field)
+    if len(_sessions) > MAX_SESSIONS:
+        _sessions.popitem(last=False)
+    return _sessions[key]
@@ -9,23 +9,103 @@
 
 # Author: Giuseppe
 
-from lips import Particles, myException
+import hashlib
+import diskcache
+
+from lips import myException
 from syngular import SingularException
 from pycoretools import mapThreads, retry
 
+import antares
+
 from ..core.settings import settings
-from ..core.tools import log_linear_fit, log_linear_fit_Exception
+from ..core.diskcached import cache_handle, get_many
+from ..core.tools import log_linear_fit, log_linear_fit_Exception, time_limit
+from .session import scaling_session
+from .adaptive import adaptive_scaling, adaptive_settings
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
 
-def single_scalings(oUnknown, invariants, seed=0, verbose=False):
+def function_definition(oUnknown):
+    """Serialised definition of oUnknown, None if it has none: Terms and Term by their string, an Unknown by the definitions
+    of the wrapped function and of the subtracted partial pieces, other black boxes by their function_key attribute."""
+    from ..core.unknown import Unknown
+    from ..terms.terms import Terms
+    from ..terms.term import Term
+    if isinstance(oUnknown, Unknown):
+        original_definition = function_definition(oUnknown.original_unknown)
+        if original_definition is None:
+            return None
+        return "\n-".join([original_definition] + [function_definition(oPartialPiece) for oPartialPiece in oUnknown.partial_pieces])
+    if hasattr(oUnknown, "function_key"):
+        return str(oUnknown.function_key)
+    if isinstance(oUnknown, (Terms, Term)):
+        return f"{type(oUnknown).__name__}({oUnknown})"
+    return None
+
+
+def function_key(oUnknown, key=None):
+    """Stable (across processes and restarts) identifier of the function oUnknown, from the caller supplied key or its definition."""
+    definition = function_definition(oUnknown) if key is None else f"key={key}"
+    if definition is None:
+        raise ValueError(f"Can not identify {getattr(oUnknown, '__name__', oUnknown)} across runs: pass a key to single_scalings, "
+                         "or give the function a function_key attribute.")
+    return hashlib.sha256(f"{oUnknown.multiplicity}|{definition}".encode()).hexdigest()
+
+
+def single_scalings_store():
+    return cache_handle(antares.CACHE_PATH / "single_scalings", antares.DISKCACHE_SIZE_LIMIT_IN_GB)
+
+
+def single_scalings_key(oUnknown, seed=0, key=None):
+    """Store key prefix (function, field, seed, fit settings); the invariant is appended to it."""
+    if settings.field.name == "mpc":
+        fit_settings = adaptive_settings() if settings.ScalingsAdaptive else (settings.ScalingsIterationsStart, settings.ScalingsIterationsNumber)
+    else:
+        fit_settings = ()
+    return (function_key(oUnknown, key), str(settings.field), seed, fit_settings)
+
+
+def single_scalings(oUnknown, invariants, seed=0, verbose=False, use_cache=None, timeout=None, key=None):
+    """Exponents of oUnknown in the single collinear limits of invariants (None where the fit failed or timed out).
+    With use_cache (default settings.SingleScalingsUseCache) results are persisted as soon as computed and reused on restart,
+    keyed on key if given, else on the definition of oUnknown (see function_definition).
+    The timeout (default settings.SingleScalingsTimeout) relies on SIGALRM, see core.tools.time_limit."""
     if oUnknown.is_zero:
         return [0 for inv in invariants]
-    else:
-        return mapThreads(single_scaling, oUnknown, invariants, seed=seed, verbose=verbose,
+    use_cache = settings.SingleScalingsUseCache if use_cache is None else use_cache
+    timeout = settings.SingleScalingsTimeout if timeout is None else timeout
+    if not use_cache:
+        return mapThreads(timed_single_scaling, oUnknown, invariants, seed=seed, timeout=timeout, verbose=verbose,
                           UseParallelisation=settings.UseParallelisation, Cores=settings.Cores)
+    key = single_scalings_key(oUnknown, seed, key)
+    unique_invariants = list(dict.fromkeys(invariants))
+    stored = get_many(single_scalings_store(), [key + (inv, ) for inv in unique_invariants], default=diskcache.ENOVAL)
+    known = {inv: result for inv, result in zip(unique_invariants, stored) if result is not diskcache.ENOVAL}
+    missing = [inv for inv in dict.fromkeys(invariants) if inv not in known]
+    if verbose:
+        print(f"Single scalings: {len(known)} from store, {len(missing)} to compute.")
+    if len(missing) > 0:
+        known.update(zip(missing, mapThreads(stored_single_scaling, oUnknown, key, missing, seed=seed, timeout=timeout, verbose=verbose,
+                                             UseParallelisation=settings.UseParallelisation, Cores=settings.Cores)))
+    return [known[inv] for inv in invariants]
+
+
+def timed_single_scaling(oUnknown, invariant, seed=0, timeout=None):
+    try:
+        with time_limit(timeout):
+            return single_scaling(oUnknown, invariant, seed=seed)
+    except TimeoutError:
+        return None
+
+
+def stored_single_scaling(oUnknown, key, invariant, seed=0, timeout=None):
+    result = timed_single_scaling(oUnknown, invariant, seed=seed, timeout=timeout)
+    if result is not None:  # failures are retried on restart
+        single_scalings_store().set(key + (invariant, ), result)
+    return result
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -34,14 +114,17 @@ def single_scalings(oUnknown, invariants, seed=0, verbose=False):
 @retry((myException, log_linear_fit_Exception, AssertionError, AttributeError, SingularException), max_tries=2, silent=False)
 def single_scaling(oUnknown, invariant, seed=0):
 
-    oParticles = Particles(oUnknown.multiplicity, seed=seed, field=settings.field)
+    if settings.field.name == "mpc" and settings.ScalingsAdaptive:  # with its own sessions, see scalings.adaptive
 
-    if settings.field.name == "mpc":
+        return adaptive_scaling(oUnknown, (invariant, ), lambda k: (10 ** -k, ), seed=seed)[0]
+
+    elif settings.field.name == "mpc":
 
+        oSession = scaling_session(oUnknown.multiplicity, seed, settings.field)
         xaxis, yaxis = [], []
 
         for k in range(settings.ScalingsIterationsStart, settings.ScalingsIterationsStart + settings.ScalingsIterationsNumber):
-            oParticles.variety((invariant, ), (10 ** -k,))
+            oParticles = oSession.point((invariant, ), (10 ** -k, ))
             xaxis += [abs(oParticles.compute(invariant))]
             yaxis += [abs(oUnknown(oParticles))]
 
@@ -49,7 +132,8 @@ def single_scaling(oUnknown, invariant, seed=0):
 
     elif settings.field.name == "padic":
 
-        oParticles.variety((invariant, ), (1, ))
+        oSession = scaling_session(oUnknown.multiplicity, seed, settings.field)
+        oParticles = oSession.point((invariant, ), (1, ))
         res = oUnknown(oParticles)
         if res.k == 0:
             raise Exception("Lost all padic digits.")
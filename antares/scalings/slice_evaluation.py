@@ -0,0 +1,153 @@
+import numpy
+import sympy
+
+from pyadic import ModP
+from pyadic.interpolation import FFSequenceGenerator
+from pycoretools import mapThreads
+
+from ..core.settings import settings
+
+
+class SliceEvaluator(object):
+    """Phase space points on a slice (Particles with spinors polynomial in the slice variables) at given values of the variables.
+    In finite fields, with massless kinematics, the spinor entries are evaluated from their polynomial coefficients
+    on a numerical template point, instead of copying the symbolic slice and substituting with sympy."""
+
+    SPINOR_ENTRIES = (("r_sp_d", (0, 0)), ("r_sp_d", (1, 0)), ("l_sp_d", (0, 0)), ("l_sp_d", (0, 1)))
+
+    def __init__(self, oSlice, variables=("t", ), memoize=False):
+        self.oSlice = oSlice
+        self.variables = tuple(variables)
+        self.memoized_points = {} if memoize else None
+        self.field = oSlice.field
+        self.is_polynomial = (self.field.name == "finite field" and all(oP.is_massless for oP in oSlice) and
+                              len(getattr(oSlice, "internal_masses", ())) == 0)
+        if self.is_polynomial:
+            symbols = sympy.symbols(self.variables)
+            p = self.field.characteristic
+            self.entries = []
+            for i, oP in enumerate(oSlice):
+                for attribute, position in self.SPINOR_ENTRIES:
+                    entry = getattr(oP, attribute)[position]
+                    if isinstance(entry, sympy.Basic):
+                        terms = [(exponents, int(coefficient) % p) for exponents, coefficient in sympy.Poly(entry, *symbols).terms()]
+                        self.entries += [(i, attribute, position, terms)]
+            self.template = oSlice.copy()
+            self.template.subs({variable: 1 for variable in self.variables})
+
+    def point(self, values):
+        """Copy of the slice at the given values of the variables (the same object for repeated values if memoized)."""
+        if self.memoized_points is None:
+            return self._point(values)
+        key = tuple(map(int, values))
+        if key not in self.memoized_points:
+            self.memoized_points[key] = self._point(values)
+        return self.memoized_points[key]
+
+    def _point(self, values):
+        if not self.is_polynomial:
+            oPoint = self.oSlice.copy()
+            oPoint.subs(dict(zip(self.variables, values)))
+            return oPoint
+        p = self.field.characteristic
+        values = [int(value) for value in values]
+        oPoint = self.template.copy()
+        for i, attribute, position, terms in self.entries:
+            entry = 0
+            for exponents, coefficient in terms:
+                for value, exponent in zip(values, exponents):
+                    coefficient = coefficient * pow(value, exponent, p) % p
+                entry += coefficient
+            getattr(oPoint[i + 1], attribute)[position] = ModP(entry % p, p)
+        for oP in oPoint:  # as in Particles.subs
+            oP._r_sp_d_to_r_sp_u()
+            oP.l_sp_d = oP.l_sp_d
+        return oPoint
+
+
+def as_modp(value, prime):
+    """ModP of a scalar, or an object array of ModP of an array (e.g. the value of a tensor_function)."""
+    if isinstance(value, numpy.ndarray):
+        return numpy.array([ModP(entry, prime) for entry in value.flat], dtype=object).reshape(value.shape)
+    return ModP(value, prime)
+
+
+def evaluate_or_exception(oFunc, oPoint):
+    try:
+        return as_modp(oFunc(oPoint), oPoint.field.characteristic)
+    except Exception as exception:
+        return exception
+
+
+class SliceFunction(object):
+    """Function of the slice variable t, called with field values of t. Components and ratios share the samples of
+    the functions they are built from."""
+
+    def __getitem__(self, index):
+        return SliceFunctionComponent(self, index)
+
+    def __truediv__(self, other):
+        return SliceFunctionRatio(self, other)
+
+
+class SliceFunctionComponent(SliceFunction):
+
+    def __init__(self, oSliceFunction, index):
+        self.oSliceFunction = oSliceFunction
+        self.index = index
+
+    def __call__(self, tval):
+        return self.oSliceFunction(tval)[self.index]
+
+
+class SliceFunctionRatio(SliceFunction):
+
+    def __init__(self, numerator, denominator):
+        self.numerator = numerator
+        self.denominator = denominator
+
+    def __call__(self, tval):
+        return self.numerator(tval) / self.denominator(tval)
+
+
+class BatchedSliceFunction(SliceFunction):
+    """f(t) = oFunc(oSlice at t) as requested by the univariate interpolators in pyadic.interpolation.
+    Samples follow the interpolators' t sequence (FFSequenceGenerator with the same seed), so on a miss the next block_size
+    values of the sequence are evaluated at once: in a process pool, through oFunc.evaluate_many, or sequentially.
+    At most block_size - 1 evaluations are wasted once the interpolation terminates.
+    If oFunc returns arrays (e.g. a tensor_function), indexing gives the components, which all share the same samples."""
+
+    def __init__(self, oFunc, oSlice, seed=0, block_size=None, UseParallelisation=None):
+        self.oFunc = oFunc
+        self.oSliceEvaluator = SliceEvaluator(oSlice)
+        self.field = oSlice.field
+        self.sequence = FFSequenceGenerator(self.field.characteristic, seed)
+        self.block_size = settings.Cores if block_size is None else block_size
+        self.UseParallelisation = settings.SlicesUseParallelisation if UseParallelisation is None else UseParallelisation
+        self.values = {}
+        self.nbr_evaluations = 0
+
+    def evaluate(self, tvals):
+        oPoints = [self.oSliceEvaluator.point((tval, )) for tval in tvals]
+        self.nbr_evaluations += len(oPoints)
+        if self.UseParallelisation and len(oPoints) > 1:
+            results = mapThreads(evaluate_or_exception, self.oFunc, oPoints, UseParallelisation=True, Cores=settings.Cores, verbose=False)
+        elif hasattr(self.oFunc, "evaluate_many") and len(oPoints) > 1:
+            try:
+                results = [as_modp(result, self.field.characteristic) for result in self.oFunc.evaluate_many(oPoints)]
+            except Exception:  # e.g. division by zero at one of the points, locate it
+                results = [evaluate_or_exception(self.oFunc, oPoint) for oPoint in oPoints]
+        else:
+            results = [evaluate_or_exception(self.oFunc, oPoint) for oPoint in oPoints]
+        self.values.update(zip(map(int, tvals), results))
+
+    def __call__(self, tval):
+        if int(tval) not in self.values:
+            block = [next(self.sequence) for _ in range(self.block_size)]
+            if int(tval) not in map(int, block):  # not a sample of the sequence
+                block = [tval] + block
+            self.evaluate(block)
+        result = self.values[int(tval)]
+        if isinstance(result, Exception):
+            raise result
+        return result
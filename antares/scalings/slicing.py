@@ -1,4 +1,3 @@
-import functools
 import numpy
 import sympy
 
@@ -9,33 +8,40 @@ from pyadic import ModP, PAdic
 from pyadic.interpolation import Newton_polynomial_interpolation, Thiele_rational_interpolation, multivariate_Newton_polynomial_interpolation
 from pycoretools import flatten
 
+from ..core.settings import settings
 from ..terms.terms import Terms, Term, Numerator, Denominator
+from .slice_evaluation import SliceEvaluator, SliceFunction, BatchedSliceFunction
+from .sparse_interpolation import multivariate_sparse_polynomial_interpolation
+from .invariant_factorisations import slice_key, invariant_factorisations, factor_fingerprint, fingerprint_factorisation, fingerprints_as_expr
+
+
+_invariant_dicts = OrderedDict()  # least recently used first, at most 1024 entries
 
 
-@functools.lru_cache(maxsize=1024)
 def get_invariant_dict(possible_denominators, evaluator, keep_all_non_unique=False, field=None, verbose=True):
+    """Irreducible factors in t of the possible denominators on the slice evaluator, memoized on the content of the slice
+    (see invariant_factorisations.slice_key), so that copies of the slice and slices in worker processes hit the cache."""
     if field is None:
         field = evaluator.field
+    key = (tuple(possible_denominators), slice_key(evaluator), keep_all_non_unique, str(field))
+    if key in _invariant_dicts:
+        _invariant_dicts.move_to_end(key)
+        return _invariant_dicts[key]
+    _invariant_dicts[key] = _get_invariant_dict(possible_denominators, evaluator, keep_all_non_unique, field, verbose)
+    if len(_invariant_dicts) > 1024:
+        _invariant_dicts.popitem(last=False)
+    return _invariant_dicts[key]
+
+
+def _get_invariant_dict(possible_denominators, evaluator, keep_all_non_unique, field, verbose):
     candidate_denoms_dict = {}
-    for possible_denominator in possible_denominators:
-        possible_denominator_of_t = evaluator(possible_denominator)
-        if isinstance(possible_denominator_of_t, (ModP, PAdic, sympy.core.numbers.Number)):
-            candidate_denoms_dict[possible_denominator] = possible_denominator_of_t
-        elif isinstance(possible_denominator_of_t, numpy.ndarray):
-            pass
-        else:
-            this_candidate = 4 * possible_denominator_of_t.expand()
-            if this_candidate == 0 and field.name in ['finite field', 'Fp']:
-                print(f"Warning: candidate denominator {possible_denominator} evaluates to zero on an Fp slice, skipping it.")
-                continue
-            this_candidate = sympy.poly(
-                this_candidate, modulus=field.characteristic
-            ).as_expr().factor(modulus=field.characteristic)
-            if this_candidate == 0 and field.name in ['padic', 'Qp']:
-                this_candidate = sympy.poly(
-                    4 * possible_denominator_of_t.expand() / field.characteristic, modulus=field.characteristic
-                ).as_expr().factor(modulus=field.characteristic)
-            candidate_denoms_dict[possible_denominator] = this_candidate
+    for possible_denominator, this_candidate in invariant_factorisations(possible_denominators, evaluator, field).items():
+        if this_candidate is None:
+            continue
+        if this_candidate == 0 and field.name in ['finite field', 'Fp']:
+            print(f"Warning: candidate denominator {possible_denominator} evaluates to zero on an Fp slice, skipping it.")
+            continue
+        candidate_denoms_dict[possible_denominator] = this_candidate
     constant_denom_candidates = dict((key, val) for key, val in candidate_denoms_dict.items() if isinstance(val, (ModP, PAdic)) or val.free_symbols == set())
     if verbose and len(constant_denom_candidates) > 0:
         print(f"The following candidate demoninator factors are constant, they will be discarded:\n{constant_denom_candidates}")
@@ -100,28 +106,28 @@ def get_invariant_dict(possible_denominators, evaluator, keep_all_non_unique=Fal
 
 
 def match_factors(polynomial, candidate_factors_dict, field, degree_bounds={}, assert_full_match=False, assert_factors=True, verbose=False):
+    """Powers of the candidates whose factors divide the polynomial in t. Irreducible factors are compared as monic
+    coefficient tuples over F_p (fingerprints), and only candidates whose factors all divide the polynomial are tried."""
     if isinstance(polynomial, sympy.Number):
         return {}
-    polynomial_degree = polynomial.as_poly(modulus=field.characteristic).degree()
-    # ensure the polynomial is normalized to have leading coefficient of 1
-    t = sympy.symbols('t')
-    polynomial = sympy.poly(polynomial * int(1 / ModP(int(polynomial.coeff(t ** polynomial_degree)), field.characteristic)),
-                            modulus=field.characteristic).as_expr()
-    matched_irreds, matched_degree = {}, 0
-    polynomial_power_dict = polynomial.factor(modulus=field.characteristic).as_powers_dict()
+    prime = field.characteristic
+    polynomial_power_dict = fingerprint_factorisation(polynomial, prime)
+    polynomial_degree = sum((len(factor) - 1) * power for factor, power in polynomial_power_dict.items())
     unmatched_polynomial_power_dict = copy(polynomial_power_dict)
+    candidate_fingerprints = {candidate: [factor_fingerprint(factor, prime) for factor in all_factors]
+                              for candidate, all_factors in candidate_factors_dict.items()}
+    matched_irreds, matched_degree = {}, 0
     if verbose:
-        print("[match factors] Polynomial:", polynomial_power_dict)
-    key_val_pairs = list(candidate_factors_dict.items())
-    key_val_pairs = sorted(candidate_factors_dict.items(),
+        print("[match factors] Polynomial:", fingerprints_as_expr(polynomial_power_dict))
+    key_val_pairs = sorted(((candidate, all_factors) for candidate, all_factors in candidate_fingerprints.items()
+                            if all(factor in polynomial_power_dict for factor in all_factors)),
                            key=lambda item: (0 if 's' in item[0] else 1, -len(item[1]), len(item[0])))
     for candidate, all_factors in key_val_pairs:
-        if all([factor in unmatched_polynomial_power_dict.keys() for factor in all_factors]):  # check all factors appear in left over part
+        if all([factor in unmatched_polynomial_power_dict for factor in all_factors]):  # check all factors appear in left over part
             if verbose:
-                print(f"[match factors] {candidate} matches {all_factors}")
+                print(f"[match factors] {candidate} matches {candidate_factors_dict[candidate]}")
             # take the lowest power with which they appear
-            all_factors_powers = [unmatched_polynomial_power_dict[factor] for factor in all_factors]
-            min_power = min(all_factors_powers)
+            min_power = min(unmatched_polynomial_power_dict[factor] for factor in all_factors)
             reject = False
             # apply degree bounds
             for key, val in degree_bounds.items():
@@ -139,93 +145,112 @@ def match_factors(polynomial, candidate_factors_dict, field, degree_bounds={}, a
                         degree_bounds[key] = val - min_power  # for now assume it can only appear linearly within the candidate, to be improved if needed
             if reject:
                 continue
-            # Following unmatched poly factors check could be improved when one of the two Warnings above are raised
-            unmatched_polynomial_power_dict = {
-                key: (val if key not in all_factors else val - min_power)
-                for key, val in unmatched_polynomial_power_dict.items()
-                if (val if key not in all_factors else val - min_power) != 0
-            }
+            for factor in set(all_factors):
+                unmatched_polynomial_power_dict[factor] -= min_power
+                if unmatched_polynomial_power_dict[factor] == 0:
+                    del unmatched_polynomial_power_dict[factor]
             if verbose:
-                print(f"[match factors] left over {unmatched_polynomial_power_dict}")
+                print(f"[match factors] left over {fingerprints_as_expr(unmatched_polynomial_power_dict)}")
             matched_irreds[candidate] = min_power
-            matched_degree += sum([factor.as_poly(modulus=field.characteristic).degree() for factor in all_factors]) * min_power
-        # Turned off - to be revised
-        if False and any([factor in polynomial_power_dict.keys() for factor in all_factors]):  # check if any matches
-            all_factors_appear = all([factor in polynomial_power_dict.keys() for factor in all_factors])
-            # check that all factors actually do appear
-            if assert_factors:
-                assert all_factors_appear, ("Assertion failed: not all factors appear:", candidate, all_factors)
-            else:
-                if not all_factors_appear:
-                    print("Warning: would have failed assertion, some factors are missing:", candidate,
-                          [(factor, factor in polynomial_power_dict.keys()) for factor in all_factors])
-            # and check that they appear with the same power
-            all_factors_powers = [polynomial_power_dict[factor] for factor in all_factors]
-            if assert_factors:
-                assert len(set(all_factors_powers)) == 1
-            else:
-                if not len(set(all_factors_powers)) == 1:
-                    print("Warning: would have failed assertion, multiple powers appear:",
-                          set([polynomial_power_dict[factor] for factor in all_factors]))
-            # Following unmatched poly factors check could be improved when one of the two Warnings above are raised
-            unmatched_polynomial_power_dict = {key: val for key, val in unmatched_polynomial_power_dict.items() if key not in all_factors}
-            matched_irreds[candidate] = all_factors_powers[-1]
-            matched_degree += sum([factor.as_poly(modulus=field.characteristic).degree() for factor in all_factors]) * matched_irreds[candidate]
+            matched_degree += sum(len(factor) - 1 for factor in all_factors) * min_power
     if verbose:
         print(f"[match factors] Matched {matched_degree} / {polynomial_degree}: {matched_irreds}")
     if assert_full_match:
         if polynomial_degree != matched_degree:
-            print(f"[match factors] Unmatched factors: {unmatched_polynomial_power_dict}")
+            print(f"[match factors] Unmatched factors: {fingerprints_as_expr(unmatched_polynomial_power_dict)}")
             raise AssertionError
     # sort back into the original order of candidates
     matched_irreds = {key: matched_irreds[key] for key in candidate_factors_dict if key in matched_irreds}
     return matched_irreds
 
 
-def univariate_Newton_on_slice(oFunc, oSlice, verbose=False):
-    field = oSlice.field
+def on_slice(oFunc, oSlice):
+    """oFunc as a function of t on the slice, sampled in blocks; SliceFunctions (e.g. components of a shared sampler) are returned as is."""
+    if isinstance(oFunc, SliceFunction):
+        return oFunc
+    return BatchedSliceFunction(oFunc, oSlice, seed=0)
 
-    def f(tval):
-        oPoint = oSlice.copy()
-        oPoint.subs({'t': tval})
-        return ModP(oFunc(oPoint), oPoint.field.characteristic)
 
-    rat_func_t = Newton_polynomial_interpolation(f, field.characteristic, verbose=verbose)
+def univariate_Newton_on_slice(oFunc, oSlice, verbose=False):
+    field = oSlice.field
+    f = on_slice(oFunc, oSlice)
+    rat_func_t = Newton_polynomial_interpolation(f, field.characteristic, seed=0, verbose=verbose)
     return rat_func_t
 
 
 def univariate_Thiele_on_slice(oFunc, oSlice, verbose=False):
     field = oSlice.field
-
-    def f(tval):
-        oPoint = oSlice.copy()
-        oPoint.subs({'t': tval})
-        return ModP(oFunc(oPoint), oPoint.field.characteristic)
-
-    rat_func_t = Thiele_rational_interpolation(f, field.characteristic, verbose=verbose)
+    f = on_slice(oFunc, oSlice)
+    rat_func_t = Thiele_rational_interpolation(f, field.characteristic, seed=0, verbose=verbose)
     return rat_func_t
 
 
-def bivariate_Newton_on_slice(oFunc, oSlice, verbose=False):
+def bivariate_Newton_on_slice(oFunc, oSlice, verbose=False, sparse=None, oSliceEvaluator=None):
+    """Polynomial in t1, t2 via Zippel's sparse interpolation (settings.SlicesSparseInterpolation), or dense recursive Newton."""
     field = oSlice.field
+    if sparse is None:
+        sparse = settings.SlicesSparseInterpolation
+    if oSliceEvaluator is None:
+        oSliceEvaluator = SliceEvaluator(oSlice, variables=('t1', 't2'))
 
     def f(tval1, tval2):
-        oPoint = oSlice.copy()
-        oPoint.subs({'t1': tval1, 't2': tval2})
+        oPoint = oSliceEvaluator.point((tval1, tval2))
         return ModP(oFunc(oPoint), oPoint.field.characteristic)
 
+    if sparse:
+        return multivariate_sparse_polynomial_interpolation(f, field.characteristic, 2)
     rat_func_ts = multivariate_Newton_polynomial_interpolation(f, field.characteristic, verbose=verbose)
     return rat_func_ts
 
 
+def invariant_on_slice(invariant, oSlice, variables):
+    """Invariant restricted to the slice as a polynomial over F_p, None if it is not a polynomial in the variables."""
+    value = oSlice(invariant)
+    if isinstance(value, numpy.ndarray):
+        return None
+    try:
+        return sympy.Poly(value, *variables, modulus=oSlice.field.characteristic)
+    except sympy.polys.polyerrors.BasePolynomialError:  # not a polynomial, or coefficients not in F_p (CoercionFailed)
+        return None
+
+
+def monomial_on_slice(oMonomial, oSlice, variables):
+    """Product of invariants to powers (e.g. a Denominator) on the slice by symbolic substitution, None if not possible."""
+    result = sympy.Poly(1, *variables, modulus=oSlice.field.characteristic)
+    for invariant, exponent in oMonomial.items():
+        invariant_poly = invariant_on_slice(invariant, oSlice, variables)
+        if invariant_poly is None:
+            return None
+        result = result * invariant_poly ** exponent
+    return result
+
+
+def numerator_on_slice(oNumerator, oSlice, variables):
+    """Numerator on the slice by symbolic substitution, None if not possible (e.g. non rational coefficients in F_p)."""
+    prime = oSlice.field.characteristic
+    result = sympy.Poly(0, *variables, modulus=prime)
+    for coefficient, oMonomial in oNumerator.polynomial.coeffs_and_monomials:
+        monomial_poly = monomial_on_slice(oMonomial, oSlice, variables)
+        try:
+            coefficient = int(ModP(coefficient, prime))
+        except Exception:
+            return None
+        if monomial_poly is None:
+            return None
+        result = result + monomial_poly * coefficient
+    common_monomial_poly = monomial_on_slice(oNumerator.monomial, oSlice, variables)
+    return None if common_monomial_poly is None else result * common_monomial_poly
+
+
 def univariate_Thiele_on_slice_given_LCD(oFunc, oTerms, oSlice, verbose=False):
     """univariate rational functions of t via Newton polynomial interpolation of BlackBox function, with common rational factor pulled out"""
     # this is guaranteed to be a polynomial, if full set of denominator factors is known
-    tnum = univariate_Newton_on_slice(lambda oPs: oFunc(oPs) / oTerms(oPs), oSlice, verbose=verbose)
+    oTermsOnSlice = on_slice(oTerms, oSlice)
+    tnum = univariate_Newton_on_slice(on_slice(oFunc, oSlice) / oTermsOnSlice, oSlice, verbose=verbose)
     if verbose:
         print()
     # this may be a rational function if common numerator factor is found
-    tdenom = univariate_Thiele_on_slice(oTerms, oSlice, verbose=verbose)
+    tdenom = univariate_Thiele_on_slice(oTermsOnSlice, oSlice, verbose=verbose)
     # univariate field of fraction of galois field
     FFGF = sympy.GF(oSlice.field.characteristic).frac_field(sympy.symbols('t'))
     return (FFGF(tnum) * FFGF(tdenom)).as_expr()
@@ -233,24 +258,34 @@ def univariate_Thiele_on_slice_given_LCD(oFunc, oTerms, oSlice, verbose=False):
 
 
 def bivariate_Thiele_on_slice_given_LCD(oFunc, oTerms, oSlice, verbose=False):
-    """univariate rational functions of t via Newton polynomial interpolation of BlackBox function, with common rational factor pulled out"""
+    """bivariate rational function of t1, t2: the unknown numerator by polynomial interpolation of oFunc / oTerms, the known numerator
+    and denominator of oTerms by symbolic substitution of the slice (numerical interpolation only as a fallback)"""
+    variables = sympy.symbols(['t1', 't2'])
+    oSliceEvaluator = SliceEvaluator(oSlice, variables=('t1', 't2'), memoize=True)  # points are shared by the three sub-problems
+    FFGF = sympy.GF(oSlice.field.characteristic).frac_field(*variables)
     # this is guaranteed to be a polynomial, if full set of denominator factors is known
     if verbose:
         print("[bivariate Thiele on slice given LCD] Obtaining unknown numerator:")
-    tnum = bivariate_Newton_on_slice(lambda oPs: oFunc(oPs) / oTerms(oPs), oSlice, verbose=verbose)
+    tnum = bivariate_Newton_on_slice(lambda oPs: oFunc(oPs) / oTerms(oPs), oSlice, verbose=verbose, oSliceEvaluator=oSliceEvaluator)
     # this may be a rational function if common numerator factor is found - split it here
     if verbose:
         print("[bivariate Thiele on slice given LCD] Obtaining known denominator:")
-    tdenom = bivariate_Newton_on_slice(oTerms[0].oDen.as_term(), oSlice, verbose=verbose)
+    tdenom = monomial_on_slice(oTerms[0].oDen, oSlice, variables)
+    if tdenom is None:
+        tdenom = bivariate_Newton_on_slice(oTerms[0].oDen.as_term(), oSlice, verbose=verbose, oSliceEvaluator=oSliceEvaluator)
+    else:
+        tdenom = FFGF(tdenom.as_expr()).as_expr()
     if verbose:
         print("[bivariate Thiele on slice given LCD] Obtaining known numerator:")
-    tnumknown = bivariate_Newton_on_slice(oTerms[0].oNum.as_term(), oSlice, verbose=verbose)
+    tnumknown = numerator_on_slice(oTerms[0].oNum, oSlice, variables)
+    if tnumknown is None:
+        tnumknown = bivariate_Newton_on_slice(oTerms[0].oNum.as_term(), oSlice, verbose=verbose, oSliceEvaluator=oSliceEvaluator)
+    else:
+        tnumknown = FFGF(tnumknown.as_expr()).as_expr()
     # univariate field of fraction of galois field
     if verbose:
         print("[bivariate Thiele on slice given LCD] Assembling result:")
     return tnum * tnumknown / tdenom
-    FFGF = sympy.GF(oSlice.field.characteristic).frac_field(*sympy.symbols(['t1', 't2']))
-    return (FFGF(tnum) * FFGF(tnumknown) / FFGF(tdenom)).as_expr()
 
 
 def do_codimension_one_study(oFunc, oSlice, denominator_candidates, oSlice_for_invariants=None, oTermsDenom=None,
@@ -260,15 +295,23 @@ def do_codimension_one_study(oFunc, oSlice, denominator_candidates, oSlice_for_i
     If 'oTermsDenom' is provided univariate_Thiele_on_slice_given_LCD is used, instead of univariate_Thiele_on_slice.
     'oTermsDenom' may be larger than the true LCD.
     """
-    field = oSlice.field
     if oTermsDenom is None:
         rat_func_t = univariate_Thiele_on_slice(oFunc, oSlice, verbose=verbose)
     else:
         rat_func_t = univariate_Thiele_on_slice_given_LCD(oFunc, oTermsDenom, oSlice, verbose=verbose)
-    if oSlice_for_invariants is None:
-        oSlice_for_invariants = oSlice
     if verbose:
         print("\n", rat_func_t)
+    return codimension_one_study_of_rational_function(rat_func_t, oSlice, denominator_candidates, oSlice_for_invariants=oSlice_for_invariants,
+                                                      assert_factors=assert_factors, degree_bounds=degree_bounds,
+                                                      keep_all_non_unique=keep_all_non_unique, verbose=verbose)
+
+
+def codimension_one_study_of_rational_function(rat_func_t, oSlice, denominator_candidates, oSlice_for_invariants=None,
+                                               assert_factors=True, degree_bounds={}, keep_all_non_unique=False, verbose=False):
+    """Second half of do_codimension_one_study: matches numerator and denominator of the already reconstructed rat_func_t."""
+    field = oSlice.field
+    if oSlice_for_invariants is None:
+        oSlice_for_invariants = oSlice
     numerator = rat_func_t.as_numer_denom()[0]
     denominator = rat_func_t.as_numer_denom()[1]
     invariant_dict = get_invariant_dict(tuple(denominator_candidates), oSlice_for_invariants, keep_all_non_unique=keep_all_non_unique)
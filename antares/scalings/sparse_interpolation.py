@@ -0,0 +1,120 @@
+import sympy
+
+from pyadic import ModP
+from pyadic.interpolation import FFSequenceGenerator
+
+
+class OnlineNewton(object):
+    """Univariate Newton interpolation over F_p fed one sample at a time, terminated by two vanishing divided differences."""
+
+    def __init__(self, prime):
+        self.prime = prime
+        self.tvals, self.avals = [], []
+
+    def add(self, tval, value):
+        aval = int(value) % self.prime
+        for t, a in zip(self.tvals, self.avals):
+            aval = (aval - a) * pow(tval - t, -1, self.prime) % self.prime
+        self.tvals += [tval]
+        self.avals += [aval]
+
+    @property
+    def terminated(self):
+        return len(self.avals) >= 2 and self.avals[-2:] == [0, 0]
+
+    def coefficients(self):
+        """Coefficients of the interpolating polynomial, lowest degree first."""
+        coefficients = []
+        for aval, tval in zip(self.avals[:-2][::-1], self.tvals[:-2][::-1]):
+            shifted = [0] + coefficients
+            coefficients = [(c - tval * d) % self.prime for c, d in zip(shifted, coefficients + [0])]
+            coefficients[0] = (coefficients[0] + aval) % self.prime
+        return coefficients
+
+
+def solve_transposed_vandermonde(nodes, values, prime):
+    """x such that sum_j x_j nodes_j ^ k = values_k for k = 0, ..., len(nodes) - 1, by Gaussian elimination over F_p."""
+    n = len(nodes)
+    rows = [[pow(node, k, prime) for node in nodes] + [int(values[k]) % prime] for k in range(n)]
+    for column in range(n):
+        pivot = next(row for row in range(column, n) if rows[row][column] != 0)
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        inverse = pow(rows[column][column], -1, prime)
+        rows[column] = [entry * inverse % prime for entry in rows[column]]
+        for row in range(n):
+            if row != column and rows[row][column] != 0:
+                factor = rows[row][column]
+                rows[row] = [(entry - factor * pivot_entry) % prime for entry, pivot_entry in zip(rows[row], rows[column])]
+    return [row[-1] for row in rows]
+
+
+def monomial_value(exponents, point, prime):
+    value = 1
+    for base, exponent in zip(point, exponents):
+        value = value * pow(base, exponent, prime) % prime
+    return value
+
+
+def sparse_interpolation(f, prime, nbr_variables, sequence, max_retries=3):
+    """Zippel's sparse interpolation of the polynomial f(t1, ..., tn) over F_p, as {exponents: coefficient}.
+    The last variable is interpolated densely (Newton, early termination); at each of its samples the coefficients
+    of the support found at the first sample are fixed by a transposed Vandermonde system, i.e. with as many
+    evaluations as terms instead of a full grid."""
+    if nbr_variables == 1:
+        oNewton, skips = OnlineNewton(prime), 0
+        while not oNewton.terminated:
+            tval = int(next(sequence))
+            try:
+                oNewton.add(tval, f(tval))
+            except ZeroDivisionError:
+                skips += 1
+                if skips >= max_retries:
+                    raise
+        return {(exponent, ): coefficient for exponent, coefficient in enumerate(oNewton.coefficients()) if coefficient != 0}
+    for _ in range(max_retries):
+        first_tval = int(next(sequence))
+        try:
+            support = sparse_interpolation(lambda *tvals: f(*tvals, first_tval), prime, nbr_variables - 1, sequence)
+            break
+        except ZeroDivisionError:
+            continue
+    else:
+        raise ZeroDivisionError(f"No regular sample of the last variable found in {max_retries} attempts.")
+    monomials = list(support.keys())
+    lNewton = {monomial: OnlineNewton(prime) for monomial in monomials}
+    for monomial in monomials:
+        lNewton[monomial].add(first_tval, support[monomial])
+    while not all(oNewton.terminated for oNewton in lNewton.values()):
+        tval = int(next(sequence))
+        for _ in range(max_retries):
+            shift = [int(next(sequence)) for _ in range(nbr_variables - 1)]
+            ratio = [int(next(sequence)) for _ in range(nbr_variables - 1)]
+            nodes = [monomial_value(monomial, ratio, prime) for monomial in monomials]
+            if len(set(nodes)) != len(nodes):
+                continue
+            try:
+                values = [f(*[s * pow(r, k, prime) % prime for s, r in zip(shift, ratio)], tval) for k in range(len(monomials))]
+                break
+            except ZeroDivisionError:
+                continue
+        else:
+            raise ZeroDivisionError(f"No regular set of samples found in {max_retries} attempts.")
+        shifted_coefficients = solve_transposed_vandermonde(nodes, values, prime)
+        for monomial, shifted_coefficient in zip(monomials, shifted_coefficients):
+            coefficient = shifted_coefficient * pow(monomial_value(monomial, shift, prime), -1, prime) % prime
+            lNewton[monomial].add(tval, coefficient)
+    polynomial = {}
+    for monomial, oNewton in lNewton.items():
+        for exponent, coefficient in enumerate(oNewton.coefficients()):
+            if coefficient != 0:
+                polynomial[monomial + (exponent, )] = coefficient
+    return polynomial
+
+
+def multivariate_sparse_polynomial_interpolation(f, prime, nbr_variables, seed=0):
+    """Polynomial f(t1, ..., tn) over F_p as a sympy expression in t1, ..., tn, see sparse_interpolation."""
+    ts = sympy.symbols([f"t{i}" for i in range(1, nbr_variables + 1)])
+    polynomial = sparse_interpolation(lambda *tvals: f(*[ModP(tval, prime) for tval in tvals]), prime, nbr_variables, FFSequenceGenerator(prime, seed))
+    FFGF = sympy.GF(prime).frac_field(*ts)
+    return FFGF(sympy.Add(*[coefficient * sympy.Mul(*[t ** exponent for t, exponent in zip(ts, exponents)])
+                            for exponents, coefficient in polynomial.items()])).as_expr()
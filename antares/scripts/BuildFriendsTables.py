@@ -0,0 +1,34 @@
+import itertools
+import argparse
+
+from syngular import Field
+
+from antares.scalings.friends_tables import build_friends_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the pair friends (ideal membership) tables used by pair_scalings.")
+    parser.add_argument("multiplicities", type=int, nargs="*", default=[4, 5, 6, 7, 8], help="Multiplicities (default: 4 to 8).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the base phase space point.")
+    parser.add_argument("--field", choices=["mpc", "padic"], default=None, help="Field of the degenerate points (default: settings.field). "
+                        "Tables are only used in runs with the same field.")
+    parser.add_argument("--prime", type=int, default=2 ** 31 - 19, help="Prime of the p-adic field.")
+    parser.add_argument("--digits", type=int, default=None, help="Digits of the field (default: 300 for mpc, 5 for padic).")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Number of pairs per batched sweep.")
+    parser.add_argument("--verbose", action="store_true", help="Print progress.")
+    args = parser.parse_args()
+    if args.field == "mpc":
+        field = Field("mpc", 0, 300 if args.digits is None else args.digits)
+    elif args.field == "padic":
+        field = Field("padic", args.prime, 5 if args.digits is None else args.digits)
+    else:
+        field = None
+
+    for multiplicity in args.multiplicities:
+        for Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets in itertools.product([True, False], repeat=3):
+            build_friends_table(multiplicity, Restrict3Brackets, Restrict4Brackets, FurtherRestrict4Brackets,
+                                seed=args.seed, field=field, chunk_size=args.chunk_size, verbose=args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#   ___                _ _        _
+#  / __|___ _ __  _ __(_) |___ __| |
+# | (__/ _ \ '  \| '_ \ | / -_) _` |
+#  \___\___/_|_|_| .__/_|_\___\__,_|
+#                |_|
+
+# Author: Giuseppe
+
+import numpy
+
+from lips.symmetries import inverse, identity
+from syngular import RingPoints
+
+from pycoretools import mapThreads
+
+from .term import cast_coefficient_to_field
+from .finite_field_backend import supports_int64_backend, to_int64, powmod, batch_inverse, dot_mod
+from .invariants_cache import relabelling_table, supports_relabelling
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+class CompiledTerms(object):
+    """Flat evaluation plan of a (non-ansatz) Terms object, see Terms.compile.
+
+    invariants: deduplicated invariant table, '1' first;
+    powers: table of (invariant index, exponent) shared by all terms;
+    monomials: table of products of powers shared by all terms;
+    terms: per term (denominator, common numerator, numerator monomials, coefficients);
+    dispatch: list of (symmetry or None, sign, term indices);
+    order: terms and symmetries in the order of the Terms, as ("term", term index) or ("symmetry", dispatch index),
+           to fold tensor valued terms as Terms.__call__ does;
+    relabellings: per symmetry, (target invariant indices, signs) giving the invariants at the permuted point
+                  from those at the original point (target -1 if the invariant has to be recomputed).
+
+    In finite fields with characteristic below 2 ^ 31 the plan runs on int64 arrays of residues.
+    """
+
+    def __init__(self, oTerms):
+        if oTerms.is_ansatz():
+            raise NotImplementedError("Compilation of Terms ansatze is not supported.")
+        self.invariants = ['1'] + sorted(oTerms.variables)
+        self.powers, self.monomials, self.terms, self.dispatch, self.order = [], [], [], [], []
+        self._invariants_index = {inv: i for i, inv in enumerate(self.invariants)}
+        self._powers_index, self._monomials_index = {}, {}
+        self._coefficients = {}
+        block, previous_was_symmetry = [], False
+        for oTerm in oTerms:
+            if oTerm.is_symmetry:
+                if oTerm.tSym[:2] != identity(len(oTerm.tSym[0])):
+                    self.dispatch += [(oTerm.tSym, oTerm.tSym[2], tuple(block))]
+                    self.order += [("symmetry", len(self.dispatch))]  # the unsymmetrised block is prepended below
+                previous_was_symmetry = True
+            else:
+                if previous_was_symmetry:  # symmetries act on the block of terms since the previous symmetries
+                    block, previous_was_symmetry = [], False
+                block += [len(self.terms)]
+                self.order += [("term", len(self.terms))]
+                self.terms += [(self._monomial_index(oTerm.oDen.invs, oTerm.oDen.exps),
+                                self._monomial_index(oTerm.oNum.monomial.invs, oTerm.oNum.monomial.exps),
+                                tuple(self._monomial_index(invs, exps) for invs, exps in zip(oTerm.oNum.polynomial.linvs, oTerm.oNum.polynomial.lexps)),
+                                tuple(oTerm.oNum.polynomial.coeffs))]
+        self.dispatch = [(None, "+", tuple(range(len(self.terms))))] + self.dispatch
+        self.nbr_term_invariants = len(self.invariants)
+        self.relabellings = {}
+        for tSym, _, _ in self.dispatch[1:]:
+            self._add_relabelling(tSym)
+        del self._invariants_index, self._powers_index, self._monomials_index
+
+    def _monomial_index(self, invs, exps):
+        powers = []
+        for inv, exp in zip(invs, exps):
+            key = (self._invariants_index[inv], exp)
+            if key not in self._powers_index:
+                self._powers_index[key] = len(self.powers)
+                self.powers += [key]
+            powers += [self._powers_index[key]]
+        key = tuple(sorted(powers))
+        if key not in self._monomials_index:
+            self._monomials_index[key] = len(self.monomials)
+            self.monomials += [key]
+        return self._monomials_index[key]
+
+    def _add_relabelling(self, tSym):
+        # symmetry terms are evaluated at oParticles.image(inverse(tSym))
+        if tSym[:2] in self.relabellings:
+            return
+        table = relabelling_table(len(tSym[0]), inverse(tuple(tSym[:2])))
+        targets, signs = [0], [1]
+        for inv in self.invariants[1:self.nbr_term_invariants]:
+            if table[inv] is None:
+                targets, signs = targets + [-1], signs + [1]
+                continue
+            target, sign = table[inv]
+            if target not in self._invariants_index:  # targets are also computed at the original point
+                self._invariants_index[target] = len(self.invariants)
+                self.invariants += [target]
+            targets, signs = targets + [self._invariants_index[target]], signs + [sign]
+        self.relabellings[tSym[:2]] = (numpy.array(targets), numpy.array(signs))
+
+    def __repr__(self):
+        return (f"CompiledTerms({len(self.terms)} terms, {len(self.invariants)} invariants, {len(self.powers)} powers, "
+                f"{len(self.monomials)} monomials, {len(self.dispatch) - 1} symmetries)")
+
+    def coefficients(self, field):
+        """Coefficients of each term cast to field, computed once per field."""
+        if field not in self._coefficients:
+            self._coefficients[field] = [numpy.array([cast_coefficient_to_field(coef, field) for coef in coefs])
+                                         for _, _, _, coefs in self.terms]
+        return self._coefficients[field]
+
+    def int64_coefficients(self, field):
+        """Coefficients of each term as int64 residues, None if some coefficient needs a field extension."""
+        if ("int64", field) not in self._coefficients:
+            if any(getattr(coef, 'imag', 0) != 0 for _, _, _, coefs in self.terms for coef in coefs):
+                self._coefficients[("int64", field)] = None
+            else:
+                self._coefficients[("int64", field)] = [numpy.array([int(cast_coefficient_to_field(coef, field)) for coef in coefs], dtype=numpy.int64)
+                                                        for _, _, _, coefs in self.terms]
+        return self._coefficients[("int64", field)]
+
+    def values(self, oParticles, invariants=None):
+        """Numerical values of the invariant table (or of the given invariants) at oParticles."""
+        return mapThreads(oParticles, self.invariants if invariants is None else invariants,
+                          UseParallelisation=(isinstance(oParticles, RingPoints) and len(oParticles) > 10), verbose=False)
+
+    def image_values(self, oParticles, tSym, values, p=None):
+        """Values of the term invariants at oParticles.image(inverse(tSym)), gathered from the values at oParticles.
+        If p is given, values are int64 residues modulo p."""
+        targets, signs = self.relabellings[tSym[:2]]
+        if not supports_relabelling(oParticles):
+            targets = numpy.full(len(targets), -1)
+        missing = numpy.nonzero(targets == -1)[0]
+        if len(missing) > 0:
+            computed = self.values(oParticles.image(inverse(tSym)), [self.invariants[i] for i in missing])
+        if p is not None:
+            image_values = values[numpy.where(targets == -1, 0, targets)]
+            image_values[signs == -1] = (p - image_values[signs == -1]) % p
+            if len(missing) > 0:
+                image_values[missing] = to_int64(computed, p)
+        else:
+            image_values = [values[target] if sign == 1 else -values[target] for target, sign in zip(targets, signs)]
+            for i, value in zip(missing, computed if len(missing) > 0 else []):
+                image_values[i] = value
+        return image_values
+
+    def numerical_monomials(self, values):
+        powers = [values[inv] if exp == 1 else values[inv] ** exp for inv, exp in self.powers]
+        numerical_monomials = []
+        for monomial in self.monomials:
+            numerical_monomial = values[0]
+            for power in monomial:
+                numerical_monomial = numerical_monomial * powers[power]
+            numerical_monomials += [numerical_monomial]
+        return numerical_monomials
+
+    def evaluate_term(self, numerical_monomials, index, coefficients):
+        den, common, numerators, _ = self.terms[index]
+        numerical_poly = 0
+        for coef, numerator in zip(coefficients[index], numerators):
+            numerical_poly = numerical_poly + coef * numerical_monomials[numerator]
+        this_term = numerical_monomials[common] / numerical_monomials[den] * numerical_poly
+        if isinstance(this_term, numpy.ndarray) and numpy.issubdtype(this_term.dtype, numpy.integer):
+            this_term = this_term.astype(int)
+        return this_term
+
+    def _call_int64(self, oParticles, coefficients):
+        field = oParticles.field
+        p = field.characteristic
+        values = to_int64(self.values(oParticles), p)
+        numerators, denominators, numerical_monomials_per_symmetry = [], [], {}
+        for tSym, sign, indices in self.dispatch:
+            if len(indices) == 0:
+                continue
+            if tSym not in numerical_monomials_per_symmetry:
+                these_values = values if tSym is None else self.image_values(oParticles, tSym, values, p)
+                powers = [these_values[inv] if exp == 1 else powmod(these_values[inv], exp, p) for inv, exp in self.powers]
+                numerical_monomials = numpy.empty((len(self.monomials), values.shape[1]), dtype=numpy.int64)
+                for i, monomial in enumerate(self.monomials):
+                    numerical_monomials[i] = these_values[0]
+                    for power in monomial:
+                        numerical_monomials[i] = numerical_monomials[i] * powers[power] % p
+                numerical_monomials_per_symmetry[tSym] = numerical_monomials
+            numerical_monomials = numerical_monomials_per_symmetry[tSym]
+            for index in indices:
+                den, common, numerator_monomials, _ = self.terms[index]
+                numerator = numerical_monomials[common] * dot_mod(coefficients[index], numerical_monomials[list(numerator_monomials)], p) % p
+                numerators += [(p - numerator) % p if sign == "-" else numerator]
+                denominators += [numerical_monomials[den]]
+        if len(numerators) == 0:
+            NumericalResult = numpy.zeros(values.shape[1], dtype=numpy.int64)
+        else:
+            NumericalResult = (numpy.array(numerators) * batch_inverse(numpy.array(denominators), p) % p).sum(axis=0) % p
+        if isinstance(oParticles, RingPoints):
+            return numpy.array([field(int(entry)) for entry in NumericalResult], dtype=object)
+        return field(int(NumericalResult[0]))
+
+    def __call__(self, oParticles):
+        # if result is a tensor indices must be aligned (see Terms.__call__)
+        massive_fermions = [i + 1 for i, oP in enumerate(oParticles) if hasattr(oP, 'left_spin_index')]
+        scalar_eval_is_scalar = all(isinstance(oP.left_spin_index[1], int) and isinstance(oP.right_spin_index[1], int)
+                                    for oP in oParticles if hasattr(oP, 'left_spin_index') and hasattr(oP, 'right_spin_index'))
+        if supports_int64_backend(oParticles.field) and massive_fermions == [] and self.int64_coefficients(oParticles.field) is not None:
+            return self._call_int64(oParticles, self.int64_coefficients(oParticles.field))
+        coefficients = self.coefficients(oParticles.field)
+        values = self.values(oParticles)
+        numerical_monomials_per_symmetry = {}
+
+        def term_value(tSym, index):
+            if tSym not in numerical_monomials_per_symmetry:
+                numerical_monomials_per_symmetry[tSym] = self.numerical_monomials(
+                    values if tSym is None else self.image_values(oParticles, tSym, values))
+            return self.evaluate_term(numerical_monomials_per_symmetry[tSym], index, coefficients)
+
+        def is_summed(this_term):
+            return numpy.isscalar(this_term) or (hasattr(this_term, 'shape') and len(this_term.shape) == 1) or not scalar_eval_is_scalar
+
+        # same accumulation as Terms.__call__: matrix valued terms are concatenated, their images folded onto them
+        NumericalResult = 0
+        for kind, position in self.order:
+            if kind == "term":
+                this_term = term_value(None, position)
+                if is_summed(this_term):
+                    NumericalResult = NumericalResult + this_term
+                elif isinstance(NumericalResult, int) and NumericalResult == 0:
+                    NumericalResult = this_term
+                else:
+                    NumericalResult = numpy.block([NumericalResult, this_term])
+                continue
+            tSym, sign, indices = self.dispatch[position]
+            folding_offset = 0
+            for index in indices[::-1]:
+                this_term = term_value(tSym, index)
+                if isinstance(this_term, numpy.ndarray) and not scalar_eval_is_scalar:
+                    assert len(massive_fermions) <= 2  # otherwise not implemented
+                    if ("".join(tSym[0][i - 1] for i in massive_fermions) ==
+                       "".join(identity(len(tSym[0]))[0][i - 1] for i in massive_fermions)[::-1]):
+                        this_term = this_term.T
+                if is_summed(this_term):
+                    NumericalResult = NumericalResult - this_term if sign == "-" else NumericalResult + this_term
+                else:
+                    columns = slice(NumericalResult.shape[1] - folding_offset - this_term.shape[1], NumericalResult.shape[1] - folding_offset)
+                    NumericalResult[:, columns] = NumericalResult[:, columns] - this_term if sign == "-" else NumericalResult[:, columns] + this_term
+                    if oParticles.field.characteristic != 0 and numpy.issubdtype(NumericalResult.dtype, numpy.integer):
+                        NumericalResult = NumericalResult % oParticles.field.characteristic
+                    folding_offset += this_term.shape[1]
+        return NumericalResult
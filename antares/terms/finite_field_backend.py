@@ -0,0 +1,60 @@
+#   ___ _      _ _         ___ _     _    _
+#  | __(_)_ _ (_) |_ ___  | __(_)___| |__| |
+#  | _|| | ' \| |  _/ -_) | _|| / -_) / _` |
+#  |_| |_|_||_|_|\__\___| |_| |_\___|_\__,_|
+
+# Author: Giuseppe
+
+import numpy
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+# Residues modulo p < 2 ^ 31 are stored as int64, so the product of two residues
+# is below 2 ^ 62 and a single % p is enough to reduce it, no overflow is possible.
+
+MAX_CHARACTERISTIC = 2 ** 31
+
+
+def supports_int64_backend(field):
+    """Whether numbers in field can be represented as int64 residues."""
+    return field.name == "finite field" and field.digits == 1 and field.characteristic < MAX_CHARACTERISTIC
+
+
+def to_int64(values, p):
+    """Converts a sequence of scalars, or of arrays of the same length, to a 2d int64 array of residues."""
+    return numpy.array([[int(entry) for entry in numpy.atleast_1d(value)] for value in values], dtype=numpy.int64) % p
+
+
+def powmod(a, exponent, p):
+    result = numpy.ones_like(a)
+    while exponent > 0:
+        if exponent & 1:
+            result = result * a % p
+        a = a * a % p
+        exponent >>= 1
+    return result
+
+
+def batch_inverse(a, p):
+    """Inverses of a 2d array of residues. Uses Montgomery's trick along the first axis,
+    so that only one (vectorized) modular exponentiation is needed."""
+    if (a == 0).any():
+        raise ZeroDivisionError("Division by zero in finite field.")
+    prefix_products = numpy.empty_like(a)
+    prefix_products[0] = a[0]
+    for i in range(1, a.shape[0]):
+        prefix_products[i] = prefix_products[i - 1] * a[i] % p
+    inverse_of_product = powmod(prefix_products[-1], p - 2, p)
+    inverses = numpy.empty_like(a)
+    for i in range(a.shape[0] - 1, 0, -1):
+        inverses[i] = inverse_of_product * prefix_products[i - 1] % p
+        inverse_of_product = inverse_of_product * a[i] % p
+    inverses[0] = inverse_of_product
+    return inverses
+
+
+def dot_mod(coefficients, rows, p):
+    """Contraction of an int64 vector of residues with a 2d array of residues along the first axis."""
+    # each product is reduced before the sum, which is safe for up to 2 ^ 32 rows
+    return (coefficients[:, None] * rows % p).sum(axis=0) % p
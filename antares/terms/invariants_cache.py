@@ -0,0 +1,136 @@
+#   ___                   _           _          ___         _
+#  |_ _|_ ___ ____ _ _ _(_)__ _ _ _| |_ ___   / __|__ _ __| |_  ___
+#   | || ' \ V / _` | '_| / _` | ' \  _(_-<  | (__/ _` / _| ' \/ -_)
+#  |___|_||_\_/\__,_|_| |_\__,_|_||_\__/__/   \___\__,_\__|_||_\___|
+
+# Author: Giuseppe
+
+import functools
+
+from lips.symmetries import inverse, identity
+from syngular import RingPoints
+
+from pycoretools import mapThreads
+
+from ..core.tools import pA2, pS2, pSijk, pNB
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+def relabelling_is_supported(invariant, multiplicity):
+    """Whether the value of the invariant at a permuted point can be obtained by relabelling.
+    Restricted to spinor brackets, sandwiches and mandelstams (e.g. parity odd traces flip sign under conjugation)."""
+    return multiplicity < 10 and "-" not in invariant and any(pattern.fullmatch(invariant) for pattern in (pA2, pS2, pSijk, pNB))
+
+
+def invariant_image(invariant, symmetry):
+    """Returns (target, sign) such that invariant at oParticles.image(symmetry) equals sign * target at oParticles."""
+    from ..ansatze.eigenbasis import Image
+    return Image(invariant, inverse(tuple(symmetry[:2])))
+
+
+def supports_relabelling(oParticles):
+    """Relabelling is not supported for points with massive fermions (spin indices)."""
+    oParticles = oParticles[0] if isinstance(oParticles, RingPoints) else oParticles
+    return not any(hasattr(oP, 'left_spin_index') for oP in oParticles)
+
+
+class RelabellingTable(dict):
+    """Maps invariants to (target, sign) under a symmetry, see invariant_image, or to None if relabelling is not supported.
+    Entries are computed lazily and shared by all points, see relabelling_table."""
+
+    def __init__(self, multiplicity, symmetry):
+        dict.__init__(self)
+        self.multiplicity = multiplicity
+        self.symmetry = symmetry
+
+    def __missing__(self, invariant):
+        self[invariant] = invariant_image(invariant, self.symmetry) if relabelling_is_supported(invariant, self.multiplicity) else None
+        return self[invariant]
+
+
+@functools.lru_cache(maxsize=None)
+def relabelling_table(multiplicity, symmetry):
+    return RelabellingTable(multiplicity, symmetry)
+
+
+class InvariantsCache(dict):
+    """Point-scoped cache of invariant values. Can be passed in place of the point to Terms, Term (as InvsDict) and TermsList.
+    Values at permuted points are shared through self.image(symmetry)."""
+
+    def __init__(self, oParticles):
+        dict.__init__(self, {'1': oParticles('1'), 'field': oParticles.field})
+        self.oParticles = oParticles
+        self.images = {}
+
+    @property
+    def field(self):
+        return self['field']
+
+    @property
+    def multiplicity(self):
+        return len(self.oParticles[0] if isinstance(self.oParticles, RingPoints) else self.oParticles)
+
+    @property
+    def supports_relabelling(self):
+        return supports_relabelling(self.oParticles)
+
+    def __missing__(self, invariant):
+        self[invariant] = self._compute([invariant])[0]
+        return self[invariant]
+
+    def _compute(self, invariants):
+        return mapThreads(self.oParticles, invariants,
+                          UseParallelisation=(isinstance(self.oParticles, RingPoints) and len(self.oParticles) > 10), verbose=False)
+
+    def prefetch(self, invariants):
+        """Computes all missing invariants at once (in parallel for many points)."""
+        missing = [invariant for invariant in invariants if invariant not in self]
+        if len(missing) > 0:
+            self.update(zip(missing, self._compute(missing)))
+        return self
+
+    def image(self, symmetry):
+        """Cache of invariant values at oParticles.image(symmetry)."""
+        symmetry = tuple(symmetry[:2])
+        if symmetry == identity(len(symmetry[0])):
+            return self
+        if symmetry not in self.images:
+            self.images[symmetry] = ImageInvariantsCache(self, symmetry)
+        return self.images[symmetry]
+
+
+class ImageInvariantsCache(InvariantsCache):
+    """Invariant values at a permuted point, obtained by relabelling the cached invariants of the parent point where possible."""
+
+    def __init__(self, parent, symmetry):
+        dict.__init__(self, {'1': parent['1'], 'field': parent['field']})
+        self.parent = parent
+        self.symmetry = symmetry
+        self.images = {}
+
+    @property
+    def oParticles(self):
+        # the permuted point is only built if some invariant can not be relabelled
+        if not hasattr(self, "_oParticles"):
+            self._oParticles = self.parent.oParticles.image(self.symmetry)
+        return self._oParticles
+
+    @property
+    def multiplicity(self):
+        return self.parent.multiplicity
+
+    @property
+    def supports_relabelling(self):
+        return self.parent.supports_relabelling
+
+    def _compute(self, invariants):
+        table = relabelling_table(self.multiplicity, self.symmetry) if self.supports_relabelling else None
+        relabelled = {} if table is None else {invariant: table[invariant] for invariant in invariants if table[invariant] is not None}
+        self.parent.prefetch([target for target, _ in relabelled.values()])
+        others = [invariant for invariant in invariants if invariant not in relabelled]
+        others = dict(zip(others, super()._compute(others) if len(others) > 0 else []))
+        return [others[invariant] if invariant in others else
+                self.parent[relabelled[invariant][0]] if relabelled[invariant][1] == 1 else -self.parent[relabelled[invariant][0]]
+                for invariant in invariants]
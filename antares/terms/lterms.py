@@ -8,8 +8,10 @@ from lips.symmetries import inverse
 
 from ..core.tools import generate_latex_and_pdf
 from ..core.numerical_methods import Numerical_Methods, tensor_function
+from ..core.point_fingerprints import lru_cache_on_points
 from ..core.settings import settings
 from .terms import LoadResults, Terms
+from .invariants_cache import InvariantsCache
 
 
 class TermsList(Numerical_Methods, list):
@@ -61,15 +63,16 @@ class TermsList(Numerical_Methods, list):
                 return picked
         return super().__getitem__(item)
 
-    @functools.lru_cache(maxsize=2048)
+    @lru_cache_on_points(maxsize=2048)
     def __call__(self, oPs):
         numerical_basis, last_coeff = [], None
+        oInvsCache = InvariantsCache(oPs)  # invariants are shared among all basis elements
         for basis_element in self:
             if isinstance(basis_element, tuple):
-                numerical_basis += [last_coeff(oPs.image(basis_element)) if isinstance(last_coeff, Terms) else oPs.image(basis_element)(last_coeff)]
+                numerical_basis += [last_coeff(oInvsCache.image(basis_element)) if isinstance(last_coeff, Terms) else oPs.image(basis_element)(last_coeff)]
             else:
                 last_coeff = basis_element
-                numerical_basis += [last_coeff(oPs) if isinstance(last_coeff, Terms) else oPs(last_coeff)]
+                numerical_basis += [last_coeff(oInvsCache) if isinstance(last_coeff, Terms) else oPs(last_coeff)]
         if isinstance(self, numpy.ndarray):
             return numpy.array(numerical_basis)
         else:
@@ -19,14 +19,15 @@ from operator import mul
 from copy import copy, deepcopy
 
 from lips.tools import subs_dict
-from lips.invariants import Invariants
 
 from syngular import Field, Monomial, Polynomial, Q, Qi
 
 from pycoretools import flatten
 
 from ..core.settings import settings
+from ..core.invariants import cached_invariants
 from ..core.numerical_methods import Numerical_Methods
+from ..core.invariant_weights import monomial_weights
 from ..scalings.single import single_scalings
 
 
@@ -63,8 +64,7 @@ class Term(Numerical_Methods, object):
 
         # Choose the variables
         if invariants is None:
-            oInvariants = Invariants(oUnknown.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                     Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+            oInvariants = cached_invariants(oUnknown.multiplicity)
             if settings.SingleScalingsUse4Brackets is True:
                 invariants = oInvariants.full
             else:
@@ -155,6 +155,44 @@ class Term(Numerical_Methods, object):
             self.oNum.internal_masses = value
             self.oDen.internal_masses = value
 
+    @property
+    def analytic_weights(self):
+        """(mass dimension, phase weights) summed from the weights of the invariants, see core.invariant_weights.
+        None for symmetries, massive kinematics, or numerators with non uniform weights."""
+        if self.is_symmetry or self.internal_masses != set() or not hasattr(self, "_multiplicity") and not hasattr(self, "oUnknown"):
+            return None
+        numerator_weights = set(monomial_weights(self.multiplicity, tuple(oMonomial.invs), tuple(oMonomial.exps))
+                                for oMonomial in self.oNum.polynomial.monomials)
+        if len(numerator_weights) != 1 or None in numerator_weights:
+            return None
+        weights = [numerator_weights.pop(),
+                   monomial_weights(self.multiplicity, tuple(self.oNum.monomial.invs), tuple(self.oNum.monomial.exps)),
+                   monomial_weights(self.multiplicity, tuple(self.oDen.invs), tuple(self.oDen.exps))]
+        if None in weights:
+            return None
+        return (weights[0][0] + weights[1][0] - weights[2][0],
+                [pw0 + pw1 - pw2 for pw0, pw1, pw2 in zip(weights[0][1], weights[1][1], weights[2][1])])
+
+    @property
+    def mass_dimension(self):
+        weights = self.analytic_weights
+        if weights is None:
+            return Numerical_Methods.mass_dimension.fget(self)
+        return float(weights[0])
+
+    @property
+    def phase_weights(self):
+        if hasattr(self, '_phase_weights'):
+            return self._phase_weights
+        weights = self.analytic_weights
+        if weights is None:
+            return Numerical_Methods.phase_weights.fget(self)
+        return weights[1]
+
+    @phase_weights.setter
+    def phase_weights(self, temp_phase_weights):
+        self._phase_weights = temp_phase_weights
+
     def __getitem__(self, item):
 
         # NumPy boolean mask
@@ -172,7 +210,7 @@ class Term(Numerical_Methods, object):
 
     def __call__(self, InvsDict_or_Particles):
         from antares.terms.terms import Terms
-        if type(InvsDict_or_Particles) is dict:
+        if isinstance(InvsDict_or_Particles, dict):
             field = InvsDict_or_Particles['field']
             # denominator monomial & common (factored) numerator monomial
             NumericalDenominator = self.oDen(InvsDict_or_Particles)
@@ -181,26 +219,7 @@ class Term(Numerical_Methods, object):
             if all(entry is None for entry in self.oNum.lCoefs):
                 rat_coefs = None
             else:
-                rat_coefs = []
-                for coef in self.oNum.lCoefs:
-                    if field.characteristic == 0:
-                        if coef in Q:
-                            coef = mpmath.mpf(str(coef.real))
-                        if coef in Qi:
-                            coef = mpmath.mpc(str(coef.real), str(coef.imag))
-                        # coef = [make_proper(coef[0]), make_proper(coef[1])]   # is this make proper story really needed ?!
-                        # coef = mpmath.mpc(mpmath.mpf(coef[0][0]) + mpmath.mpf(coef[0][1]) / mpmath.mpf(coef[0][2]),
-                        #                   mpmath.mpf(coef[1][0]) + mpmath.mpf(coef[1][1]) / mpmath.mpf(coef[1][2]))
-                    else:
-                        if hasattr(coef, 'imag'):
-                            assert coef.imag == 0 or field.i in field  # choose if field extensions are allowed
-                            if coef.imag == 0:
-                                coef = field(coef.real)
-                            else:
-                                coef = field(coef.real) + field.i * field(coef.imag)
-                        else:
-                            coef = field(coef)
-                    rat_coefs += [coef]
+                rat_coefs = [cast_coefficient_to_field(coef, field) for coef in self.oNum.lCoefs]
                 rat_coefs = numpy.array(rat_coefs)
 
             # print(InvsDict_or_Particles)
@@ -306,16 +325,15 @@ class Term(Numerical_Methods, object):
             self.oDen /= monomial_to_cancel
 
     def canonical_ordering(self):
-        oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                 Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+        oInvariants = cached_invariants(self.multiplicity)
         if self.is_symmetry is False:
             if len(self.oDen.lInvs) >= 1:
                 self.oDen = Denominator(sorted(zip(self.oDen.lInvs, self.oDen.lExps),
-                                               key=lambda x: oInvariants.full.index(x[0]) if x[0] in oInvariants.full else 999))
+                                               key=lambda x: oInvariants.index(x[0], 999)))
             for i, (lInvs, lExps) in enumerate(zip(self.oNum.llInvs, self.oNum.llExps)):
                 if len(lInvs) >= 1:
                     self.oNum.llInvs[i], self.oNum.llExps[i] = map(
-                        list, zip(*sorted(zip(lInvs, lExps), key=lambda x: oInvariants.full.index(x[0]) if x[0] in oInvariants.full else 999)))
+                        list, zip(*sorted(zip(lInvs, lExps), key=lambda x: oInvariants.index(x[0], 999))))
 
     def __mul_or_div__(self, other, operation):
         from .terms import Terms
@@ -457,6 +475,31 @@ def make_proper(fraction):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
 
+def cast_coefficient_to_field(coef, field):
+    """Casts a (gaussian) rational coefficient to a numerical value in field."""
+    if field.characteristic == 0:
+        if coef in Q:
+            coef = mpmath.mpf(str(coef.real))
+        if coef in Qi:
+            coef = mpmath.mpc(str(coef.real), str(coef.imag))
+        # coef = [make_proper(coef[0]), make_proper(coef[1])]   # is this make proper story really needed ?!
+        # coef = mpmath.mpc(mpmath.mpf(coef[0][0]) + mpmath.mpf(coef[0][1]) / mpmath.mpf(coef[0][2]),
+        #                   mpmath.mpf(coef[1][0]) + mpmath.mpf(coef[1][1]) / mpmath.mpf(coef[1][2]))
+    else:
+        if hasattr(coef, 'imag'):
+            assert coef.imag == 0 or field.i in field  # choose if field extensions are allowed
+            if coef.imag == 0:
+                coef = field(coef.real)
+            else:
+                coef = field(coef.real) + field.i * field(coef.imag)
+        else:
+            coef = field(coef)
+    return coef
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
 class Numerator(object):
 
     def __init__(self, linvs=[[]], lexps=[[]], coeffs=[], common_invs=[], common_exps=[], field=Field("Qi", 0, 0)):
@@ -20,23 +20,24 @@ from collections.abc import Sequence
 from syngular import Field, Monomial, Polynomial, RingPoints, Qi
 
 from lips import Particles
-from lips.invariants import Invariants
 from lips.particles_eval import non_unicode_powers, pA2, pS2, pSijk, pDijk_non_adjacent
 from lips.tools import pNB as pNB_internal
 from lips.particles_eval import pNB as pNB_overall
 from lips.symmetries import inverse
 
-from pycoretools import flatten, crease, mapThreads
+from pycoretools import flatten, crease
 
 from ..core.tools import LaTeXToPython, get_common_Q_factor, get_max_abs_numerator, get_max_denominator
-from ..core.diskcached import DiskCached
-from ..core.settings import settings
+from ..core.diskcached import DiskCached, cache_key, get_many, set_many
+from ..core.invariants import cached_invariants
 from ..core.numerical_methods import Numerical_Methods
 from ..core.bh_patch import accuracy
 from ..core.unknown import Unknown
 from ..scalings.pair import pair_scalings
 from .terms_numerator_fit import Terms_numerators_fit
 from .term import Term, Numerator, Denominator
+from .compiled import CompiledTerms
+from .invariants_cache import InvariantsCache
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -282,6 +283,10 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
     def __hash__(self):
         return hash(tuple(self))
 
+    def __getstate__(self):
+        # values memoized by caching_decorator are not part of the state, so that pickles (e.g. diskcache keys) depend only on the content
+        return {key: value for key, value in self.__dict__.items() if not (key.startswith("_") and key.endswith(("_cached", "_hash_when_cached")))}
+
     def is_ansatz(self):
         return any([any(entry is None for entry in oTerm.oNum.lCoefs) for oTerm in self if not oTerm.is_symmetry])
 
@@ -487,25 +492,32 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
     @DiskCached.memoized(name='cached_terms', ignore={'cached', 'verbose'})
     def __call__(self, oParticles, cached=False, verbose=False):
         from lips.symmetries import identity
-        if self.is_ansatz() and numpy.isscalar(oParticles('1')):
+        if isinstance(oParticles, RingPoints) and not self.is_ansatz():  # many points at once: through the compiled plan
+            return self.compile()(oParticles)
+        # invariants are shared through a point-scoped cache, which may also be passed in place of the point
+        InvsDict = oParticles if isinstance(oParticles, InvariantsCache) else InvariantsCache(oParticles)
+        if self.is_ansatz() and numpy.isscalar(InvsDict['1']):
             raise Exception("Terms ansatz should be called only with vectorized input. Scalar input is not supported.")
-        invs = {'1'} | self.variables
-        InvsDict = dict(zip(invs, mapThreads(
-            oParticles, invs, UseParallelisation=(isinstance(oParticles, RingPoints) and len(oParticles) > 10), verbose=False)))
-        InvsDict['field'] = oParticles.field
+        invs = sorted(self.variables)
+        InvsDict.prefetch(invs)
         SymInvsDict = {}
         for oTerm in self:
             if oTerm.is_symmetry is True and oTerm.tSym not in SymInvsDict.keys():
-                NewParticles = oParticles.image(inverse(oTerm.tSym))
-                NewDict = dict(zip(invs, mapThreads(
-                    NewParticles, invs, UseParallelisation=(isinstance(NewParticles, RingPoints) and len(NewParticles) > 10), verbose=False)))
-                NewDict['field'] = oParticles.field
-                SymInvsDict[oTerm.tSym] = NewDict
+                SymInvsDict[oTerm.tSym] = InvsDict.image(inverse(oTerm.tSym)).prefetch(invs)
         # determine whether evaluation at a single point returns a scalar - ansatz not supported for tensor evals
         # logic to be improved
-        massive_fermions = [i + 1 for i, oP in enumerate(oParticles) if hasattr(oP, 'left_spin_index')]
-        scalar_eval_is_scalar = all(isinstance(oP.left_spin_index[1], int) and isinstance(oP.right_spin_index[1], int)
-                                    for oP in oParticles if hasattr(oP, 'left_spin_index') and hasattr(oP, 'right_spin_index'))
+        # only needed for tensor valued terms: the point of a permuted invariants cache is not built otherwise
+        spin_structure = {}
+
+        def massive_fermions_and_scalar_eval_is_scalar():
+            if not spin_structure:
+                oPoint = InvsDict.oParticles if isinstance(oParticles, InvariantsCache) else oParticles
+                spin_structure['massive_fermions'] = [i + 1 for i, oP in enumerate(oPoint) if hasattr(oP, 'left_spin_index')]
+                spin_structure['scalar_eval_is_scalar'] = all(
+                    isinstance(oP.left_spin_index[1], int) and isinstance(oP.right_spin_index[1], int)
+                    for oP in oPoint if hasattr(oP, 'left_spin_index') and hasattr(oP, 'right_spin_index'))
+            return spin_structure['massive_fermions'], spin_structure['scalar_eval_is_scalar']
+
         NumericalResult = 0
         for i, iTerm in enumerate(self):
             if verbose:
@@ -525,16 +537,17 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
                             this_term = this_term.astype(int)  # warning, there may be an overflow issue for ints between 63 and 64 bits
                         chosen_operator = operator.isub if iTerm.tSym[2] == "-" else operator.iadd
                         # if result is a tensor indices must be aligned
-                        if isinstance(this_term, numpy.ndarray) and not scalar_eval_is_scalar:
+                        if isinstance(this_term, numpy.ndarray) and not massive_fermions_and_scalar_eval_is_scalar()[1]:
+                            massive_fermions = massive_fermions_and_scalar_eval_is_scalar()[0]
                             assert len(massive_fermions) <= 2  # otherwise not implemented
                             if ("".join(iTerm.tSym[0][i - 1] for i in massive_fermions) ==
                                "".join(identity(len(iTerm.tSym[0]))[0][i - 1] for i in massive_fermions)[::-1]):
                                 this_term = this_term.T
-                        if numpy.isscalar(this_term) or (hasattr(this_term, 'shape') and len(this_term.shape) == 1) or not scalar_eval_is_scalar:
+                        if numpy.isscalar(this_term) or (hasattr(this_term, 'shape') and len(this_term.shape) == 1) or not massive_fermions_and_scalar_eval_is_scalar()[1]:
                             NumericalResult = chosen_operator(NumericalResult, this_term)
                         else:
                             chosen_operator(NumericalResult[:, -(folding_offset + this_term.shape[1]):(NumericalResult.shape[1] - folding_offset)], this_term)
-                            if oParticles.field.characteristic != 0 and (
+                            if InvsDict.field.characteristic != 0 and (
                                 isinstance(NumericalResult, int) or (isinstance(NumericalResult, numpy.ndarray) and
                                                                      numpy.issubdtype(NumericalResult.dtype, numpy.integer))):
                                 NumericalResult = NumericalResult % oParticles.field.characteristic
@@ -543,7 +556,7 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
                 this_term = iTerm(InvsDict)
                 if (isinstance(this_term, numpy.ndarray) and numpy.issubdtype(this_term.dtype, numpy.integer)):
                     this_term = this_term.astype(int)  # warning, there may be an overflow issue for ints between 63 and 64 bits
-                if numpy.isscalar(this_term) or (hasattr(this_term, 'shape') and len(this_term.shape) == 1) or not scalar_eval_is_scalar:
+                if numpy.isscalar(this_term) or (hasattr(this_term, 'shape') and len(this_term.shape) == 1) or not massive_fermions_and_scalar_eval_is_scalar()[1]:
                     NumericalResult += this_term
                 else:
                     if isinstance(NumericalResult, int) and NumericalResult == 0:
@@ -553,6 +566,38 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
                         NumericalResult = numpy.block([NumericalResult, this_term])
         return NumericalResult
 
+    @caching_decorator
+    def compile(self):
+        """Lowers the Terms to a flat evaluation plan, which can be called in place of the Terms on phase space points.
+        Calls on RingPoints and evaluate_many go through it. At single points it is opt-in: there the cost is mostly
+        in the invariants, which both share, so the plan only pays off for repeated calls on the same Terms."""
+        return CompiledTerms(self)
+
+    def evaluate_many(self, points, cached=False):
+        """Evaluates the Terms on many phase space points (a list, a generator or RingPoints) at once.
+        Invariants are computed as columns over all points and the terms are contracted as arrays.
+        With cached=True, values are read from and written to the diskcache in one transaction each,
+        under the same keys as self(oParticles, cached=True). Returns a numpy array with one entry per point."""
+        points = points if isinstance(points, RingPoints) else RingPoints(list(points))
+        if len(points) == 0:
+            return numpy.array([], dtype=object)
+        if cached:
+            store = self.diskcache
+            keys = [cache_key((self, oParticles), {}) for oParticles in points]
+            values = get_many(store, keys)
+            missing = [i for i, value in enumerate(values) if value is None]
+            if len(missing) > 0:
+                for i, value in zip(missing, self.evaluate_many(RingPoints([points[i] for i in missing]))):
+                    values[i] = value
+                set_many(store, [(keys[i], values[i]) for i in missing])
+            result = numpy.empty(len(values), dtype=object)
+            result[:] = values
+            return result
+        result = self(points) if self.is_ansatz() else self.compile()(points)
+        if numpy.isscalar(result) or not isinstance(result, numpy.ndarray):
+            result = numpy.array([result] * len(points), dtype=object)
+        return result
+
     def Image(self, Rule):
         if not hasattr(self, "multiplicity"):  # deduce multiplicity from length of permutation string.
             self.multiplicity = len(Rule[0])
@@ -630,8 +675,7 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
 
     def do_exploratory_double_collinear_limits(self, invariants=None, ):
         if invariants is None:
-            oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                     Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+            oInvariants = cached_invariants(self.multiplicity)
             all_invariants = oInvariants.full
             other_invariants = [inv for inv in oInvariants.invs_2 + oInvariants.invs_3 + oInvariants.invs_s if all(
                 [inv not in oTerm.oDen.lInvs + flatten(oTerm.oNum.llInvs) for oTerm in self if not oTerm.is_symmetry])]
@@ -817,8 +861,7 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
             self = self[0:2]
 
     def invs_only_in_iDen(self, i):
-        oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                 Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+        oInvariants = cached_invariants(self.multiplicity)
         iDen = self[i].oDen
         invs_only_in_iDen = [inv for inv in iDen.lInvs if all([j == i or inv not in jTerm.oDen.lInvs or len(self) == 1 for j, jTerm in enumerate(self)])]
         exps_only_in_iDen = [jExp for (j, jExp) in enumerate(self[i].oDen.lExps) if iDen.lInvs[j] in invs_only_in_iDen]
@@ -826,10 +869,10 @@ class Terms(DiskCached, Numerical_Methods, Terms_numerators_fit, list):
             # order them from most complicated to less complicated
             [invs_only_in_iDen, exps_only_in_iDen] = map(
                 list, zip(*sorted(zip(invs_only_in_iDen, exps_only_in_iDen),
-                                  key=lambda s: (s[0] in oInvariants.invs_2, s[1] == 1,
-                                                 # s[0] not in oInvariants.invs_P, s[0] not in oInvariants.invs_O, s[0] not in oInvariants.invs_D,
-                                                 s[0] not in oInvariants.invs_s, s[0] not in oInvariants.invs_5, s[0] not in oInvariants.invs_4,
-                                                 s[0] not in oInvariants.invs_3, -s[1]))))
+                                  key=lambda s: (s[0] in oInvariants.invs_2_set, s[1] == 1,
+                                                 # s[0] not in oInvariants.invs_P_set, s[0] not in oInvariants.invs_O_set, s[0] not in oInvariants.invs_D_set,
+                                                 s[0] not in oInvariants.invs_s_set, s[0] not in oInvariants.invs_5_set, s[0] not in oInvariants.invs_4_set,
+                                                 s[0] not in oInvariants.invs_3_set, -s[1]))))
         return invs_only_in_iDen, exps_only_in_iDen
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
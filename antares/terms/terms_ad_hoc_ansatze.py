@@ -12,8 +12,8 @@ import sys
 import itertools
 import antares.core.tools as SPT
 
-from lips.invariants import Invariants
 from ..core.settings import settings
+from ..core.invariants import cached_invariants
 from ..scalings.pair import pair_scalings
 from ..ansatze.interface import Ansatz
 
@@ -27,8 +27,7 @@ class Result_AdHocNumeratorAnsatze:
         n = self.multiplicity
         lM = self.mass_dimensions
         lPW = self.mass_dimensions
-        oInvariants = Invariants(self.multiplicity, Restrict3Brackets=settings.Restrict3Brackets,
-                                 Restrict4Brackets=settings.Restrict4Brackets, FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets)
+        oInvariants = cached_invariants(self.multiplicity)
         invs_2, invs_3, invs_s = oInvariants.invs_2, oInvariants.invs_3, oInvariants.invs_s
         invariants_full = oInvariants.full
         pair_invs, pair_exps = self.oUnknown.pair_invs, self.oUnknown.pair_exps
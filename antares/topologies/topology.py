@@ -7,6 +7,7 @@
 # Author: Giuseppe
 
 import re
+import functools
 import itertools
 
 from lips import Particles
@@ -402,6 +403,11 @@ def convert_invariant(Invariant, Rule):
         return Invariant
     if Invariant == "1":
         return "1"
+    return _convert_invariant(Invariant, tuple(Rule[:2]))
+
+
+@functools.lru_cache(maxsize=2 ** 18)
+def _convert_invariant(Invariant, Rule):
     # Rule Parsing
     OneLinePermutation = Rule[0]
     ComplexConjugation = Rule[1]
@@ -44,6 +44,7 @@ setup(
     entry_points={
         'console_scripts': [
             'SpinorLatexCompiler=antares.scripts.SpinorLatexCompiler:main',  # Define the entry point
+            'BuildFriendsTables=antares.scripts.BuildFriendsTables:main',
         ],
     },
     classifiers=[
@@ -0,0 +1,27 @@
+"""Stand-in external evaluator for tests/test_external_unknown.py: returns ⟨1|2⟩ at finite field points, speaking the protocol of antares.core.external_unknown."""
+
+import json
+import re
+import sys
+
+
+noisy = "--noisy" in sys.argv[1:]  # stray output, as from a debugging print in the external code
+hang = "--hang" in sys.argv[1:]  # never answers, as a stuck evaluation
+
+for line in sys.stdin:
+    request = json.loads(line)
+    if hang:
+        continue
+    if noisy:
+        print("evaluating...")
+    try:
+        prime = int(re.match(r"Field\('finite field', (\d+), 1\)", request["points"][0]["field"]).group(1))
+        results = []
+        for point in request["points"]:
+            (a, b), (c, d) = [[int(entry) for entry in lambda_] for lambda_ in (point["spinors"][0][0], point["spinors"][1][0])]
+            results += [str((b * c - a * d) % prime)]
+        response = {"id": request["id"], "results": results}
+    except Exception as e:
+        response = {"id": request["id"], "error": repr(e)}
+    sys.stdout.write(json.dumps(response) + "\n")
+    sys.stdout.flush()
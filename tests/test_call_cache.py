@@ -0,0 +1,27 @@
+import multiprocessing
+
+from antares.core.call_cache import CallCache, call_cache
+from antares.core.settings import settings
+
+
+def write_in_child(directory, oCallCache):
+    call_cache(directory)[("tree", None, "child")] = 2
+    oCallCache[("tree", None, "inherited")] = 3  # the child exits without flushing, as mapThreads workers do
+
+
+def test_call_cache_tiers_and_write_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CallCacheWriteBack", 3)
+    oCallCache = call_cache(tmp_path)
+    assert call_cache(tmp_path) is oCallCache
+    oCallCache[("box", 1, "abc")] = 1
+    assert ("box", 1, "abc") in oCallCache and oCallCache[("box", 1, "abc")] == 1
+    assert ("box", 1, "abc") not in CallCache(tmp_path)  # buffered, not yet written back
+    oCallCache[("box", 2, "abc")] = 2
+    oCallCache[("box", 3, "abc")] = 3
+    assert oCallCache.pending == {}
+    assert CallCache(tmp_path).get_many([("box", 2, "abc"), ("box", 4, "abc")]) == [2, None]
+    process = multiprocessing.get_context("fork").Process(target=write_in_child, args=(tmp_path, oCallCache))
+    process.start()
+    process.join()
+    assert oCallCache[("tree", None, "child")] == 2 and oCallCache[("tree", None, "inherited")] == 3
+    assert len(oCallCache) == 5
@@ -0,0 +1,29 @@
+import os
+import antares
+
+from lips import Particles
+from syngular import Field
+
+from antares.terms.terms import Terms
+from antares.core import diskcached
+
+
+def test_diskcache_handle_is_reused_per_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    oTerms = Terms("""+(1⟨12⟩)/(⟨23⟩⟨34⟩⟨45⟩⟨51⟩)""")
+    assert oTerms.diskcache is oTerms.diskcache
+    assert oTerms.diskcache is Terms("""+(1⟨13⟩)/(⟨23⟩⟨34⟩⟨45⟩⟨51⟩)""").diskcache
+    handle = oTerms.diskcache
+    monkeypatch.setattr(os, "getpid", lambda: -1)  # as in a forked child
+    assert oTerms.diskcache is not handle
+
+
+def test_evaluate_many_cached_shares_keys_with_call(tmp_path, monkeypatch):
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oTerms = Terms("""+(1⟨12⟩)/(⟨23⟩⟨34⟩⟨45⟩⟨51⟩)""")
+    points = [Particles(5, field=field, seed=seed) for seed in range(4)]
+    assert oTerms(points[0], cached=True) == oTerms(points[0])
+    assert list(oTerms.evaluate_many(points, cached=True)) == [oTerms(oParticles) for oParticles in points]
+    keys = [diskcached.cache_key((oTerms, oParticles), {}) for oParticles in points]
+    assert all(value is not None for value in diskcached.get_many(oTerms.diskcache, keys))
@@ -0,0 +1,52 @@
+import pathlib
+import pickle
+import sys
+import pytest
+
+from lips import Particles
+from syngular import Field
+
+from antares.core.external_unknown import ExternalUnknown
+from antares.core.unknown import Unknown
+
+stand_in = [sys.executable, str(pathlib.Path(__file__).parent / "external_evaluator.py")]
+
+
+def test_external_unknown_with_persistent_workers():
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oUnknown = ExternalUnknown(stand_in, 5, nbr_workers=2, batch_size=3)
+    points = [Particles(5, field=field, seed=seed) for seed in range(10)]
+    try:
+        assert oUnknown.evaluate_many(points) == [oPs("⟨1|2⟩") for oPs in points]
+        pids = [worker.process.pid for worker in oUnknown.pool.workers]
+        assert oUnknown(points[0]) == points[0]("⟨1|2⟩")
+        assert [worker.process.pid for worker in oUnknown.pool.workers] == pids and len(set(pids)) == 2
+        assert pickle.loads(pickle.dumps(oUnknown))._pool is None
+        assert Unknown(oUnknown).what_am_I == "Numerical"
+        with pytest.raises(RuntimeError, match="External evaluator error"):
+            oUnknown(Particles(5, field=Field("mpc", 0, 300), seed=0))
+    finally:
+        oUnknown.close()
+
+
+def test_external_unknown_fails_on_invalid_responses():
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oUnknown = ExternalUnknown(stand_in + ["--noisy"], 5, nbr_workers=1, batch_size=2, timeout=30)
+    try:
+        with pytest.raises(RuntimeError, match="Invalid response from external evaluator.*evaluating"):
+            oUnknown.evaluate_many([Particles(5, field=field, seed=seed) for seed in range(5)])
+    finally:
+        oUnknown.close()
+
+
+def test_external_unknown_restarts_hung_workers():
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oUnknown = ExternalUnknown(stand_in + ["--hang"], 5, nbr_workers=1, timeout=0.5)
+    try:
+        oHungWorker = oUnknown.pool.workers[0]
+        with pytest.raises(TimeoutError, match="no response within 0.5 seconds"):
+            oUnknown(Particles(5, field=field, seed=0))
+        assert oHungWorker.process.poll() is not None and oHungWorker.futures == {}
+        assert oUnknown.pool.workers[0] is not oHungWorker and oUnknown.pool.workers[0].futures == {}
+    finally:
+        oUnknown.close()
@@ -0,0 +1,29 @@
+import numpy
+
+from syngular import Field
+
+from antares.terms.finite_field_backend import supports_int64_backend, to_int64, powmod, batch_inverse, dot_mod
+
+modp = Field('finite field', 2 ** 31 - 1, 1)
+p = modp.characteristic
+
+
+def test_supports_int64_backend():
+    assert supports_int64_backend(modp)
+    assert not supports_int64_backend(Field('finite field', 2 ** 61 - 1, 1))
+    assert not supports_int64_backend(Field('padic', 2 ** 31 - 1, 3))
+    assert not supports_int64_backend(Field('mpc', 0, 300))
+
+
+def test_powmod_and_batch_inverse_vs_modp():
+    values = [[modp(123456789), modp(2 ** 30 + 7)], [modp(-5), modp(987654321)], [modp(3), modp(1)]]
+    residues = to_int64(values, p)
+    assert all(int(modp(value) ** 5) == powmod(residues[i], 5, p)[j] for i, row in enumerate(values) for j, value in enumerate(row))
+    inverses = batch_inverse(residues, p)
+    assert all(int(1 / modp(value)) == inverses[i][j] for i, row in enumerate(values) for j, value in enumerate(row))
+
+
+def test_dot_mod_does_not_overflow():
+    coefficients = numpy.array([p - 1] * 10, dtype=numpy.int64)
+    rows = numpy.full((10, 3), p - 1, dtype=numpy.int64)
+    assert (dot_mod(coefficients, rows, p) == 10 % p).all()
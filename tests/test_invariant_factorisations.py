@@ -0,0 +1,61 @@
+import pickle
+import sympy
+
+import antares
+
+from syngular import Field
+
+from antares.scalings import invariant_factorisations as factorisations
+from antares.scalings.slicing import get_invariant_dict, match_factors
+
+from test_slice_evaluation import line_slice
+
+
+def test_dense_factorisation_matches_sympy():
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oSlice = line_slice(field)
+    for invariant in ("⟨1|2⟩", "s_123", "⟨1|3+4|5]", "Δ_12|34|5"):
+        polynomial = 4 * oSlice(invariant).expand()
+        expected = sympy.poly(polynomial, modulus=field.characteristic).as_expr().factor(modulus=field.characteristic)
+        assert factorisations.factorise_invariant(invariant, oSlice, field) == expected
+
+
+def test_factorisations_store_is_keyed_on_slice_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oSlice = line_slice(field)
+    assert factorisations.slice_key(oSlice) == factorisations.slice_key(pickle.loads(pickle.dumps(oSlice.copy())))
+    invariants = ("⟨1|2⟩", "⟨2|3⟩", "[3|4]", "s_123")
+    invariant_dict = get_invariant_dict(invariants, oSlice, verbose=False)
+    assert len(invariant_dict) == len(invariants)
+    expected = factorisations.invariant_factorisations(invariants, oSlice, use_cache=False)
+
+    def factorise_invariant_must_not_run(*args, **kwargs):
+        raise AssertionError("Factorisation should have been read from the store.")
+
+    monkeypatch.setattr(factorisations, "factorise_invariant", factorise_invariant_must_not_run)
+    assert factorisations.invariant_factorisations(invariants, line_slice(field)) == expected
+    assert get_invariant_dict(invariants, line_slice(field), verbose=False) == invariant_dict
+
+
+def test_match_factors_on_fingerprints(tmp_path, monkeypatch):
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oSlice = line_slice(field)
+    invariants = ("⟨1|2⟩", "⟨2|3⟩", "[3|4]", "[4|5]", "s_123", "⟨1|3+4|5]")
+    invariant_dict = get_invariant_dict(invariants, oSlice, verbose=False)
+    polynomial = sympy.poly((7 * oSlice("⟨1|2⟩") ** 2 * oSlice("s_123") * oSlice("[4|5]") ** 3).expand(),
+                            modulus=field.characteristic).as_expr()
+    assert match_factors(polynomial, invariant_dict, field, assert_full_match=True) == {"⟨1|2⟩": 2, "[4|5]": 3, "s_123": 1}
+    assert match_factors(polynomial, invariant_dict, field, degree_bounds={("⟨1|2⟩", ): 1}) == {"⟨1|2⟩": 1, "[4|5]": 3, "s_123": 1}
+
+
+def test_factorisations_store_ignores_other_formats(tmp_path, monkeypatch):
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oSlice = line_slice(field)
+    store = factorisations.invariant_factorisations_store()
+    assert store is factorisations.invariant_factorisations_store()
+    store[(factorisations.slice_key(oSlice), str(field), "⟨1|2⟩")] = "old format entry"
+    assert factorisations.invariant_factorisations(("⟨1|2⟩", ), oSlice) == factorisations.invariant_factorisations(("⟨1|2⟩", ), oSlice, use_cache=False)
+    assert get_invariant_dict(("⟨1|2⟩", ), oSlice, verbose=False) is get_invariant_dict(("⟨1|2⟩", ), oSlice.copy(), verbose=True)
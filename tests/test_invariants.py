@@ -0,0 +1,26 @@
+from lips.invariants import Invariants
+
+from antares.core.settings import settings
+from antares.core.invariants import cached_invariants
+
+
+def test_cached_invariants_is_shared_and_indexed():
+    oInvariants = cached_invariants(6)
+    assert oInvariants is cached_invariants(6)
+    assert oInvariants.full == Invariants(6, Restrict3Brackets=settings.Restrict3Brackets, Restrict4Brackets=settings.Restrict4Brackets,
+                                          FurtherRestrict4Brackets=settings.FurtherRestrict4Brackets).full
+    assert all(oInvariants.index(inv) == oInvariants.full.index(inv) for inv in oInvariants.full)
+    assert oInvariants.index("not an invariant", -1) == -1
+    assert oInvariants.invs_3_set == frozenset(oInvariants.invs_3)
+
+
+def test_cached_invariants_returns_copies_and_respects_settings(monkeypatch):
+    oInvariants = cached_invariants(6)
+    full = oInvariants.full
+    full.clear()
+    oInvariants.invs_2.clear()
+    assert len(cached_invariants(6).full) > 0 and len(cached_invariants(6).invs_2) > 0
+    monkeypatch.setattr(settings, "Restrict3Brackets", not settings.Restrict3Brackets)
+    assert cached_invariants(6) is not oInvariants
+    monkeypatch.undo()
+    assert cached_invariants(6) is oInvariants
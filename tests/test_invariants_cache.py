@@ -0,0 +1,32 @@
+import pytest
+
+from lips import Particles
+from syngular import Field
+
+from antares.terms.terms import Terms
+from antares.terms.invariants_cache import InvariantsCache
+
+modp = Field('finite field', 2 ** 31 - 1, 1)
+
+
+@pytest.mark.parametrize("symmetry", [("231564", False), ("654321", True), ("132465", True)])
+def test_image_by_relabelling_vs_particles_image(symmetry):
+    oPs = Particles(6, field=modp, seed=0)
+    invariants = ["⟨1|2⟩", "[3|5]", "s_123", "s_246", "⟨1|2+3|4]", "⟨1|(2+3)|6]", "⟨1|2|3|4⟩", "tr5_1234"]
+    oInvsCache = InvariantsCache(oPs).image(symmetry).prefetch(invariants)
+    assert hasattr(oInvsCache, "_oParticles")  # tr5_1234 can not be relabelled
+    assert all(oInvsCache[invariant] == oPs.image(symmetry)(invariant) for invariant in invariants)
+
+
+def test_terms_with_shared_invariants_cache():
+    oPs = Particles(5, field=modp, seed=0)
+    oTerms = Terms("""
+        +(-4[1|4]⟨3|4⟩²⟨3|5⟩[3|5])/(⟨1|4⟩⟨2|4⟩⟨2|5⟩⟨4|5⟩²[4|5])
+        +('12354', False, '-')
+        +(-4[1|3]⟨3|4⟩²⟨3|5⟩²)/(⟨1|3⟩⟨2|4⟩⟨2|5⟩⟨4|5⟩³)""")
+    oInvsCache = InvariantsCache(oPs)
+    assert oTerms(oInvsCache) == oTerms(oPs)
+    assert not hasattr(oInvsCache.image(('12354', False)), "_oParticles")  # all images obtained by relabelling
+    oImage = oInvsCache.image(('13452', False))
+    assert oTerms(oImage) == oTerms(oPs.image(('13452', False)))
+    assert not hasattr(oImage, "_oParticles")  # scalar terms do not need the permuted point
@@ -0,0 +1,33 @@
+import pickle
+
+from lips import Particles
+from syngular import Field
+
+from antares.core.multi_output_unknown import MultiOutputUnknown
+from antares.core.unknown import Unknown
+
+
+def test_one_evaluation_per_point_for_all_outputs(tmp_path):
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oMultiOutputUnknown = MultiOutputUnknown(lambda oPs: [i * oPs("⟨1|2⟩") + oPs("[3|4]") for i in range(50)], 5, name="coefficients",
+                                             call_cache_path=tmp_path)
+    oPs = Particles(5, field=field, seed=0)
+    oUnknowns = [Unknown(oComponent) for oComponent in oMultiOutputUnknown.components(oPs)]
+    assert len(oUnknowns) == 50 and oUnknowns[7].__name__ == "coefficients/7" and oUnknowns[7].multiplicity == 5
+    assert oUnknowns[0].what_am_I == "Numerical"
+    for seed in range(3):
+        oPs = Particles(5, field=field, seed=seed)
+        assert [oUnknown(oPs) for oUnknown in oUnknowns] == [i * oPs("⟨1|2⟩") + oPs("[3|4]") for i in range(50)]
+    assert oMultiOutputUnknown.nbr_evaluations == 3
+    oMultiOutputUnknown.save_call_cache()
+    oUnpickled = pickle.loads(pickle.dumps(MultiOutputUnknown(dict, 5, call_cache_path=tmp_path)))
+    assert oUnpickled[7](oPs) == oUnknowns[7](oPs) and oUnpickled.nbr_evaluations == 0
+
+
+def test_dict_outputs():
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oMultiOutputUnknown = MultiOutputUnknown(lambda oPs: {"box": oPs("s_12"), "triangle": oPs("s_23")}, 5)
+    oPs = Particles(5, field=field, seed=0)
+    components = oMultiOutputUnknown.components(oPs)
+    assert set(components) == {"box", "triangle"} and components["triangle"](oPs) == oPs("s_23")
+    assert oMultiOutputUnknown.nbr_evaluations == 1
@@ -73,3 +73,17 @@ def test_non_uniform_phase_weights():
     """)
     oTermsTest.multiplicity = 4
     assert oTermsTest.phase_weights == [NaI, NaI, 0, 0]
+
+
+def test_terms_weights_from_one_batched_evaluation(monkeypatch):
+    from antares.core.numerical_methods import discrete_log_table
+    monkeypatch.setattr(settings, "field", Field("finite field", 2 ** 31 - 1, 1))
+    oTerms = Terms("""+(⟨1|2⟩²[3|4])/(⟨2|3⟩s_123)""")
+    oTerms.multiplicity = 6
+    calls = []
+    evaluate_many = Terms.evaluate_many
+    monkeypatch.setattr(Terms, "evaluate_many", lambda self, points: calls.append(len(points)) or evaluate_many(self, points))
+    assert oTerms.phase_weights == [2, 1, -2, -1, 0, 0]
+    assert oTerms.mass_dimension == 0
+    assert calls == [7, 2]
+    assert discrete_log_table(2 ** 31 - 1, 3) is discrete_log_table(2 ** 31 - 1, 3)
@@ -0,0 +1,84 @@
+import antares
+
+from lips import Particles
+from syngular import Field
+
+from antares.core.settings import settings
+from antares.core.numerical_methods import num_func
+from antares.scalings import pair
+
+
+def func(oPs):
+    return oPs("⟨1|2⟩²[3|4]/(⟨2|3⟩³s_123)")
+
+
+func.multiplicity = 6
+oF = num_func(func)
+oF.num_invs = []
+
+
+def test_pair_scalings_friends_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    monkeypatch.setattr(settings, "field", Field("padic", 2 ** 31 - 19, 5))
+    monkeypatch.setattr(settings, "UseParallelisation", False)
+    invariants = ["⟨1|2⟩", "⟨2|3⟩", "s_123", "[3|4]"]
+    pair_invs, pair_exps, pair_friends = pair.pair_scalings(oF, invariants[:2], invariants[:2], invariants)
+    assert pair_invs == [["⟨1|2⟩", "⟨2|3⟩"]]
+    store = pair.friends_store(6)
+    assert store is pair.friends_store(6)
+    assert list(store) == [pair.pair_key("⟨2|3⟩", "⟨1|2⟩")]
+    assert store[pair.pair_key("⟨2|3⟩", "⟨1|2⟩")] == pair_friends[0]
+    # the reversed pair reads its friends from the store
+
+    def phasespace_consistency_check_must_not_run(*args, **kwargs):
+        raise RuntimeError("stored friends were recomputed")
+
+    monkeypatch.setattr(Particles, "phasespace_consistency_check", phasespace_consistency_check_must_not_run)
+    assert pair.pair_scalings(oF, ["⟨2|3⟩"], ["⟨1|2⟩"], invariants)[2] == pair_friends
+
+
+def test_discover_friends_matches_phasespace_consistency_check(tmp_path, monkeypatch):
+    from antares.scalings.session import scaling_session
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    monkeypatch.setattr(settings, "field", Field("padic", 2 ** 31 - 19, 5))
+    monkeypatch.setattr(settings, "UseParallelisation", False)
+    invariants = ["⟨1|2⟩", "⟨2|3⟩", "⟨1|3⟩", "s_123", "[3|4]", "⟨4|5⟩", "⟨5|6⟩", "⟨1|2+3|4]"]
+    invs_tuples = [("⟨1|2⟩", "⟨2|3⟩"), ("⟨4|5⟩", "⟨5|6⟩"), ("⟨1|2⟩", "[3|4]"), ("⟨2|3⟩", "⟨1|2⟩")]
+    friends = pair.discover_friends(6, invs_tuples, invariants)
+    assert len(friends) == 3
+    oSession = scaling_session(6, 0, settings.field)
+    for invs_tuple in invs_tuples[:3]:
+        oParticles = oSession.point(invs_tuple, (1, 1))
+        assert friends[pair.pair_key(*invs_tuple)] == oParticles.phasespace_consistency_check(invariants)[3]
+
+
+def test_friends_table_is_used_by_discover_friends(tmp_path, monkeypatch):
+    from antares.scalings.friends_tables import build_friends_table, load_friends_table
+    from antares.scalings.session import scaling_session
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    monkeypatch.setattr(settings, "field", Field("padic", 2 ** 31 - 19, 5))
+    monkeypatch.setattr(settings, "UseParallelisation", False)
+    invariants = ["⟨1|2⟩", "⟨2|3⟩", "⟨1|3⟩", "s_123", "[3|4]", "⟨4|5⟩"]
+    assert load_friends_table(6) is None
+    oSession = scaling_session(6, 0, settings.field)
+    nbr_varieties = len(oSession.varieties)
+    oFriendsTable = build_friends_table(6, settings.Restrict3Brackets, settings.Restrict4Brackets, settings.FurtherRestrict4Brackets,
+                                        invariants=invariants)
+    assert len(oSession.varieties) == nbr_varieties
+    assert oFriendsTable is load_friends_table(6) and len(oFriendsTable) == 15
+    assert oFriendsTable.friends("⟨2|3⟩", "⟨1|2⟩") == ["⟨1|2⟩", "⟨2|3⟩", "⟨1|3⟩", "s_123"]
+    assert oFriendsTable.friends("⟨1|2⟩", "⟨5|6⟩") is None
+    assert load_friends_table(6, field=Field("padic", 2 ** 31 - 19, 3)) is None and load_friends_table(6, field=Field("mpc", 0, 300)) is None
+    assert build_friends_table(6, settings.Restrict3Brackets, settings.Restrict4Brackets, settings.FurtherRestrict4Brackets,
+                               invariants=invariants[:3]).friends("⟨2|3⟩", "⟨1|2⟩") == ["⟨1|2⟩", "⟨2|3⟩", "⟨1|3⟩"]
+    assert len(list((tmp_path / "friends_tables").iterdir())) == 2  # the link and the current version
+    oFriendsTable = build_friends_table(6, settings.Restrict3Brackets, settings.Restrict4Brackets, settings.FurtherRestrict4Brackets,
+                                        invariants=invariants)
+
+    def compute_friends_must_not_run(*args, **kwargs):
+        raise AssertionError("tabulated friends were recomputed")
+
+    monkeypatch.setattr(pair, "compute_friends", compute_friends_must_not_run)
+    friends = pair.discover_friends(6, [("⟨1|2⟩", "⟨2|3⟩"), ("s_123", "[3|4]")], invariants[:4])
+    assert friends[pair.pair_key("⟨1|2⟩", "⟨2|3⟩")] == ["⟨1|2⟩", "⟨2|3⟩", "⟨1|3⟩", "s_123"]
+    assert friends[pair.pair_key("s_123", "[3|4]")] == [inv for inv in oFriendsTable.friends("s_123", "[3|4]") if inv in invariants[:4]]
@@ -0,0 +1,46 @@
+import pickle
+import timeit
+
+from lips import Particles
+from syngular import Field
+
+from antares.core.point_fingerprints import point_fingerprint, key_component
+from antares.core.diskcached import cache_key
+from antares.terms.invariants_cache import InvariantsCache
+
+
+def test_point_fingerprint_is_stable_and_tracks_mutations():
+    oParticles = Particles(5, field=Field("finite field", 2 ** 31 - 1, 1), seed=0)
+    fingerprint = point_fingerprint(oParticles)
+    assert oParticles._point_fingerprint[1] == fingerprint
+    assert point_fingerprint(oParticles.copy()) == fingerprint
+    assert point_fingerprint(pickle.loads(pickle.dumps(oParticles))) == fingerprint
+    assert point_fingerprint(Particles(5, field=Field("finite field", 2 ** 31 - 1, 1), seed=1)) != fingerprint
+    oParticles[1].r_sp_d = 2 * oParticles[1].r_sp_d
+    assert point_fingerprint(oParticles) != fingerprint
+    fingerprint = point_fingerprint(oParticles)
+    oParticles[2].l_sp_d[0, 1] = 3 * oParticles[2].l_sp_d[0, 1]  # in place, as Particles.subs does
+    assert point_fingerprint(oParticles) != fingerprint
+    fingerprint = point_fingerprint(oParticles)
+    oParticles[3]._r_sp_d *= -1
+    assert point_fingerprint(oParticles) != fingerprint
+
+
+def test_cached_point_fingerprint_is_cheaper_than_recomputing():
+    oParticles = Particles(7, field=Field("mpc", 0, 300), seed=0)
+    point_fingerprint(oParticles)
+    cached = min(timeit.repeat(lambda: point_fingerprint(oParticles), number=20, repeat=3))
+
+    def recompute():
+        del oParticles._point_fingerprint
+        return point_fingerprint(oParticles)
+
+    recomputed = min(timeit.repeat(recompute, number=20, repeat=3))
+    assert cached * 10 < recomputed
+
+
+def test_cache_keys_use_fingerprints():
+    oParticles = Particles(5, field=Field("mpc", 0, 300), seed=0)
+    assert key_component(oParticles) == key_component(oParticles.copy()) == ("Particles", point_fingerprint(oParticles))
+    assert key_component(InvariantsCache(oParticles)) == key_component(oParticles)
+    assert cache_key([oParticles, 1], {}) == cache_key([oParticles.copy(), 1], {}) != cache_key([oParticles, 2], {})
@@ -0,0 +1,124 @@
+import antares
+
+from syngular import Field
+
+from antares.core.settings import settings
+from antares.core.numerical_methods import num_func
+from antares.scalings import single
+
+
+def func(oPs):
+    return oPs("⟨1|2⟩²[3|4]/(⟨2|3⟩³s_123)")
+
+
+func.multiplicity = 6
+oF = num_func(func)
+
+
+def test_single_scalings_store_is_resumable(tmp_path, monkeypatch):
+    monkeypatch.setattr(antares, "CACHE_PATH", tmp_path)
+    monkeypatch.setattr(settings, "field", Field("padic", 2 ** 31 - 19, 5))
+    monkeypatch.setattr(settings, "UseParallelisation", False)
+    invariants = ["⟨1|2⟩", "⟨2|3⟩", "s_123", "⟨1|2⟩"]
+    assert single.single_scalings(oF, invariants, use_cache=True, key="func") == [2, -3, -1, 2]
+    assert len(single.single_scalings_store()) == 3
+    assert single.single_scalings_store() is single.single_scalings_store()
+
+    def single_scaling_must_not_run(*args, **kwargs):
+        raise AssertionError("stored result was recomputed")
+
+    monkeypatch.setattr(single, "single_scaling", single_scaling_must_not_run)
+    assert single.single_scalings(oF, invariants[:3], use_cache=True, key="func") == [2, -3, -1]
+
+
+def test_function_keys_identify_definitions():
+    import pytest
+    from antares.core.unknown import Unknown
+    from antares.terms.terms import Terms
+    oTerms, oSameTerms, oOtherTerms = Terms("+(⟨1|2⟩²[3|4])/(⟨2|3⟩³s_123)"), Terms("+(⟨1|2⟩²[3|4])/(⟨2|3⟩³s_123)"), Terms("+(⟨1|2⟩²[3|5])/(⟨2|3⟩³s_123)")
+    oTerms.multiplicity = oSameTerms.multiplicity = oOtherTerms.multiplicity = 6
+    assert single.function_key(oTerms) == single.function_key(oSameTerms)
+    assert single.function_key(oTerms) != single.function_key(oOtherTerms)
+    oUnknown = Unknown(oTerms)
+    assert single.function_key(oUnknown) == single.function_key(oTerms)  # same function
+    oUnknown.add_partial_piece(oOtherTerms)
+    assert single.function_key(oUnknown) != single.function_key(Unknown(oTerms))
+    with pytest.raises(ValueError):
+        single.function_key(oF)  # a bare function has no definition to key on
+    assert single.function_key(oF, "func") != single.function_key(oF, "other func")
+
+
+def test_single_scaling_timeout_yields_none(monkeypatch):
+    import time
+    monkeypatch.setattr(single, "single_scaling", lambda oUnknown, invariant, seed=0: time.sleep(5))
+    assert single.timed_single_scaling(oF, "⟨1|2⟩", timeout=0.1) is None
+
+
+def test_time_limit_is_not_silently_ignored_off_the_main_thread():
+    import pytest
+    import threading
+    from antares.core.tools import time_limit
+    errors = []
+
+    def run():
+        try:
+            with time_limit(1):
+                pass
+        except RuntimeError as e:
+            errors.append(e)
+        with time_limit(None):  # no limit is fine anywhere
+            pass
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+    with pytest.raises(TimeoutError):
+        with time_limit(0.1):
+            threading.Event().wait(5)
+
+
+def test_scaling_session_shares_varieties_and_hands_out_copies():
+    from antares.scalings.session import scaling_session
+    field = Field("padic", 2 ** 31 - 19, 5)
+    oSession = scaling_session(6, 7, field)
+    assert oSession is scaling_session(6, 7, field)
+    oParticles = oSession.point(("⟨1|2⟩", ), (1, ))
+    assert oParticles("⟨1|2⟩").n == 1
+    assert len(oSession.varieties) == 1
+    oParticles.variety(("⟨2|3⟩", ), (1, ))  # modifying a copy does not affect the session
+    assert oSession.point(("⟨1|2⟩", ), (1, ))("⟨2|3⟩") == oSession.varieties[("⟨1|2⟩", ), (1, )]("⟨2|3⟩")
+    assert len(oSession.varieties) == 1
+
+
+def test_scaling_sessions_and_their_varieties_are_bounded(monkeypatch):
+    from antares.scalings import session
+    field = Field("padic", 2 ** 31 - 19, 5)
+    monkeypatch.setattr(session, "MAX_VARIETIES", 2)
+    monkeypatch.setattr(session, "MAX_SESSIONS", 2)
+    oSession = session.scaling_session(6, 11, field)
+    for value in (1, 2, 3):
+        oSession.point(("⟨1|2⟩", ), (value, ))
+    oSession.point(("⟨1|2⟩", ), (2, ))  # most recently used, kept
+    oSession.point(("⟨1|2⟩", ), (4, ))
+    assert list(oSession.varieties) == [(("⟨1|2⟩", ), (2, )), (("⟨1|2⟩", ), (4, ))]
+    session.scaling_session(6, 12, field)
+    assert session.scaling_session(6, 11, field) is oSession
+    session.scaling_session(6, 13, field)
+    assert len(session._sessions) == 2 and session.scaling_session(6, 11, field) is oSession
+    assert (6, 12, str(field)) not in session._sessions
+
+
+def test_adaptive_single_scalings_in_mpc(monkeypatch):
+    import mpmath
+    from antares.scalings import adaptive
+    from antares.scalings.session import ScalingSession, _sessions
+    monkeypatch.setattr(settings, "field", Field("mpc", 0, 300))
+    monkeypatch.setattr(settings, "UseParallelisation", False)
+    monkeypatch.setattr(settings, "ScalingsAdaptive", True)
+    sessions = []
+    monkeypatch.setattr(adaptive, "ScalingSession", lambda *args: sessions.append(ScalingSession(*args)) or sessions[-1])
+    assert single.single_scalings(oF, ["⟨1|2⟩", "⟨2|3⟩", "s_123"], seed=3) == [2, -3, -1]
+    assert mpmath.mp.dps == 300
+    assert max(oSession.field.digits for oSession in sessions if len(oSession.varieties) > 0) < 100
+    assert not any(key[1] == 3 for key in _sessions)  # adaptive sessions do not outlive the call
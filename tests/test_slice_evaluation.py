@@ -0,0 +1,82 @@
+import numpy
+import sympy
+
+from lips import Particles
+from pyadic import ModP
+from pyadic.interpolation import Newton_polynomial_interpolation, Thiele_rational_interpolation
+from syngular import Field
+
+from antares.scalings.slice_evaluation import SliceEvaluator, BatchedSliceFunction
+
+
+def line_slice(field):
+    """Momentum conserving point with spinors shifted linearly in t (momentum conservation is not needed here)."""
+    t = sympy.symbols('t')
+    oSlice = Particles(5, field=field, seed=1)
+    oShift = Particles(1, fix_mom_cons=False, field=field, seed=3)[1]
+    for i, oParticle in enumerate(oSlice):
+        oParticle.r_sp_d = oParticle.r_sp_d + t * (i + 2) * oShift.r_sp_d
+        oParticle.l_sp_d = oParticle.l_sp_d + t * (i + 5) * oShift.l_sp_d
+    return oSlice
+
+
+def sequential(oFunc, oSlice):
+    def f(tval):
+        oPoint = oSlice.copy()
+        oPoint.subs({'t': tval})
+        return ModP(oFunc(oPoint), oPoint.field.characteristic)
+    return f
+
+
+def test_slice_evaluator_matches_subs():
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oSlice = line_slice(field)
+    oSliceEvaluator = SliceEvaluator(oSlice)
+    assert oSliceEvaluator.is_polynomial
+    for tval in (ModP(3, field.characteristic), ModP(123456789, field.characteristic)):
+        oPoint = oSlice.copy()
+        oPoint.subs({'t': tval})
+        assert all(oSliceEvaluator.point((tval, ))(inv) == oPoint(inv) for inv in ("⟨1|2⟩", "[3|4]", "s_123", "⟨1|3+4|5]"))
+
+
+def test_batched_interpolation_matches_sequential():
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oSlice = line_slice(field)
+    oFunc = lambda oPs: oPs("⟨1|2⟩⟨2|3⟩") / oPs("[4|5]")  # noqa
+    f = BatchedSliceFunction(oFunc, oSlice, block_size=4, UseParallelisation=False)
+    assert Thiele_rational_interpolation(f, field.characteristic) == Thiele_rational_interpolation(sequential(oFunc, oSlice), field.characteristic)
+    assert f.nbr_evaluations % 4 == 0
+    g = BatchedSliceFunction(lambda oPs: oPs("⟨1|2⟩"), oSlice, block_size=3, UseParallelisation=False)
+    assert Newton_polynomial_interpolation(g, field.characteristic) == Newton_polynomial_interpolation(
+        sequential(lambda oPs: oPs("⟨1|2⟩"), oSlice), field.characteristic)
+    assert g(ModP(5, field.characteristic)) == sequential(lambda oPs: oPs("⟨1|2⟩"), oSlice)(ModP(5, field.characteristic))
+
+
+def test_tensor_function_components_share_samples(monkeypatch):
+    from antares.core.numerical_methods import tensor_function
+    from antares.core.settings import settings
+    monkeypatch.setattr(settings, "UseParallelisation", False)
+    field = Field("finite field", 2 ** 31 - 1, 1)
+    oSlice = line_slice(field)
+    components = [lambda oPs: oPs("⟨1|2⟩"), lambda oPs: oPs("⟨1|2⟩⟨2|3⟩") / oPs("[4|5]"), lambda oPs: oPs("s_123") / oPs("⟨3|4⟩⟨4|5⟩")]
+    calls = []
+
+    def vector_function(oPs):
+        calls.append(1)
+        return numpy.array([component(oPs) for component in components])
+
+    oTensorFunction = tensor_function(vector_function)
+    rat_funcs_t = oTensorFunction.univariate_Thiele_on_slice(oSlice)
+    nbr_samples = []
+    for component in components:
+        f = sequential(component, oSlice)
+        samples = []
+        assert rat_funcs_t[len(nbr_samples)] == Thiele_rational_interpolation(lambda tval: samples.append(tval) or f(tval), field.characteristic)
+        nbr_samples += [len(samples)]
+    # one evaluation to get the length, then at most one block beyond the longest interpolation
+    assert len(calls) <= 1 + max(nbr_samples) + settings.Cores
+    # the slice samples follow their own parallelisation setting
+    monkeypatch.setattr(settings, "UseParallelisation", True)
+    for SlicesUseParallelisation in (False, True):
+        monkeypatch.setattr(settings, "SlicesUseParallelisation", SlicesUseParallelisation)
+        assert oTensorFunction.on_slice(oSlice)[0].oSliceFunction.UseParallelisation is SlicesUseParallelisation
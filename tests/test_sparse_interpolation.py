@@ -0,0 +1,54 @@
+import sympy
+
+from lips import Particles
+from pyadic import ModP
+from pyadic.interpolation import multivariate_Newton_polynomial_interpolation
+from syngular import Field
+
+from antares.terms.terms import Terms
+from antares.scalings.slicing import bivariate_Thiele_on_slice_given_LCD, invariant_on_slice
+from antares.scalings.sparse_interpolation import multivariate_sparse_polynomial_interpolation
+
+prime = 2 ** 31 - 1
+t1, t2, t3 = sympy.symbols('t1 t2 t3')
+
+
+def test_sparse_interpolation_of_sparse_polynomials():
+    for polynomial, variables in ((3 * t1 ** 5 * t2 ** 4 + 7 * t1 * t2 + 11, (t1, t2)), (t1 ** 4 * t2 ** 2 * t3 + 9 * t3 ** 5 + t1, (t1, t2, t3))):
+        calls = []
+
+        def f(*tvals):
+            calls.append(tvals)
+            return ModP(int(sympy.Poly(polynomial, *variables).eval(tuple(map(int, tvals)))) % prime, prime)
+
+        assert sympy.expand(multivariate_sparse_polynomial_interpolation(f, prime, len(variables)) - polynomial) == 0
+        if len(variables) == 2:
+            nbr_sparse_calls, calls[:] = len(calls), []
+            assert sympy.expand(multivariate_Newton_polynomial_interpolation(lambda tval1, tval2: f(tval1, tval2), prime) - polynomial) == 0
+            assert nbr_sparse_calls < len(calls)
+
+
+def test_bivariate_slice_with_known_parts_by_substitution():
+    field = Field("finite field", prime, 1)
+    oSlice = Particles(5, field=field, seed=1)
+    oShift1, oShift2 = Particles(1, fix_mom_cons=False, field=field, seed=3)[1], Particles(1, fix_mom_cons=False, field=field, seed=4)[1]
+    for i, oParticle in enumerate(oSlice):
+        oParticle.r_sp_d = oParticle.r_sp_d + t1 * (i + 2) * oShift1.r_sp_d
+        oParticle.l_sp_d = oParticle.l_sp_d + t2 * (i + 5) * oShift2.l_sp_d
+    oTerms = Terms("+(1⟨1|2⟩)/([4|5]⟨3|4⟩)")
+    rat_func_ts = bivariate_Thiele_on_slice_given_LCD(lambda oPs: oPs("⟨1|2⟩⟨2|3⟩s_123") / oPs("[4|5]⟨3|4⟩"), oTerms, oSlice)
+    FFGF = sympy.GF(prime).frac_field(t1, t2)
+    assert FFGF(rat_func_ts) == FFGF(sympy.expand(oSlice("⟨1|2⟩⟨2|3⟩s_123"))) / FFGF(sympy.expand(oSlice("[4|5]⟨3|4⟩")))
+
+
+def test_invariant_on_slice_falls_back_outside_of_polynomials_over_Fp():
+
+    class Slice(dict):
+        field = Field("finite field", prime, 1)
+
+        def __call__(self, invariant):
+            return self[invariant]
+
+    oSlice = Slice({"a": 3 * t1 * t2 + 5, "b": 1 / t1, "c": 1.5 * t1, "d": sympy.sqrt(2) * t2})
+    assert invariant_on_slice("a", oSlice, (t1, t2)) == sympy.Poly(3 * t1 * t2 + 5, t1, t2, modulus=prime)
+    assert all(invariant_on_slice(invariant, oSlice, (t1, t2)) is None for invariant in "bcd")
@@ -46,3 +46,42 @@ def test_terms_string_with_typo_raises_assertion():
     bad_term = """+(1⟨6|2+4|3]⟨6|2+3|4][2|4])/(⟨5|6⟩⟨1|2+3|4]s_234[3|4]²"""
     with pytest.raises(AssertionError):
         Term(bad_term)
+
+
+def test_term_image_is_memoized_and_respects_settings(monkeypatch):
+    from antares.core.settings import settings
+    from antares.ansatze.eigenbasis import Image, _invariant_image
+    oPs = Particles(6, field=Field("finite field", 2 ** 31 - 1, 1))
+    oTerm = Term("""+(1/2⟨1|2⟩⁴[1|2][2|3]⟨3|1+2|5]⁴)/(⟨1|3⟩⁴[4|5][5|6]⟨1|2+3|4]⟨3|1+2|6]s_123)""")
+    oTerm.multiplicity = 6
+    assert oTerm.Image(("234561", True))(oPs) == oTerm(oPs.image(("612345", True)))
+    hits = _invariant_image.cache_info().hits
+    assert oTerm.Image(("234561", True))(oPs) == oTerm(oPs.image(("612345", True)))
+    assert _invariant_image.cache_info().hits > hits
+    currsize = _invariant_image.cache_info().currsize
+    monkeypatch.setattr(settings, "Restrict3Brackets", not settings.Restrict3Brackets)
+    Image("⟨1|2+3|4]", ("234561", True))
+    monkeypatch.undo()
+    assert _invariant_image.cache_info().currsize == currsize + 1  # restriction flags are part of the key
+
+
+@pytest.mark.parametrize("term", [
+    """+(1/2⟨1|2⟩⁴[1|2][2|3]⟨3|1+2|5]⁴)/(⟨1|3⟩⁴[4|5][5|6]⟨1|2+3|4]⟨3|1+2|6]s_123)""",
+    """+(⟨1|2⟩[2|3]+⟨1|4⟩[4|3])/(Δ_12|34|56tr5_1234Ω_351624)""",
+    """+(⟨1|2|3|4⟩s_1234)/(Π_351624⟨1|2+3|4]²)""",
+])
+def test_term_analytic_weights_match_numerical_weights(term, monkeypatch):
+    from antares.core.settings import settings
+    from antares.core.numerical_methods import Numerical_Methods
+    oTerm = Term(term)
+    oTerm.multiplicity = 6
+    monkeypatch.setattr(settings, "field", Field("finite field", 2 ** 31 - 1, 1))
+    assert oTerm.analytic_weights is not None
+    assert oTerm.mass_dimension == Numerical_Methods.mass_dimension.fget(oTerm)
+    assert oTerm.phase_weights == Numerical_Methods.phase_weights.fget(oTerm)
+
+
+def test_term_non_uniform_weights_fall_back_to_numerical():
+    oTerm = Term("""+(⟨1|2⟩+[1|2])""")
+    oTerm.multiplicity = 6
+    assert oTerm.analytic_weights is None
@@ -6,6 +6,7 @@ import subprocess
 
 from lips import Particles
 from lips.fields import Field
+from syngular import RingPoints
 
 from antares.core.settings import settings
 from antares.terms.terms import Terms
@@ -94,6 +95,56 @@ def test_terms_explicit_representation():
     assert oTerms(oPs) == (oTerms[:7] - oTerms[:7].Image(oTerms[7].tSym) + oTerms[8:])(oPs)
 
 
+@pytest.mark.parametrize("field", [mpc, modp, padic, ])
+def test_compiled_terms_vs_terms_call(field):
+    oPs = Particles(5, field=field, seed=0)
+    oTerms = Terms("""+(-1/3[1|4]²[2|4]³⟨4|5⟩)/([2|3][3|4][4|5]⟨4|(1+5)|4]²)
+        +(+1/3[1|4]²[1|2]⟨1|3⟩⟨1|5⟩[2|5])/(⟨1|2⟩⟨1|4⟩[1|5][2|3][4|5]⟨1|(2+3)|1])
+        +(+1/3⟨1|3⟩[2|4]²[1|3][1|4])/(⟨1|2⟩⟨1|4⟩[1|5][2|3][3|4][4|5])
+        +('21543', False, '-')
+        +('12345', False, '+')
+        +(-2/9⟨3|5⟩⁴)/(⟨1|2⟩⟨1|5⟩⟨2|3⟩⟨3|4⟩⟨4|5⟩)
+        +('34512', True, '+')""")
+    oCompiledTerms = oTerms.compile()
+    assert oTerms.compile() is oCompiledTerms
+    if field is mpc:
+        assert abs(oTerms(oPs) - oCompiledTerms(oPs)) < 10 ** -280
+    else:
+        assert oTerms(oPs) == oCompiledTerms(oPs)
+
+
+def test_compiled_terms_with_ring_points():
+    oPs = RingPoints([Particles(5, field=modp, seed=seed) for seed in range(3)])
+    oTerms = Terms("""+(-4[1|4]⟨3|4⟩²⟨3|5⟩[3|5])/(⟨1|4⟩⟨2|4⟩⟨2|5⟩⟨4|5⟩²[4|5])
+        +('12354', False, '-')
+        +(-4[1|3]⟨3|4⟩²⟨3|5⟩²)/(⟨1|3⟩⟨2|4⟩⟨2|5⟩⟨4|5⟩³)""")
+    assert (oTerms(oPs) == oTerms.compile()(oPs)).all()
+    assert list(oTerms(oPs)) == [oTerms(Particles(5, field=modp, seed=seed)) for seed in range(3)]
+
+
+def test_compiled_terms_relabelling_with_non_relabellable_invariants():
+    oPs = Particles(7, field=modp, seed=0)
+    oTerms = Terms("""
+    +(-8⟨1|3⟩³Δ_123|45|67)/(⟨1|2⟩⟨2|3⟩⟨1|4+5|6+7|1⟩²)
+    +(+2⟨1|3⟩⟨3|4+5-6-7|2])/(⟨1|2⟩⟨1|4+5|6+7|1⟩)
+    +('2134567', False, '-')
+    """)
+    targets, signs = oTerms.compile().relabellings[('2134567', False)]
+    assert -1 in targets and (targets != -1).sum() > 1 and -1 in signs
+    assert oTerms(oPs) == oTerms.compile()(oPs)
+
+
+def test_terms_evaluate_many():
+    points = [Particles(5, field=modp, seed=seed) for seed in range(4)]
+    oTerms = Terms("""+(-4[1|4]⟨3|4⟩²⟨3|5⟩[3|5])/(⟨1|4⟩⟨2|4⟩⟨2|5⟩⟨4|5⟩²[4|5])
+        +('12354', False, '-')
+        +(-4[1|3]⟨3|4⟩²⟨3|5⟩²)/(⟨1|3⟩⟨2|4⟩⟨2|5⟩⟨4|5⟩³)""")
+    values = oTerms.evaluate_many(oPs for oPs in points)
+    assert values.shape == (4, )
+    assert all(value == oTerms(oPs) for value, oPs in zip(values, points))
+    assert (Terms("+(3)").evaluate_many(points) == 3).all()
+
+
 def test_terms_with_trace():
     coeff_v1 = Terms("""
     +(-8⟨1|3⟩³Δ_123|45|67)/(⟨1|2⟩⟨2|3⟩⟨1|4+5|6+7|1⟩²)
@@ -168,6 +219,28 @@ def test_terms_with_massive_fermions():
                                                        [oTerms(oPsClusteredTensor21), oTerms(oPsClusteredTensor22)]])).all()
 
 
+def test_compiled_terms_with_massive_fermions():
+    oPs = Particles(8, field=Field("finite field", 2 ** 31 - 19, 1), seed=0)
+    oPs.mt2 = oPs("s_34")
+    oPs.mt = - oPs("⟨34⟩")
+    oTerms = Terms("""
+    +⟨3|4|1]s_34(1/6⟨2|4⟩⟨1|3|4|2⟩-1/6⟨2|3|4|2⟩⟨1|4⟩)/(⟨1|2⟩Δ_12|3|4|5)
+    +('12435', False, '+')
+    +('21345', True, '+')
+    +('21435', True, '+')
+    +(⟨3|4|2]s_34⟨1|4⟩)/(⟨1|2⟩Δ_12|3|4|5)
+    """)
+    for spins in [(1, 2), (2, 1), (1, all), (all, 2), (all, all)]:
+        oPsClustered = oPs.cluster([[1, ], [2, ], [3, 4], [5, 6], [7, 8]], massive_fermions=((3, 'u', spins[0]), (4, 'd', spins[1])))
+        assert numpy.all(oTerms.compile()(oPsClustered) == oTerms(oPsClustered))
+    # tensor valued terms without the right spin indices are concatenated and their images folded onto them
+    for oParticle in oPsClustered:
+        if hasattr(oParticle, 'right_spin_index'):
+            del oParticle.right_spin_index
+    assert oTerms(oPsClustered).shape == (2, 4)
+    assert numpy.all(oTerms.compile()(oPsClustered) == oTerms(oPsClustered))
+
+
 def run_hashes_in_subprocess():
     code = """
 import hashlib